@@ -0,0 +1,97 @@
+# =================================================================================
+# ayudas_pruebas.py (Utilidades compartidas por las pruebas de los modos del motor)
+# =================================================================================
+# Catálogos sintéticos, motores con reglas de más y la comparación de "editar y consultar"
+# contra "reconstruir desde cero" que usan test_motor_paralelo, test_motor_umbral y
+# test_motor_aproximado. No es un módulo de pruebas: pytest no lo recolecta.
+import json
+import os
+import random
+
+from benchmark_motor import RATINGS_POSIBLES, VALORES_ATRIBUTOS, generar_catalogo
+from modelo_conocimiento import ReglaInferencia, premisa_desde_json
+from motor_inferencia import MotorRecomendacion
+
+
+def reglas_extra():
+    """Reglas con FC negativo, un atributo que ningún libro tiene y una premisa compuesta."""
+    return [ReglaInferencia('Fantasia', 'Lento', -0.4),
+            ReglaInferencia('Compromiso_Corto', 'Romance', -0.9),
+            ReglaInferencia('Motivación_Aprender', 'Inexistente', 0.7),
+            ReglaInferencia(premisa_desde_json({'y': ['Comic', 'Ritmo Rápido']}), 'Baja', 0.6)]
+
+
+def crear_motor(libros):
+    """Motor en serie con las reglas del archivo más reglas_extra() y una copia de `libros`."""
+    motor = MotorRecomendacion()
+    assert motor.cargar_reglas()
+    motor.reglas = motor.reglas + reglas_extra()
+    motor.compilar_reglas()
+    motor.construir_indices([dict(libro) for libro in libros])
+    return motor
+
+
+def libros_sinteticos(directorio, n_libros, semilla=0):
+    """Genera un catálogo sintético (ver benchmark_motor.generar_catalogo) y devuelve sus libros."""
+    ruta = os.path.join(directorio, 'catalogo.json')
+    generar_catalogo(ruta, n_libros, semilla)
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)['libros']
+
+
+def comprobar_ediciones(crear_motor_probado, libros, operaciones, semilla=0, tamanos_lote=(1, 1, 4, 25)):
+    """
+    Edita al azar un motor y, después de cada lote, lo compara con uno reconstruido desde cero.
+
+    Se hacen `operaciones` altas, cambios y bajas en lotes (editar_catalogo) sobre un motor con
+    la caché llena, y cada lote se consulta con y sin caché: todas las respuestas con k chico
+    (ordenación) y solo la primera con k mayor que el catálogo, donde aparece cada libro editado
+    que la empareja aunque no llegue a los primeros puestos (pertenencia a los índices).
+    :param crear_motor_probado: Función libros -> MotorRecomendacion con el modo probado activo.
+    :param libros: Catálogo inicial (diccionarios).
+    """
+    azar = random.Random(semilla)
+    referencia = [dict(libro) for libro in libros]
+    motor = crear_motor_probado(referencia)
+    combinaciones = [list(respuestas) for respuestas in motor.espacio_respuestas()][::18]
+    k_todos = 2 * len(libros) + operaciones
+    consultas = [(parcial, k) for respuestas in combinaciones
+                 for parcial, k in ((respuestas, 2), (respuestas, 5), (respuestas[:1], k_todos))]
+    # Caché llena: las ediciones deben invalidar los rankings afectados.
+    motor.precalcular_espacio_respuestas(5, en_segundo_plano=False)
+    siguiente_id = 10 ** 6
+
+    def libro_nuevo(libro_id):
+        libro = {'ID_Libro': libro_id, 'Titulo': f'Editado {libro_id}', 'Autor': 'Autor editado'}
+        for columna, valores in VALORES_ATRIBUTOS.items():
+            # A veces un valor que el catálogo no tenía (código de atributo nuevo).
+            libro[columna] = azar.choice(valores + [f'Nuevo {columna}'])
+        # Ratings fuera del rango inicial mueven el frente de las listas ordenadas por rating.
+        libro['Rating_Base'] = azar.choice(RATINGS_POSIBLES + [5.5, 2.0])
+        libro['Ruta_Imagen'] = 'libro_1.jpg'
+        return libro
+
+    hechas = 0
+    while hechas < operaciones:
+        with motor.editar_catalogo() as edicion:
+            for _ in range(azar.choice(tamanos_lote)):
+                operacion = azar.random()
+                if operacion < 0.35 or not referencia:
+                    libro = libro_nuevo(siguiente_id)
+                    siguiente_id += 1
+                    referencia.append(libro)
+                    edicion.agregar(dict(libro))
+                elif operacion < 0.7:
+                    posicion = azar.randrange(len(referencia))
+                    libro = referencia[posicion] = libro_nuevo(referencia[posicion]['ID_Libro'])
+                    edicion.actualizar(dict(libro))
+                else:
+                    edicion.eliminar(referencia.pop(azar.randrange(len(referencia)))['ID_Libro'])
+                hechas += 1
+
+        reconstruido = crear_motor(referencia)
+        assert list(motor.libros) == referencia
+        for respuestas, k in consultas:
+            esperado = reconstruido.calcular_recomendaciones(respuestas, k, None)
+            assert motor.calcular_recomendaciones(respuestas, k, None) == esperado, (hechas, respuestas, k)
+            assert motor.inferir_recomendaciones(respuestas, k)[0] == esperado, (hechas, respuestas, k)
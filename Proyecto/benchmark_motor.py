@@ -0,0 +1,374 @@
+# =================================================================================
+# benchmark_motor.py (Banco de pruebas de rendimiento de MotorRecomendacion)
+# =================================================================================
+# Uso:
+#   python benchmark_motor.py --tamanos 1000 10000 100000 --salida resultados_benchmark.json
+#   python benchmark_motor.py --tamanos 1000 --reglas 500 --comparar resultados_anteriores.json
+#   python benchmark_motor.py --tamanos 100000 --carga snapshot
+#
+# Por cada tamaño se genera un catálogo sintético con la forma de base_conocimiento.json
+# (y, si se pide, una base de reglas más grande con la forma de reglas_inferencia.json), y se
+# mide en un proceso aparte, para que el pico de memoria de un tamaño no contamine al resto:
+#   - tiempo de cargar_conocimiento_json por el camino elegido con --carga (ver MODOS_CARGA),
+#   - percentiles de latencia por petición (inferencia completa, sin caché),
+#   - rendimiento de inferir_lote (usuarios por segundo),
+#   - con --sondeos, el recall@k del modo aproximado (IVF) frente al motor exacto,
+#   - pico de memoria residente del proceso.
+import argparse       # Opciones de línea de comandos.
+import json           # Catálogos sintéticos y resultados legibles por máquina.
+import os             # Rutas y archivos temporales.
+import platform       # Datos del entorno de ejecución.
+import random         # Generación reproducible de datos sintéticos.
+import subprocess     # Un proceso por tamaño y consulta del commit actual.
+import sys            # Intérprete actual para lanzar los subprocesos.
+import tempfile       # Directorio de trabajo para los catálogos generados.
+import time           # Cronómetro de alta resolución.
+from datetime import datetime, timezone
+
+try:
+    import resource   # Pico de memoria residente (solo en sistemas tipo Unix).
+except ImportError:
+    resource = None
+
+from motor_inferencia import BASE_DIR, REGLAS_FILE, MotorRecomendacion
+from motor_vectorizado import numpy_disponible
+from snapshot_conocimiento import ruta_snapshot
+
+# --- VOCABULARIO DE ATRIBUTOS (el mismo que usa base_conocimiento.json) ---
+VALORES_ATRIBUTOS = {
+    'Atributo_1_Genero': ['Romance', 'Comic', 'Ciencia Ficción', 'Fantasia'],
+    'Atributo_2_Ritmo': ['Rápido', 'Lento', 'Media'],
+    'Atributo_3_Complejidad': ['Alta', 'Media', 'Baja'],
+    'Atributo_4_Motivacion': ['Evadir', 'Aprender', 'Emocional'],
+    'Atributo_5_Compromiso': ['Corto', 'Medio', 'Largo']
+}
+RATINGS_POSIBLES = [round(3.0 + 0.1 * i, 1) for i in range(21)]  # 3.0 ... 5.0
+
+TAMANOS_POR_DEFECTO = [1_000, 10_000, 100_000]
+PETICIONES_POR_DEFECTO = 200
+USUARIOS_LOTE_POR_DEFECTO = 1_000
+# Una de cada tantas reglas sintéticas tiene una premisa compuesta (Y de dos respuestas).
+FRACCION_COMPUESTAS = 5
+SALIDA_POR_DEFECTO = 'resultados_benchmark.json'
+# Caminos de carga medibles. Antes de cronometrar siempre se borra la instantánea (.snap) que
+# haya quedado de otra ejecución, para que carga_s no dependa de lo que hubiera en disco:
+#   - 'json': json.load del archivo completo (usar_snapshot=False).
+#   - 'snapshot_frio': primer arranque con instantánea: lectura incremental del JSON y
+#     escritura del .snap.
+#   - 'snapshot': arranque con una instantánea vigente, creada sin cronometrar justo antes.
+MODOS_CARGA = ('json', 'snapshot_frio', 'snapshot')
+CARGA_POR_DEFECTO = 'json'
+
+
+# ----------------------------------------------------------------------
+## 1. GENERADORES DE DATOS SINTÉTICOS
+# ----------------------------------------------------------------------
+def generar_catalogo(ruta, n_libros, semilla=0):
+    """
+    Escribe un catálogo sintético con la forma de base_conocimiento.json.
+
+    Los libros se escriben uno a uno, así que generar 1e7 libros no requiere tenerlos
+    todos en memoria.
+    """
+    azar = random.Random(semilla)
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write('{\n  "libros": [\n')
+        for i in range(1, n_libros + 1):
+            libro = {'ID_Libro': i, 'Titulo': f'Libro sintético {i}', 'Autor': f'Autor {i % 997}'}
+            for columna, valores in VALORES_ATRIBUTOS.items():
+                libro[columna] = azar.choice(valores)
+            libro['Rating_Base'] = azar.choice(RATINGS_POSIBLES)
+            libro['Ruta_Imagen'] = f'libro_{i % 30 + 1}.jpg'
+            f.write('    ' + json.dumps(libro, ensure_ascii=False))
+            f.write(',\n' if i < n_libros else '\n')
+        f.write('  ]\n}\n')
+
+
+def generar_reglas(ruta, n_reglas, semilla=0):
+    """
+    Escribe una base de reglas con la forma de reglas_inferencia.json.
+
+    Conserva las 15 reglas reales y añade preguntas sintéticas de 4 opciones cuyas
+    conclusiones son valores de atributo existentes, para que las reglas extra puntúen libros.
+    Una de cada FRACCION_COMPUESTAS reglas extra es compuesta: exige a la vez las respuestas
+    de dos preguntas distintas (premisa {"y": [...]}).
+    """
+    with open(REGLAS_FILE, 'r', encoding='utf-8') as f:
+        reglas = json.load(f)['reglas']
+    azar = random.Random(semilla)
+    valores = [v for lista in VALORES_ATRIBUTOS.values() for v in lista]
+    opciones = {}
+    for regla in reglas:
+        opciones.setdefault(regla['pregunta'], []).append(regla['respuesta_usuario'])
+    i = 0
+    while len(reglas) < n_reglas:
+        if len(reglas) % FRACCION_COMPUESTAS == 0:
+            primera, segunda = azar.sample(list(opciones.values()), 2)
+            reglas.append({
+                'premisa': {'y': [azar.choice(primera), azar.choice(segunda)]},
+                'atributo_esperado': azar.choice(valores),
+                'fc': round(azar.uniform(0.5, 1.0), 2)
+            })
+            continue
+        pregunta = f'Sintetica_{i // 4}'
+        respuesta = f'{pregunta}_Opcion_{i % 4}'
+        opciones.setdefault(pregunta, []).append(respuesta)
+        reglas.append({
+            'pregunta': pregunta,
+            'respuesta_usuario': respuesta,
+            'atributo_esperado': azar.choice(valores),
+            'fc': round(azar.uniform(0.5, 1.0), 2)
+        })
+        i += 1
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({'reglas': reglas[:n_reglas]}, f, ensure_ascii=False, indent=1)
+
+
+def generar_respuestas(motor, n_usuarios, semilla=0):
+    """Genera conjuntos de respuestas eligiendo una opción al azar por cada pregunta."""
+    opciones = {}
+    for regla in motor.reglas:
+        # Las reglas compuestas combinan respuestas de las preguntas ya listadas.
+        if regla.es_simple():
+            opciones.setdefault(regla.pregunta, []).append(regla.respuesta_usuario)
+    azar = random.Random(semilla)
+    return [[azar.choice(lista) for lista in opciones.values()] for _ in range(n_usuarios)]
+
+
+# ----------------------------------------------------------------------
+## 2. MEDICIÓN (se ejecuta en un subproceso por tamaño)
+# ----------------------------------------------------------------------
+def percentiles_ms(duraciones):
+    """Devuelve p50/p95/p99/máximo (en milisegundos) de una lista de duraciones en segundos."""
+    ordenadas = sorted(duraciones)
+    if not ordenadas:
+        return {}
+
+    def percentil(p):
+        return ordenadas[min(len(ordenadas) - 1, int(p / 100 * len(ordenadas)))] * 1000
+
+    return {'p50': round(percentil(50), 4), 'p95': round(percentil(95), 4),
+            'p99': round(percentil(99), 4), 'max': round(ordenadas[-1] * 1000, 4)}
+
+
+def memoria_pico_mb():
+    """Pico de memoria residente del proceso actual en MB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes.
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def borrar_snapshot(ruta_catalogo):
+    """Borra la instantánea binaria del catálogo, si existe."""
+    try:
+        os.remove(ruta_snapshot(ruta_catalogo))
+    except FileNotFoundError:
+        pass
+
+
+def medir_carga(motor, ruta_catalogo, modo):
+    """
+    Cronometra cargar_conocimiento_json por el camino `modo` (uno de MODOS_CARGA).
+
+    :return: (segundos, camino realmente medido). Si la instantánea no se pudo escribir,
+             la carga recurrió a json.load y el camino informado es 'json'.
+    """
+    borrar_snapshot(ruta_catalogo)
+    usar_snapshot = modo != 'json'
+    if modo == 'snapshot':
+        # Arranque previo sin cronometrar: deja una instantánea vigente de este mismo JSON.
+        MotorRecomendacion().cargar_conocimiento_json(ruta_catalogo, usar_snapshot=True)
+        if not os.path.exists(ruta_snapshot(ruta_catalogo)):
+            print(f"❌ Error: No se pudo crear la instantánea de {ruta_catalogo}; se mide json.load.",
+                  file=sys.stderr)
+            usar_snapshot, modo = False, 'json'
+
+    inicio = time.perf_counter()
+    motor.cargar_conocimiento_json(ruta_catalogo, usar_snapshot=usar_snapshot)
+    carga = time.perf_counter() - inicio
+
+    if modo == 'snapshot_frio' and not os.path.exists(ruta_snapshot(ruta_catalogo)):
+        print(f"❌ Error: No se pudo escribir la instantánea de {ruta_catalogo}; se midió json.load.",
+              file=sys.stderr)
+        modo = 'json'
+    return carga, modo
+
+
+def medir(ruta_catalogo, ruta_reglas, n_peticiones, n_usuarios_lote, k, n_procesos=0, umbral=False,
+          sondeos=0, carga=CARGA_POR_DEFECTO):
+    """Mide un catálogo ya generado y devuelve un diccionario de resultados."""
+    motor = MotorRecomendacion()
+    motor.cargar_reglas(ruta_reglas)
+    motor.usar_paralelo(n_procesos)
+    motor.usar_top_k_umbral(umbral)
+    if sondeos:
+        motor.usar_vecinos_aproximados(sondeos)
+
+    carga, modo_carga = medir_carga(motor, ruta_catalogo, carga)
+
+    # Latencia por petición: inferencia completa, sin pasar por la caché de rankings.
+    respuestas = generar_respuestas(motor, n_peticiones, semilla=1)
+    # Petición de calentamiento: construye lo que los modos opcionales crean al primer uso
+    # (procesos del modo paralelo, listas por rating del umbral, índice IVF).
+    inicio = time.perf_counter()
+    if respuestas:
+        motor.calcular_recomendaciones(respuestas[0], k, None)
+    calentamiento = time.perf_counter() - inicio
+    # Tiempos por fase solo de las peticiones medidas (sin la de calentamiento).
+    motor.metricas.reiniciar()
+    duraciones = []
+    for conjunto in respuestas:
+        inicio = time.perf_counter()
+        motor.calcular_recomendaciones(conjunto, k, None)
+        duraciones.append(time.perf_counter() - inicio)
+    metricas = motor.metricas.instantanea()
+
+    # Rendimiento por lotes (incluye la codificación del catálogo en la primera llamada).
+    lote = generar_respuestas(motor, n_usuarios_lote, semilla=2)
+    inicio = time.perf_counter()
+    motor.inferir_lote(lote, k)
+    duracion_lote = time.perf_counter() - inicio
+
+    # Recall@k del modo aproximado frente al motor exacto, con las mismas respuestas.
+    recall = motor.medir_recall(respuestas, k)
+
+    return {
+        'libros': len(motor.libros),
+        'reglas': len(motor.reglas),
+        'carga': modo_carga,
+        'carga_s': round(carga, 4),
+        'calentamiento_s': round(calentamiento, 4),
+        'latencia_ms': percentiles_ms(duraciones),
+        'fases_ms': {fase: tiempos['media'] for fase, tiempos in metricas['fases_ms'].items()},
+        'libros_tocados_medio': (round(metricas['contadores']['libros_tocados'] / len(respuestas), 1)
+                                 if respuestas else 0),
+        'recall_aproximado': round(recall, 4) if recall is not None else None,
+        'lote_usuarios': n_usuarios_lote,
+        'lote_s': round(duracion_lote, 4),
+        'lote_usuarios_por_s': round(n_usuarios_lote / duracion_lote, 1) if duracion_lote else None,
+        'memoria_pico_mb': memoria_pico_mb()
+    }
+
+
+# ----------------------------------------------------------------------
+## 3. ORQUESTACIÓN Y COMPARACIÓN
+# ----------------------------------------------------------------------
+def commit_actual():
+    """Hash del commit de git actual (None si no se está dentro de un repositorio)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(argumentos):
+    """Genera los datos, mide cada tamaño en un subproceso y devuelve el informe completo."""
+    directorio = argumentos.directorio or tempfile.mkdtemp(prefix='benchmark_motor_')
+    os.makedirs(directorio, exist_ok=True)
+
+    ruta_reglas = REGLAS_FILE
+    if argumentos.reglas:
+        ruta_reglas = os.path.join(directorio, f'reglas_{argumentos.reglas}.json')
+        generar_reglas(ruta_reglas, argumentos.reglas)
+
+    resultados = []
+    for tamano in argumentos.tamanos:
+        ruta_catalogo = os.path.join(directorio, f'catalogo_{tamano}.json')
+        if not os.path.exists(ruta_catalogo):
+            print(f"Generando catálogo de {tamano} libros...", file=sys.stderr)
+            generar_catalogo(ruta_catalogo, tamano)
+        print(f"Midiendo {tamano} libros...", file=sys.stderr)
+        proceso = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--medir', ruta_catalogo, ruta_reglas,
+             '--peticiones', str(argumentos.peticiones), '--usuarios-lote', str(argumentos.usuarios_lote),
+             '--k', str(argumentos.k), '--procesos', str(argumentos.procesos)]
+            + (['--umbral'] if argumentos.umbral else [])
+            + ['--sondeos', str(argumentos.sondeos), '--carga', argumentos.carga],
+            capture_output=True, text=True, check=True)
+        resultados.append(json.loads(proceso.stdout))
+
+    return {
+        'commit': commit_actual(),
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'numpy': numpy_disponible(),
+        'parametros': {'peticiones': argumentos.peticiones, 'usuarios_lote': argumentos.usuarios_lote,
+                       'k': argumentos.k, 'reglas': argumentos.reglas, 'procesos': argumentos.procesos,
+                       'umbral': argumentos.umbral, 'sondeos': argumentos.sondeos,
+                       'carga': argumentos.carga},
+        'resultados': resultados
+    }
+
+
+def comparar(informe, ruta_anterior):
+    """Imprime la variación de cada métrica respecto a un informe anterior (mismo tamaño)."""
+    with open(ruta_anterior, 'r', encoding='utf-8') as f:
+        anterior = json.load(f)
+    previos = {r['libros']: r for r in anterior.get('resultados', [])}
+    print(f"Comparando con {anterior.get('commit')} ({ruta_anterior}):")
+    for actual in informe['resultados']:
+        previo = previos.get(actual['libros'])
+        if previo is None:
+            continue
+        metricas = [('latencia p50', actual['latencia_ms'].get('p50'), previo['latencia_ms'].get('p50')),
+                    ('latencia p99', actual['latencia_ms'].get('p99'), previo['latencia_ms'].get('p99')),
+                    ('lote_s', actual['lote_s'], previo['lote_s']),
+                    ('memoria_pico_mb', actual['memoria_pico_mb'], previo['memoria_pico_mb'])]
+        # Los tiempos de carga solo se comparan si se midió el mismo camino (los informes
+        # anteriores a --carga no dicen cuál fue).
+        if actual.get('carga') == previo.get('carga'):
+            metricas.insert(0, ('carga_s', actual['carga_s'], previo['carga_s']))
+        else:
+            print(f"  {actual['libros']:>10} libros  carga_s omitida: camino {previo.get('carga', 'desconocido')} "
+                  f"-> {actual['carga']}")
+        for nombre, valor, valor_previo in metricas:
+            if valor is None or not valor_previo:
+                continue
+            print(f"  {actual['libros']:>10} libros  {nombre:<16} {valor_previo:>12} -> {valor:<12} "
+                  f"({(valor - valor_previo) / valor_previo * 100:+.1f} %)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de MotorRecomendacion con catálogos sintéticos.")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS_POR_DEFECTO,
+                        help="Números de libros de los catálogos a medir (de 1e3 a 1e7).")
+    parser.add_argument('--reglas', type=int, default=0,
+                        help="Tamaño de la base de reglas sintética (0 = reglas_inferencia.json).")
+    parser.add_argument('--peticiones', type=int, default=PETICIONES_POR_DEFECTO,
+                        help="Peticiones individuales para los percentiles de latencia.")
+    parser.add_argument('--usuarios-lote', type=int, default=USUARIOS_LOTE_POR_DEFECTO,
+                        help="Usuarios por llamada a inferir_lote.")
+    parser.add_argument('--k', type=int, default=2, help="Recomendaciones por usuario.")
+    parser.add_argument('--procesos', type=int, default=0,
+                        help="Procesos del modo paralelo (0 = puntuación en serie).")
+    parser.add_argument('--umbral', action='store_true',
+                        help="Calcula el top-k con el algoritmo del umbral (terminación temprana).")
+    parser.add_argument('--sondeos', type=int, default=0,
+                        help="Modo aproximado: listas IVF abiertas por consulta (0 = exacto); "
+                             "el informe incluye el recall medido.")
+    parser.add_argument('--carga', choices=MODOS_CARGA, default=CARGA_POR_DEFECTO,
+                        help="Camino de carga cronometrado: json.load, primer arranque con instantánea "
+                             "(snapshot_frio) o instantánea ya vigente (snapshot).")
+    parser.add_argument('--directorio', help="Directorio donde guardar y reutilizar los catálogos generados.")
+    parser.add_argument('--salida', default=SALIDA_POR_DEFECTO, help="Archivo JSON de resultados.")
+    parser.add_argument('--comparar', help="Informe JSON anterior contra el que comparar.")
+    # Modo interno: mide un solo catálogo y escribe el resultado en la salida estándar.
+    parser.add_argument('--medir', nargs=2, metavar=('CATALOGO', 'REGLAS'), help=argparse.SUPPRESS)
+    argumentos = parser.parse_args()
+
+    if argumentos.medir:
+        print(json.dumps(medir(argumentos.medir[0], argumentos.medir[1], argumentos.peticiones,
+                               argumentos.usuarios_lote, argumentos.k, argumentos.procesos,
+                               argumentos.umbral, argumentos.sondeos, argumentos.carga)))
+        sys.exit(0)
+
+    informe = ejecutar(argumentos)
+    with open(argumentos.salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(json.dumps(informe['resultados'], ensure_ascii=False, indent=2))
+    if argumentos.comparar:
+        comparar(informe, argumentos.comparar)
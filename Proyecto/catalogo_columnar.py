@@ -0,0 +1,291 @@
+# =================================================================================
+# catalogo_columnar.py (Catálogo de libros en columnas compactas)
+# =================================================================================
+# En lugar de un diccionario por libro (once claves de texto y sus valores), el catálogo
+# guarda una columna por campo:
+#   - ID_Libro y Rating_Base en arreglos numéricos (8 bytes por libro, sin objetos Python).
+#   - Cada atributo como un código entero pequeño (internado); el texto del valor se guarda
+#     una sola vez en `valores`, ya que los atributos se repiten en todo el catálogo.
+#   - Titulo, Autor y Ruta_Imagen en listas de cadenas.
+# Los libros se identifican por su posición en el catálogo, que es también el orden de
+# desempate del motor. Los diccionarios solo se reconstruyen cuando alguien los pide.
+#
+# El catálogo guarda también su índice invertido, así que una sola referencia al objeto
+# basta para leer columnas e índice coherentes entre sí. Para editarlo sin detener las
+# lecturas se trabaja sobre una copia (`copiar`) que luego se publica de una vez: eliminar
+# un libro solo lo marca (lápida) y su fila deja de aparecer en el índice, de modo que las
+# posiciones del resto, y por lo tanto el desempate, no cambian hasta `compactado`.
+from array import array # Columnas numéricas compactas.
+from bisect import bisect_left, insort # Altas y bajas en las listas de posiciones ordenadas.
+
+
+class CatalogoColumnar:
+    """
+    Base de Hechos almacenada por columnas (struct-of-arrays).
+
+    Se comporta como una secuencia de libros: `catalogo[posicion]` e iterar el catálogo
+    producen diccionarios con la forma de base_conocimiento.json. `len(catalogo)` e iterar
+    cuentan solo los libros vigentes; `len(catalogo.ids)` incluye las filas eliminadas.
+    """
+
+    def __init__(self, columnas_atributos):
+        """
+        :param columnas_atributos: Nombres de las columnas de atributos que las reglas pueden buscar.
+        """
+        self.columnas_atributos = tuple(columnas_atributos)
+        self.ids = array('q')
+        self.ratings = array('d')
+        self.titulos = []
+        self.autores = []
+        self.rutas_imagen = []
+        # Una columna de códigos por atributo: {columna: array de códigos}.
+        self.atributos = {columna: array('I') for columna in self.columnas_atributos}
+        # Tabla de valores internados: código -> texto y texto -> código.
+        self.valores = []
+        self.codigo_valor = {}
+        # Posiciones eliminadas (lápidas) que aún ocupan una fila en las columnas.
+        self.eliminados = set()
+        # Índice invertido {valor_atributo: array de posiciones vigentes, en orden}; None
+        # hasta llamar a construir_indice (la carga masiva no lo mantiene libro a libro).
+        self.indice_atributos = None
+        # Mapa ID_Libro -> posición, construido la primera vez que se busca un ID.
+        self._posicion_por_id = None
+        # Listas del índice que esta copia ya duplicó (copia al escribir, ver `copiar`).
+        self._listas_propias = set()
+
+    @classmethod
+    def desde_libros(cls, libros, columnas_atributos):
+        """
+        Construye el catálogo a partir de diccionarios de libros.
+
+        :param libros: Iterable de diccionarios con la forma de base_conocimiento.json
+                       (puede ser un generador).
+        :raises KeyError: Si a un libro le falta un campo.
+        :raises ValueError: Si un libro tiene un ID o un Rating_Base no numérico.
+        """
+        catalogo = cls(columnas_atributos)
+        for libro in libros:
+            catalogo.agregar(libro)
+        return catalogo
+
+    @classmethod
+    def desde_snapshot(cls, snapshot, columnas_atributos):
+        """
+        Construye el catálogo copiando las columnas de una instantánea binaria.
+
+        Los IDs y ratings se copian en bloque; los índices de la tabla de cadenas de la
+        instantánea se traducen a códigos de atributo o a las propias cadenas, sin
+        construir ningún diccionario de libro.
+        :param snapshot: snapshot_conocimiento.SnapshotCatalogo abierto.
+        """
+        catalogo = cls(columnas_atributos)
+        catalogo.ids.frombytes(snapshot.ids.cast('B'))
+        catalogo.ratings.frombytes(snapshot.ratings.cast('B'))
+        cadenas = snapshot.cadenas
+        catalogo.titulos = list(map(cadenas.__getitem__, snapshot.columnas['Titulo'].tolist()))
+        catalogo.autores = list(map(cadenas.__getitem__, snapshot.columnas['Autor'].tolist()))
+        catalogo.rutas_imagen = list(map(cadenas.__getitem__, snapshot.columnas['Ruta_Imagen'].tolist()))
+        for columna in catalogo.columnas_atributos:
+            indices = snapshot.columnas[columna].tolist()
+            # Traducción índice_de_cadena -> código_de_valor, solo para los valores presentes.
+            traduccion = {indice: catalogo.internar(cadenas[indice]) for indice in dict.fromkeys(indices)}
+            catalogo.atributos[columna] = array('I', map(traduccion.__getitem__, indices))
+        return catalogo
+
+    def internar(self, valor):
+        """Devuelve el código entero de un valor de atributo, asignándole uno si es nuevo."""
+        codigo = self.codigo_valor.get(valor)
+        if codigo is None:
+            codigo = self.codigo_valor[valor] = len(self.valores)
+            self.valores.append(valor)
+        return codigo
+
+    def _leer_libro(self, libro):
+        """Valida un diccionario de libro y devuelve sus campos listos para las columnas."""
+        libro_id, rating = libro['ID_Libro'], libro['Rating_Base']
+        if not isinstance(libro_id, int) or isinstance(rating, bool) or not isinstance(rating, (int, float)):
+            raise ValueError(f"Libro con ID o Rating_Base no numérico: {libro_id!r}")
+        # Se leen todos los campos antes de escribir, para no dejar columnas desparejas.
+        codigos = [self.internar(libro[columna]) for columna in self.columnas_atributos]
+        return libro_id, rating, libro['Titulo'], libro['Autor'], libro['Ruta_Imagen'], codigos
+
+    def agregar(self, libro):
+        """
+        Añade un libro al final del catálogo (y a su índice, si ya está construido).
+
+        :return: Posición del libro en el catálogo.
+        """
+        libro_id, rating, titulo, autor, ruta_imagen, codigos = self._leer_libro(libro)
+
+        self.ids.append(libro_id)
+        self.ratings.append(rating)
+        self.titulos.append(titulo)
+        self.autores.append(autor)
+        self.rutas_imagen.append(ruta_imagen)
+        for columna, codigo in zip(self.columnas_atributos, codigos):
+            self.atributos[columna].append(codigo)
+        posicion = len(self.ids) - 1
+        if self.indice_atributos is not None:
+            # Es la posición más alta, así que va al final de cada lista.
+            for codigo in set(codigos):
+                self._lista_editable(self.valores[codigo]).append(posicion)
+        if self._posicion_por_id is not None:
+            self._posicion_por_id.setdefault(libro_id, posicion)
+        return posicion
+
+    def actualizar(self, posicion, libro):
+        """
+        Reemplaza los campos del libro en `posicion`, que conserva su lugar en el catálogo.
+
+        :raises ValueError: Si el libro nuevo no tiene el mismo ID_Libro.
+        """
+        libro_id, rating, titulo, autor, ruta_imagen, codigos = self._leer_libro(libro)
+        if libro_id != self.ids[posicion]:
+            raise ValueError(f"No se puede cambiar el ID_Libro {self.ids[posicion]} por {libro_id!r}")
+        anteriores = set(self.codigos_libro(posicion))
+
+        self.ratings[posicion] = rating
+        self.titulos[posicion] = titulo
+        self.autores[posicion] = autor
+        self.rutas_imagen[posicion] = ruta_imagen
+        for columna, codigo in zip(self.columnas_atributos, codigos):
+            self.atributos[columna][posicion] = codigo
+        if self.indice_atributos is not None:
+            # Solo cambian las listas de los valores que el libro perdió o ganó.
+            nuevos = set(codigos)
+            for codigo in anteriores - nuevos:
+                self._quitar_de_lista(self.valores[codigo], posicion)
+            for codigo in nuevos - anteriores:
+                insort(self._lista_editable(self.valores[codigo]), posicion)
+
+    def eliminar(self, posicion):
+        """Marca el libro en `posicion` como eliminado y lo quita del índice."""
+        if posicion in self.eliminados:
+            return
+        self.eliminados.add(posicion)
+        if self.indice_atributos is not None:
+            for codigo in set(self.codigos_libro(posicion)):
+                self._quitar_de_lista(self.valores[codigo], posicion)
+        if self._posicion_por_id is not None and self._posicion_por_id.get(self.ids[posicion]) == posicion:
+            del self._posicion_por_id[self.ids[posicion]]
+
+    def codigos_libro(self, posicion):
+        """Códigos de atributo del libro en `posicion`, uno por columna."""
+        return [self.atributos[columna][posicion] for columna in self.columnas_atributos]
+
+    def vigente(self, posicion):
+        """Indica si `posicion` es una fila del catálogo que no fue eliminada."""
+        return 0 <= posicion < len(self.ids) and posicion not in self.eliminados
+
+    def posicion_de(self, libro_id):
+        """
+        Posición del libro vigente con ese ID_Libro, o None si no existe.
+
+        El mapa se construye en la primera búsqueda (si hay IDs repetidos, vale el primero)
+        y después lo mantienen agregar y eliminar.
+        """
+        if self._posicion_por_id is None:
+            mapa = {}
+            for posicion, id_fila in enumerate(self.ids):
+                if posicion not in self.eliminados:
+                    mapa.setdefault(id_fila, posicion)
+            self._posicion_por_id = mapa
+        return self._posicion_por_id.get(libro_id)
+
+    def construir_indice(self):
+        """
+        Construye el índice invertido atributo -> posiciones de libros vigentes.
+
+        Cada lista de posiciones (posting list) respeta el orden del catálogo y no repite un
+        libro aunque el mismo valor aparezca en dos columnas (ej: 'Media' en ritmo y
+        complejidad), igual que la comprobación `atributo in atributos_libro` original.
+        """
+        # Se trabaja con los códigos internados: set() y el acceso a la lista por código
+        # comparan enteros pequeños en lugar de cadenas.
+        por_codigo = [array('I') for _ in self.valores]
+        columnas = [self.atributos[columna] for columna in self.columnas_atributos]
+        eliminados = self.eliminados
+        for posicion, codigos in enumerate(zip(*columnas)):
+            if eliminados and posicion in eliminados:
+                continue
+            # set() elimina valores repetidos dentro del mismo libro.
+            for codigo in set(codigos):
+                por_codigo[codigo].append(posicion)
+        self.indice_atributos = {valor: por_codigo[codigo] for codigo, valor in enumerate(self.valores)}
+        self._listas_propias = set(self.indice_atributos)
+
+    def _lista_editable(self, valor):
+        """Lista de posiciones de `valor` que esta copia puede modificar (la duplica la primera vez)."""
+        if valor not in self._listas_propias:
+            lista = self.indice_atributos.get(valor)
+            self.indice_atributos[valor] = array('I') if lista is None else lista[:]
+            self._listas_propias.add(valor)
+        return self.indice_atributos[valor]
+
+    def _quitar_de_lista(self, valor, posicion):
+        lista = self._lista_editable(valor)
+        del lista[bisect_left(lista, posicion)]
+
+    def copiar(self):
+        """
+        Copia editable del catálogo, independiente de quien esté leyendo el original.
+
+        Las columnas se duplican en bloque; las listas del índice se comparten y cada una se
+        duplica solo si la copia llega a modificarla.
+        """
+        copia = CatalogoColumnar(self.columnas_atributos)
+        copia.ids = self.ids[:]
+        copia.ratings = self.ratings[:]
+        copia.titulos = self.titulos[:]
+        copia.autores = self.autores[:]
+        copia.rutas_imagen = self.rutas_imagen[:]
+        copia.atributos = {columna: codigos[:] for columna, codigos in self.atributos.items()}
+        copia.valores = self.valores[:]
+        copia.codigo_valor = dict(self.codigo_valor)
+        copia.eliminados = set(self.eliminados)
+        if self.indice_atributos is not None:
+            copia.indice_atributos = dict(self.indice_atributos)
+        if self._posicion_por_id is not None:
+            copia._posicion_por_id = dict(self._posicion_por_id)
+        return copia
+
+    def compactado(self):
+        """
+        Catálogo nuevo sin las filas eliminadas, en el mismo orden y con su índice construido.
+
+        Las posiciones de los libros cambian, pero no su orden relativo (ni el desempate).
+        """
+        vigentes = [posicion for posicion in range(len(self.ids)) if posicion not in self.eliminados]
+        nuevo = CatalogoColumnar(self.columnas_atributos)
+        nuevo.ids = array('q', map(self.ids.__getitem__, vigentes))
+        nuevo.ratings = array('d', map(self.ratings.__getitem__, vigentes))
+        nuevo.titulos = list(map(self.titulos.__getitem__, vigentes))
+        nuevo.autores = list(map(self.autores.__getitem__, vigentes))
+        nuevo.rutas_imagen = list(map(self.rutas_imagen.__getitem__, vigentes))
+        nuevo.atributos = {columna: array('I', map(codigos.__getitem__, vigentes))
+                           for columna, codigos in self.atributos.items()}
+        nuevo.valores = self.valores[:]
+        nuevo.codigo_valor = dict(self.codigo_valor)
+        nuevo.construir_indice()
+        return nuevo
+
+    def __len__(self):
+        return len(self.ids) - len(self.eliminados)
+
+    def __getitem__(self, posicion):
+        """Reconstruye el diccionario del libro en esa posición (mismo orden de claves que el JSON)."""
+        libro = {
+            'ID_Libro': self.ids[posicion],
+            'Titulo': self.titulos[posicion],
+            'Autor': self.autores[posicion]
+        }
+        for columna in self.columnas_atributos:
+            libro[columna] = self.valores[self.atributos[columna][posicion]]
+        libro['Rating_Base'] = self.ratings[posicion]
+        libro['Ruta_Imagen'] = self.rutas_imagen[posicion]
+        return libro
+
+    def __iter__(self):
+        for posicion in range(len(self.ids)):
+            if posicion not in self.eliminados:
+                yield self[posicion]
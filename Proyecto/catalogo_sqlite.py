@@ -0,0 +1,180 @@
+# =================================================================================
+# catalogo_sqlite.py (Catálogo de libros en SQLite con puntuación dentro de la consulta)
+# =================================================================================
+import json           # Lectura de base_conocimiento.json para importar el catálogo.
+import os             # Manejo de rutas.
+import sqlite3        # Motor SQL embebido (biblioteca estándar, sin servicios externos).
+from motor_inferencia import BASE_DIR, COLUMNAS_ATRIBUTOS # Columnas que las reglas pueden buscar.
+
+# --- CONFIGURACIÓN DE RUTA ---
+# Base de datos del proyecto; la tabla LIBROS original (prototipo) se deja intacta.
+DB_FILE = os.path.join(BASE_DIR, 'sistema_experto_libros.db')
+
+# Columnas en el orden en que se insertan y se leen de la tabla.
+COLUMNAS_LIBRO = ('ID_Libro', 'Titulo', 'Autor') + COLUMNAS_ATRIBUTOS + ('Rating_Base', 'Ruta_Imagen')
+
+# Libros que se insertan por transacción al importar.
+LIBROS_POR_TRANSACCION = 10_000
+
+
+class CatalogoSQLite:
+    """
+    Catálogo de libros almacenado en la tabla CATALOGO_LIBROS de SQLite.
+
+    Cada columna de atributo tiene su índice, de modo que la cláusula WHERE solo visita los
+    libros que alguna regla activada puntúa. La suma de los Factores de Certeza y la
+    selección de los k mejores se resuelven en una sola consulta; los libros se leen fila a
+    fila del cursor, sin cargar el catálogo en memoria.
+    """
+
+    def __init__(self, ruta_db=DB_FILE):
+        """
+        :param ruta_db: Archivo de base de datos SQLite (se crea si no existe).
+        """
+        self.ruta_db = ruta_db
+        # check_same_thread=False permite consultar desde el hilo que ejecute la inferencia.
+        self.conexion = sqlite3.connect(ruta_db, check_same_thread=False)
+        self.crear_esquema()
+
+    def crear_esquema(self):
+        """Crea la tabla del catálogo y los índices de atributos si aún no existen."""
+        with self.conexion:
+            # Posicion conserva el orden del catálogo, que decide los desempates.
+            self.conexion.execute('''
+                CREATE TABLE IF NOT EXISTS CATALOGO_LIBROS (
+                    Posicion INTEGER PRIMARY KEY,
+                    ID_Libro INTEGER NOT NULL UNIQUE,
+                    Titulo TEXT NOT NULL,
+                    Autor TEXT NOT NULL,
+                    Atributo_1_Genero TEXT NOT NULL,
+                    Atributo_2_Ritmo TEXT NOT NULL,
+                    Atributo_3_Complejidad TEXT NOT NULL,
+                    Atributo_4_Motivacion TEXT NOT NULL,
+                    Atributo_5_Compromiso TEXT NOT NULL,
+                    Rating_Base REAL NOT NULL,
+                    Ruta_Imagen TEXT
+                )''')
+            for columna in COLUMNAS_ATRIBUTOS:
+                self.conexion.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_catalogo_{columna.lower()} '
+                    f'ON CATALOGO_LIBROS ({columna})')
+
+    def importar_libros(self, libros):
+        """
+        Reemplaza el catálogo con los libros dados.
+
+        :param libros: Iterable de diccionarios con la forma de base_conocimiento.json.
+                       Puede ser un generador: se inserta por tandas sin materializarlo.
+        :return: Número de libros importados.
+        """
+        marcadores = ', '.join('?' for _ in COLUMNAS_LIBRO)
+        sql = f'INSERT INTO CATALOGO_LIBROS ({", ".join(COLUMNAS_LIBRO)}) VALUES ({marcadores})'
+        total = 0
+        with self.conexion:
+            self.conexion.execute('DELETE FROM CATALOGO_LIBROS')
+            tanda = []
+            for libro in libros:
+                tanda.append(tuple(libro[columna] for columna in COLUMNAS_LIBRO))
+                if len(tanda) >= LIBROS_POR_TRANSACCION:
+                    self.conexion.executemany(sql, tanda)
+                    total += len(tanda)
+                    tanda = []
+            self.conexion.executemany(sql, tanda)
+            total += len(tanda)
+        # Actualiza las estadísticas que usa el planificador para elegir los índices.
+        self.conexion.execute('ANALYZE CATALOGO_LIBROS')
+        return total
+
+    def importar_json(self, ruta_json):
+        """
+        Importa el catálogo desde un archivo con la forma de base_conocimiento.json.
+
+        :return: Número de libros importados, o None si el archivo no se pudo leer.
+        """
+        try:
+            with open(ruta_json, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ Error: El archivo {ruta_json} no fue encontrado.")
+            return None
+        except json.JSONDecodeError:
+            print(f"❌ Error: El archivo JSON no es válido.")
+            return None
+        return self.importar_libros(data.get('libros', []))
+
+    def contar_libros(self):
+        """Devuelve el número de libros del catálogo."""
+        return self.conexion.execute('SELECT COUNT(*) FROM CATALOGO_LIBROS').fetchone()[0]
+
+    def iterar_libros(self):
+        """Recorre el catálogo en orden, produciendo un diccionario por fila del cursor."""
+        cursor = self.conexion.execute(
+            f'SELECT {", ".join(COLUMNAS_LIBRO)} FROM CATALOGO_LIBROS ORDER BY Posicion')
+        for fila in cursor:
+            yield dict(zip(COLUMNAS_LIBRO, fila))
+
+    def obtener_libro(self, libro_id):
+        """Devuelve el diccionario del libro con ese ID_Libro, o None si no existe."""
+        fila = self.conexion.execute(
+            f'SELECT {", ".join(COLUMNAS_LIBRO)} FROM CATALOGO_LIBROS WHERE ID_Libro = ?',
+            (libro_id,)).fetchone()
+        return dict(zip(COLUMNAS_LIBRO, fila)) if fila else None
+
+    def consulta_puntuacion(self, activaciones, k=None):
+        """
+        Construye la consulta SQL que puntúa y ordena los libros para unas activaciones.
+
+        El puntaje se arma como Rating_Base + término_1 + término_2 + ..., evaluado de
+        izquierda a derecha igual que la acumulación en Python, así que los valores (y los
+        empates) coinciden con los de MotorRecomendacion.
+        :param activaciones: Lista ordenada de pares (atributo_esperado, fc).
+        :param k: Límite de filas (None para devolver el ranking completo).
+        :return: Tupla (sql, parámetros).
+        """
+        lista_columnas = ', '.join(COLUMNAS_ATRIBUTOS)
+        terminos, casos_primera, parametros_puntaje, parametros_primera = [], [], [], []
+        for j, (atributo, fc) in enumerate(activaciones):
+            terminos.append(f'(CASE WHEN ? IN ({lista_columnas}) THEN ? ELSE 0.0 END)')
+            parametros_puntaje += [atributo, fc]
+            casos_primera.append(f'WHEN ? IN ({lista_columnas}) THEN {j}')
+            parametros_primera.append(atributo)
+
+        # WHERE: un IN por columna, para que SQLite combine los índices de atributos.
+        valores = list(dict.fromkeys(atributo for atributo, _ in activaciones))
+        marcadores = ', '.join('?' for _ in valores)
+        condiciones = ' OR '.join(f'{columna} IN ({marcadores})' for columna in COLUMNAS_ATRIBUTOS)
+
+        sql = (f'SELECT ID_Libro, Titulo, Autor, Ruta_Imagen, '
+               f'Rating_Base + {" + ".join(terminos)} AS Puntaje_Total, '
+               f'CASE {" ".join(casos_primera)} END AS Primera '
+               f'FROM CATALOGO_LIBROS WHERE {condiciones} '
+               f'ORDER BY Puntaje_Total DESC, Primera, Posicion')
+        parametros = parametros_puntaje + parametros_primera + valores * len(COLUMNAS_ATRIBUTOS)
+        if k is not None:
+            sql += ' LIMIT ?'
+            parametros.append(k)
+        return sql, parametros
+
+    def iterar_puntuados(self, activaciones, k=None):
+        """
+        Ejecuta la consulta de puntuación y produce los libros recomendados fila a fila.
+
+        :param activaciones: Lista ordenada de pares (atributo_esperado, fc).
+        :param k: Número máximo de libros (None para recorrer todo el ranking).
+        :return: Iterador de diccionarios con el formato de inferir_recomendaciones.
+        """
+        if not activaciones or (k is not None and k <= 0):
+            return
+        sql, parametros = self.consulta_puntuacion(activaciones, k)
+        for libro_id, titulo, autor, ruta_imagen, puntaje, _ in self.conexion.execute(sql, parametros):
+            yield {
+                "ID_Libro": libro_id,
+                "Titulo": titulo,
+                "Autor": autor,
+                "Ruta_Imagen": ruta_imagen,
+                "Puntaje_Total": puntaje
+            }
+
+    def cerrar(self):
+        """Cierra la conexión con la base de datos."""
+        self.conexion.close()
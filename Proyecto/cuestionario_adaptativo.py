@@ -0,0 +1,227 @@
+# =================================================================================
+# cuestionario_adaptativo.py (Orden de preguntas por ganancia de información y parada temprana)
+# =================================================================================
+# En lugar de hacer siempre las 5 preguntas en el mismo orden, después de cada respuesta se
+# elige la pregunta que más reduce el conjunto de libros que todavía pueden terminar en el
+# top-k, y el cuestionario termina en cuanto el top-k ya no puede cambiar, respondan lo que
+# respondan las preguntas restantes.
+#
+# Cotas: para cada libro b y cada pregunta restante q, el delta de puntaje que q puede
+# aportar está entre el mínimo y el máximo, sobre sus opciones, de la suma de FC de las
+# reglas de esa opción que emparejan a b (0 si la opción no lo toca). Las reglas compuestas
+# que aún no se cumplen pueden sumar su FC más adelante. Así, el puntaje final de b queda en
+#   [puntaje_actual(b) + L(b), puntaje_actual(b) + U(b)]
+# y un libro aún sin puntuar puede entrar al ranking con, como mucho, rating(b) + U(b).
+#
+# Parada: el top-k actual t1..tk es definitivo si cada ti supera a ti+1, y tk a cualquier
+# otro libro, con cualquier combinación de respuestas restantes. Como cada pregunta aporta
+# su delta de forma independiente, la peor diferencia entre dos libros a y b es exacta:
+#   puntaje(a) - puntaje(b) + suma_q min_o (delta_qo(a) - delta_qo(b))
+# (más el peor caso de las compuestas pendientes). Antes se prueba la comparación barata de
+# cotas (cota inferior de a > cota superior de b). Se exige un margen estricto, porque las
+# cotas suman los FC en otro orden que el puntaje real.
+#
+# Candidatos: libros cuya cota superior alcanza la k-ésima mayor cota inferior. La ganancia
+# de información de q es log2|C| menos la media, sobre sus opciones (equiprobables), de
+# log2|C_o|, donde C_o son los candidatos si la respuesta a q fuera o.
+import heapq          # k-ésima mayor cota inferior.
+import math           # Logaritmos de la ganancia de información.
+
+# Margen de las comparaciones entre cotas (error de redondeo de sumar en otro orden).
+TOLERANCIA_COTAS = 1e-9
+
+
+def preguntas_restantes(opciones, respuestas):
+    """Preguntas (en el orden del archivo de reglas) sin ninguna de sus opciones respondida."""
+    respondidas = set(respuestas)
+    return [pregunta for pregunta, valores in opciones.items() if respondidas.isdisjoint(valores)]
+
+
+def _deltas_opcion(red, respuesta, indice_atributos):
+    """{posición_libro: suma de FC} de las reglas que se activan cada vez que se afirma `respuesta`."""
+    nodo = red.nodo_alfa.get(respuesta)
+    delta = {}
+    if nodo is None:
+        return delta
+    for regla in red.reglas_nodo[nodo]:
+        fc = regla.fc
+        for posicion in indice_atributos.get(regla.atributo_esperado, ()):
+            delta[posicion] = delta.get(posicion, 0.0) + fc
+    return delta
+
+
+class CotasCuestionario:
+    """
+    Cotas del puntaje final de cada libro para un cuestionario a medio responder.
+
+    Se construye con el estado (EstadoIncremental) ya actualizado; no lo modifica.
+    """
+
+    def __init__(self, estado, opciones, restantes):
+        """
+        :param estado: EstadoIncremental con las respuestas dadas hasta ahora.
+        :param opciones: {pregunta: [opciones]} del cuestionario.
+        :param restantes: Preguntas que faltan responder.
+        """
+        red = estado.motor.red_reglas
+        libros = estado.libros
+        indice_atributos = libros.indice_atributos
+        self.puntajes = estado.puntajes
+        self.ratings = libros.ratings
+        # Deltas de cada opción de cada pregunta restante: {pregunta: [{posición: delta}]}.
+        self.deltas = {}
+        # Aporte máximo y mínimo de cada pregunta restante: {pregunta: ({pos: max}, {pos: min})}.
+        self.extremos = {}
+        # Cotas totales del puntaje que falta sumar: {posición: U} y {posición: L}.
+        self.superior = {}
+        self.inferior = {}
+        superior, inferior = self.superior, self.inferior
+
+        for pregunta in restantes:
+            deltas = [_deltas_opcion(red, opcion, indice_atributos) for opcion in opciones[pregunta]]
+            maximos, minimos = {}, {}
+            for posicion in set().union(*deltas):
+                valores = [delta.get(posicion, 0.0) for delta in deltas]
+                maximos[posicion] = mayor = max(valores)
+                minimos[posicion] = menor = min(valores)
+                superior[posicion] = superior.get(posicion, 0.0) + mayor
+                inferior[posicion] = inferior.get(posicion, 0.0) + menor
+            self.deltas[pregunta] = deltas
+            self.extremos[pregunta] = (maximos, minimos)
+
+        # Reglas compuestas aún no cumplidas: pueden sumar su FC con cualquier respuesta futura.
+        # {posición: {número_de_regla_pendiente: fc}}, para comparar pares de libros.
+        self.pendientes = {}
+        for numero, regla in enumerate(estado.memoria.reglas_pendientes()):
+            cotas = superior if regla.fc > 0 else inferior
+            for posicion in indice_atributos.get(regla.atributo_esperado, ()):
+                cotas[posicion] = cotas.get(posicion, 0.0) + regla.fc
+                self.pendientes.setdefault(posicion, {})[numero] = regla.fc
+
+    def universo(self):
+        """Posiciones de los libros que están o pueden entrar en el ranking."""
+        return set(self.puntajes).union(self.superior, self.inferior)
+
+    def cota_superior(self, posicion):
+        base = self.puntajes.get(posicion)
+        if base is None:
+            base = self.ratings[posicion]
+        return base + self.superior.get(posicion, 0.0)
+
+    def cota_inferior(self, posicion):
+        """Peor puntaje final; -inf si el libro puede quedar fuera del ranking (sin puntuar)."""
+        base = self.puntajes.get(posicion)
+        if base is None:
+            return -math.inf
+        return base + self.inferior.get(posicion, 0.0)
+
+    def ranking_decidido(self, top, k):
+        """
+        Indica si el top-k actual ya no puede cambiar con ninguna respuesta restante.
+
+        :param top: Posiciones del top-k actual, de mejor a peor.
+        """
+        elegidos = set(top)
+        if len(top) < k:
+            # Con menos de k libros puntuados, cualquier libro que pueda entrar cambia el ranking.
+            return bool(top) and elegidos.issuperset(self.universo())
+        for i in range(len(top) - 1):
+            if not self.supera_siempre(top[i], top[i + 1]):
+                return False
+        ultimo = top[-1]
+        return all(self.supera_siempre(ultimo, posicion)
+                   for posicion in self.universo() if posicion not in elegidos)
+
+    def supera_siempre(self, a, b):
+        """
+        Indica si el libro `a` (ya puntuado) termina por encima de `b` con cualquier
+        combinación de respuestas restantes (si `b` no está puntuado, en caso de que entre).
+        """
+        if self.cota_inferior(a) > self.cota_superior(b) + TOLERANCIA_COTAS:
+            return True
+        base = self.puntajes.get(b)
+        if base is None:
+            base = self.ratings[b]
+        diferencia = self.puntajes[a] - base
+        for deltas in self.deltas.values():
+            diferencia += min(delta.get(a, 0.0) - delta.get(b, 0.0) for delta in deltas)
+        pendientes_a = self.pendientes.get(a, {})
+        pendientes_b = self.pendientes.get(b, {})
+        # Cada compuesta pendiente puede activarse o no: se toma el peor de los dos casos.
+        for numero in pendientes_a.keys() | pendientes_b.keys():
+            diferencia += min(0.0, pendientes_a.get(numero, 0.0) - pendientes_b.get(numero, 0.0))
+        return diferencia > TOLERANCIA_COTAS
+
+    def candidatos(self, k):
+        """Libros que todavía pueden terminar en el top-k."""
+        universo = self.universo()
+        minimo = _k_esimo(k, (self.cota_inferior(posicion) for posicion in universo))
+        return [posicion for posicion in universo
+                if self.cota_superior(posicion) >= minimo - TOLERANCIA_COTAS]
+
+    def ganancia(self, pregunta, candidatos, k):
+        """
+        Ganancia de información (bits) de preguntar `pregunta`, con opciones equiprobables.
+
+        Fijar una opción solo sube cotas inferiores y baja superiores, así que un libro que
+        ya no es candidato no vuelve a serlo: basta recorrer los candidatos actuales.
+        """
+        maximos, minimos = self.extremos[pregunta]
+        puntajes, ratings = self.puntajes, self.ratings
+        superior, inferior = self.superior, self.inferior
+        entropia = 0.0
+        deltas = self.deltas[pregunta]
+        for delta in deltas:
+            cotas = []
+            for posicion in candidatos:
+                aporte = delta.get(posicion)
+                base = puntajes.get(posicion)
+                if base is None:
+                    base = ratings[posicion]
+                    # Sin puntuar y sin tocar por esta opción: puede seguir fuera del ranking.
+                    puntuado = aporte is not None
+                else:
+                    puntuado = True
+                base += aporte or 0.0
+                sup = base + superior.get(posicion, 0.0) - maximos.get(posicion, 0.0)
+                inf = (base + inferior.get(posicion, 0.0) - minimos.get(posicion, 0.0)
+                       if puntuado else -math.inf)
+                cotas.append((sup, inf))
+            minimo = _k_esimo(k, (inf for _, inf in cotas))
+            quedan = sum(1 for sup, _ in cotas if sup >= minimo - TOLERANCIA_COTAS)
+            entropia += math.log2(max(quedan, 1))
+        return math.log2(max(len(candidatos), 1)) - entropia / len(deltas)
+
+
+def _k_esimo(k, valores):
+    """k-ésimo mayor valor (-inf si hay menos de k)."""
+    mayores = heapq.nlargest(k, valores)
+    return mayores[-1] if len(mayores) == k else -math.inf
+
+
+def siguiente_pregunta(estado, k=2):
+    """
+    Elige la próxima pregunta de un cuestionario adaptativo.
+
+    :param estado: EstadoIncremental con las respuestas dadas hasta ahora (al día con el motor).
+    :param k: Tamaño del ranking que debe quedar decidido.
+    :return: (pregunta o None si el top-k ya no puede cambiar o no quedan preguntas,
+              {pregunta: ganancia en bits} de las preguntas evaluadas).
+    """
+    motor = estado.motor
+    opciones = motor.opciones_por_pregunta()
+    restantes = preguntas_restantes(opciones, estado.respuestas())
+    if not restantes:
+        return None, {}
+    if motor.catalogo_sqlite is not None:
+        # Sin puntajes en memoria no hay cotas: se sigue el orden fijo del cuestionario.
+        return restantes[0], {}
+
+    cotas = CotasCuestionario(estado, opciones, restantes)
+    top = [posicion for posicion, _ in estado.posiciones_mejores(k)]
+    if cotas.ranking_decidido(top, k):
+        return None, {}
+    candidatos = cotas.candidatos(k)
+    ganancias = {pregunta: cotas.ganancia(pregunta, candidatos, k) for pregunta in restantes}
+    # Con ganancias iguales gana la primera en el orden del archivo (max conserva la primera).
+    return max(restantes, key=lambda pregunta: ganancias[pregunta]), ganancias
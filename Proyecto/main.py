@@ -1,18 +1,18 @@
 # =========================================================
 # SISTEMA EXPERTO DE RECOMENDACIÓN DE LIBROS (VERSION CORREGIDA CON CARPETA IMAGENES)
 # =========================================================
+import time  # Reloj del informe de tiempos de arranque.
+INICIO_PROCESO = time.perf_counter()  # Referencia del informe: el arranque se mide desde aquí.
 import os  # Módulo para interactuar con el sistema operativo, usado para manejar rutas de archivos.
+from functools import cached_property  # Fuentes creadas la primera vez que se usan.
+from itertools import islice  # Toma páginas del ranking perezoso sin recorrerlo entero.
+from concurrent.futures import ThreadPoolExecutor  # Hilo trabajador para la inferencia (la ventana no se congela).
 import customtkinter as ctk  # Biblioteca para crear la GUI (interfaz de usuario) con un look moderno.
-from PIL import Image  # Módulo Pillow, usado para abrir, redimensionar y manipular imágenes.
-
-# Importamos la clase del motor real
-try:
-    # Intenta importar la lógica del sistema experto que contiene las reglas y el conocimiento.
-    from motor_inferencia import MotorRecomendacion
-except ImportError:
-    # Muestra un error si el archivo del motor no se encuentra y termina la aplicación.
-    print("Error: No se encontró motor_inferencia.py. Asegúrate de que el archivo existe.")
-    exit()
+from servicio_imagenes import ServicioImagenes  # Carátulas decodificadas en segundo plano, con caché.
+import trazador_ui  # Trazado opcional de latencia (variable de entorno SERL_TRAZA_UI).
+from trazador_ui import trazar
+# El motor de inferencia (y con él el catálogo) se importa y carga en segundo plano mientras se
+# muestra la pantalla de inicio: ver App._cargar_motor.
 
 # --- CONFIGURACIÓN GLOBAL DE COLORES Y FUENTE ---
 COLOR_PRIMARIO = "#D48B9A"       # Color principal (rosa/malva), usado para botones seleccionados o énfasis.
@@ -23,6 +23,29 @@ COLOR_FONDO_INACTIVO = "#ECE0E4" # Color de fondo si no se puede cargar la image
 
 FUENTE_PRINCIPAL = "Arial"   # Tipo de fuente base.
 IMAGEN_FONDO = "fondo_app.jpg"  # Nombre del archivo de imagen de fondo.
+LIBROS_POR_PAGINA = 10  # Libros que se piden al motor en cada página de la lista de resultados.
+LIBROS_RESULTADO = 50  # Máximo de libros en la lista de resultados (se cargan por páginas al desplazarse).
+# Primeros de la lista que el cuestionario adaptativo deja decididos antes de terminar. Si
+# termina antes de la última pregunta, el resto de la lista se ordena solo con las respuestas
+# dadas (podría cambiar con las que faltan) y la pantalla de resultados lo avisa.
+LIBROS_DESTACADOS = 2
+ALTO_FILA = 160  # Alto (px) de cada fila de la lista: tarjeta de 140 px más la separación.
+ALTO_LISTA = 340  # Alto (px) visible de la lista de resultados (unas dos tarjetas).
+FILAS_ANTES_DE_PAGINAR = 3  # Filas del final a las que hay que acercarse para pedir la siguiente página.
+PASO_RUEDA = 40  # Píxeles que desplaza la lista cada paso de la rueda del ratón.
+LIBROS_PRECARGA = 4  # Carátulas de los primeros del ranking que se preparan mientras se responde.
+TAMANO_PORTADA = (80, 110)  # Tamaño de la carátula en las tarjetas de resultado.
+TAMANO_FONDO = (550, 650)  # Tamaño de la imagen de fondo (el de la ventana).
+INTERVALO_REVISION_MS = 30  # Cada cuánto revisa la ventana si la inferencia en segundo plano terminó.
+# Pantalla y variable de control de cada pregunta (campo 'pregunta' de las reglas), en el
+# orden fijo del cuestionario. El motor decide en qué orden se hacen.
+PANTALLAS_PREGUNTA = {
+    "Genero": ("GenreFrame", "var_genero"),
+    "Ritmo": ("RhythmFrame", "var_ritmo"),
+    "Complejidad": ("ComplexityFrame", "var_complejidad"),
+    "Motivacion": ("MotivationFrame", "var_motivacion"),
+    "Compromiso": ("CommitmentFrame", "var_compromiso"),
+}
 
 # Rutas del proyecto
 # Obtiene el directorio base donde se ejecuta el script.
@@ -67,6 +90,13 @@ class IntroFrame(ctk.CTkFrame):
                                           width=250, height=55, corner_radius=28) 
         # Posiciona el botón en la parte inferior central (s).
         self.start_button.grid(row=1, column=0, pady=(50, 50), sticky="s")
+        if controller.estado is None:
+            # El motor todavía se está cargando en segundo plano.
+            self.start_button.configure(state="disabled", text="Cargando...")
+
+    def habilitar_inicio(self):
+        """Activa el botón "Comenzar" una vez que el motor está cargado."""
+        self.start_button.configure(state="normal", text="Comenzar")
 
     def update_buttons(self):
         """Método placeholder, no hace nada en la pantalla de inicio."""
@@ -94,9 +124,15 @@ class BaseQuestionFrame(ctk.CTkFrame):
         
         # Contenedor para los botones de opciones de respuesta.
         self.options_container = ctk.CTkFrame(self.content_card, fg_color="transparent")
-        self.options_container.grid(row=1, column=0, padx=20, pady=(10, 20), sticky="ew")
+        self.options_container.grid(row=1, column=0, padx=20, pady=(10, 5), sticky="ew")
         self.options_container.grid_columnconfigure(0, weight=1)
 
+        # Vista previa de la mejor coincidencia con las respuestas dadas hasta ahora.
+        self.preview_label = ctk.CTkLabel(self.content_card, text="", 
+                                          font=controller.font_card_info, 
+                                          text_color=COLOR_SECUNDARIO, wraplength=300)
+        self.preview_label.grid(row=2, column=0, padx=20, pady=(0, 15))
+
         # Botón de retroceso (izquierda).
         self.back_button = ctk.CTkButton(self, text="←", 
                                          width=50, height=50, corner_radius=25, 
@@ -119,13 +155,20 @@ class BaseQuestionFrame(ctk.CTkFrame):
 
         self.next_button.grid(row=1, column=2, padx=20, pady=(20, 0), sticky="e")
     
+    @trazar(inicia=True)
     def select_option(self, value, variable, buttons_list):
         """
         Lógica para manejar la selección de una opción (radio button estilizado).
         Establece el valor en la variable de control y actualiza el color de los botones.
         """
         variable.set(value)
-        
+        # Aplica de inmediato el delta de esta respuesta en el motor incremental.
+        self.controller.registrar_respuesta(value)
+        self.update_preview()
+        self.marcar_opcion(value, buttons_list)
+
+    def marcar_opcion(self, value, buttons_list):
+        """Resalta el botón de `value` y deja los demás como inactivos (None: ninguno resaltado)."""
         for btn_info in buttons_list:
             button_widget = btn_info['widget']
             button_value = btn_info['value']
@@ -149,6 +192,17 @@ class BaseQuestionFrame(ctk.CTkFrame):
             self.back_button.grid() # Muestra el botón de retroceso en los demás pasos.
         
         self.next_button.grid() # El botón de avance siempre está visible en las preguntas.
+        self.update_preview()
+
+    def update_preview(self):
+        """Muestra el libro que encabeza el ranking con las respuestas aplicadas hasta ahora."""
+        mejores = self.controller.estado.mejores(LIBROS_PRECARGA)
+        # Las carátulas de los candidatos actuales se preparan mientras el usuario sigue respondiendo.
+        self.controller.precargar_portadas(mejores)
+        if mejores:
+            self.preview_label.configure(text=f"Mejor coincidencia hasta ahora: {mejores[0]['Titulo']}")
+        else:
+            self.preview_label.configure(text="")
 
 # --- Frame de Pregunta: Género ---
 class GenreFrame(BaseQuestionFrame):
@@ -372,23 +426,31 @@ class BookCard(ctk.CTkFrame):
                                         font=controller.font_card_info, text_color=COLOR_TEXTO_OSCURO)
         self.info_label.grid(row=1, column=0, sticky="w")
         
+    @trazar()
     def update_image(self, image_filename):
-        """Carga y muestra la imagen del libro."""
-        try:
-            # 💡 Cambio Clave: Usar IMAGENES_DIR para construir la ruta al archivo.
-            image_path = os.path.join(IMAGENES_DIR, image_filename) 
-            # Abre y redimensiona la imagen usando PIL.
-            img = Image.open(image_path).resize((80, 110))
-            # Convierte la imagen PIL a un formato de imagen compatible con ctk.
-            ctk_img = ctk.CTkImage(light_image=img, size=(80, 110))
-            
-            self.image_label.image = ctk_img
-            
-            # Configura la etiqueta para mostrar la imagen.
-            self.image_label.configure(image=ctk_img, text="", fg_color="transparent")
-        except Exception:
+        """Pide la imagen del libro al servicio de imágenes; se muestra en cuanto está lista."""
+        # 💡 Cambio Clave: Usar IMAGENES_DIR para construir la ruta al archivo.
+        image_path = os.path.join(IMAGENES_DIR, image_filename)
+        # Ruta que esta tarjeta espera: una carátula pedida antes y que llega tarde se descarta.
+        self.imagen_pedida = image_path
+        lista = self.controller.imagenes.solicitar(
+            image_path, TAMANO_PORTADA, lambda ctk_img: self.mostrar_imagen(image_path, ctk_img))
+        if lista is None:
+            # Mientras el trabajador la prepara, se muestra el recuadro vacío.
+            self.image_label.configure(image=None, text="", fg_color=COLOR_SECUNDARIO)
+
+    @trazar()
+    def mostrar_imagen(self, image_path, ctk_img):
+        """Muestra la carátula preparada (o el texto de placeholder si no se pudo cargar)."""
+        if image_path != self.imagen_pedida:
+            return
+        if ctk_img is None:
             # En caso de error (imagen no encontrada), muestra un texto de placeholder.
             self.image_label.configure(image=None, text="No Image", fg_color=COLOR_SECUNDARIO)
+            return
+        self.image_label.image = ctk_img
+        # Configura la etiqueta para mostrar la imagen.
+        self.image_label.configure(image=ctk_img, text="", fg_color="transparent")
             
     def update_info(self, titulo, autor, puntaje):
         """Actualiza las etiquetas de texto con la información del libro."""
@@ -397,6 +459,150 @@ class BookCard(ctk.CTkFrame):
                      f"Afinidad Total: {puntaje:.2f}")
         self.info_label.configure(text=info_text)
 
+# --- Lista de Resultados Desplazable ---
+class ListaResultados(ctk.CTkFrame):
+    """
+    Lista desplazable de recomendaciones que reutiliza unas pocas BookCard.
+
+    Solo existen las tarjetas que caben en la zona visible (más una): al desplazarse, cada
+    tarjeta se recoloca y recibe el libro de la fila que le toca, así que construir la lista
+    no depende de cuántos libros tenga el ranking. Las carátulas se piden cuando su fila
+    entra en la zona visible, y las siguientes páginas del ranking se piden al motor cuando
+    el usuario se acerca al final.
+
+    Si el cuestionario terminó antes de la última pregunta, solo las primeras filas son
+    definitivas (ver mostrar); un aviso bajo la lista lo indica.
+    """
+    def __init__(self, parent, controller):
+        super().__init__(parent, fg_color="transparent")
+        self.controller = controller
+        self.grid_columnconfigure(0, weight=1)
+
+        # Zona visible: las tarjetas se colocan con place() y Tk recorta lo que queda fuera.
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent", height=ALTO_LISTA)
+        self.viewport.grid(row=0, column=0, sticky="ew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.mover_barra,
+                                          button_color=COLOR_SECUNDARIO, button_hover_color=COLOR_PRIMARIO)
+        self.scrollbar.grid(row=0, column=1, sticky="ns", padx=(5, 0))
+
+        # Aviso de que solo las primeras filas son definitivas (cuestionario terminado antes).
+        self.aviso_label = ctk.CTkLabel(self, text="", font=controller.font_card_info,
+                                        text_color=COLOR_SECUNDARIO, wraplength=400, justify="center")
+
+        # Mensaje para una búsqueda sin resultados.
+        self.vacio_label = ctk.CTkLabel(self.viewport, text="No se encontró una recomendación adecuada.",
+                                        font=controller.font_card_info, text_color=COLOR_TEXTO_OSCURO)
+
+        # Conjunto de tarjetas reutilizables y la fila que muestra cada una (None si está libre).
+        self.tarjetas = [BookCard(self.viewport, controller) for _ in range(-(-ALTO_LISTA // ALTO_FILA) + 1)]
+        self.filas_tarjetas = [None] * len(self.tarjetas)
+        self._enlazar_rueda(self.viewport) # Incluye las tarjetas (son hijas de la zona visible).
+
+        self.resultados = [] # Libros recibidos hasta ahora, en el orden del ranking.
+        self.desplazamiento = 0 # Píxeles desplazados desde la primera fila.
+        self.completo = True # True si el motor ya no tiene más libros que dar (o se llegó al máximo).
+        self.cargando = False # True mientras se espera la siguiente página.
+
+    def _enlazar_rueda(self, widget):
+        """Desplaza la lista con la rueda del ratón sobre cualquier parte de ella."""
+        widget.bind("<MouseWheel>", self.rueda, add="+") # Windows y macOS.
+        widget.bind("<Button-4>", self.rueda, add="+") # Linux (arriba).
+        widget.bind("<Button-5>", self.rueda, add="+") # Linux (abajo).
+        for hijo in widget.winfo_children():
+            self._enlazar_rueda(hijo)
+
+    def mostrar(self, recomendaciones, definitivos=None):
+        """
+        Muestra la primera página de una búsqueda nueva, desde arriba.
+
+        :param definitivos: Cuántas de las primeras filas no cambiarían con las preguntas que
+                            no se hicieron (None si se respondieron todas: la lista es final).
+        """
+        if definitivos is None:
+            self.aviso_label.grid_remove()
+        else:
+            self.aviso_label.configure(
+                text=f"Las {definitivos} primeras recomendaciones son definitivas; el resto se "
+                     f"ordena solo con las preguntas respondidas.")
+            self.aviso_label.grid(row=1, column=0, columnspan=2, pady=(5, 0))
+        self.resultados = list(recomendaciones[:LIBROS_RESULTADO])
+        self.completo = len(recomendaciones) < LIBROS_POR_PAGINA or len(self.resultados) >= LIBROS_RESULTADO
+        self.cargando = False
+        self.desplazamiento = 0
+        # Las tarjetas se reasignan todas: pueden mostrar libros de la búsqueda anterior.
+        self.filas_tarjetas = [None] * len(self.tarjetas)
+        if self.resultados:
+            self.vacio_label.place_forget()
+        else:
+            self.vacio_label.place(relx=0.5, rely=0.5, anchor="center")
+        self.dibujar()
+
+    def agregar(self, siguientes, pedidos):
+        """Añade al final una página del ranking (de `pedidos` libros como mucho)."""
+        self.resultados.extend(siguientes[:LIBROS_RESULTADO - len(self.resultados)])
+        self.completo = len(siguientes) < pedidos or len(self.resultados) >= LIBROS_RESULTADO
+        self.cargando = False
+        self.dibujar()
+
+    def alto_total(self):
+        return len(self.resultados) * ALTO_FILA
+
+    @trazar(inicia=True)
+    def desplazar(self, pixeles):
+        """Mueve la lista `pixeles` hacia abajo (negativo: hacia arriba)."""
+        self.ir_a(self.desplazamiento + pixeles)
+
+    def ir_a(self, desplazamiento):
+        maximo = max(self.alto_total() - ALTO_LISTA, 0)
+        desplazamiento = min(max(int(desplazamiento), 0), maximo)
+        if desplazamiento != self.desplazamiento:
+            self.desplazamiento = desplazamiento
+            self.dibujar()
+
+    def rueda(self, event):
+        """Un paso de la rueda del ratón."""
+        hacia_arriba = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.desplazar(-PASO_RUEDA if hacia_arriba else PASO_RUEDA)
+
+    def mover_barra(self, accion, valor, unidad=None):
+        """Recibe los movimientos de la barra de desplazamiento (protocolo de Tk)."""
+        if accion == "moveto":
+            self.ir_a(float(valor) * self.alto_total())
+        elif accion == "scroll":
+            paso = ALTO_LISTA if unidad == "pages" else PASO_RUEDA
+            self.desplazar(int(valor) * paso)
+
+    def dibujar(self):
+        """Coloca las tarjetas de las filas visibles y les asigna su libro si cambió."""
+        primera = self.desplazamiento // ALTO_FILA
+        for i, tarjeta in enumerate(self.tarjetas):
+            # Cada tarjeta muestra siempre la misma fila módulo el tamaño del conjunto: al
+            # desplazarse una fila, solo la tarjeta que sale por arriba se recicla abajo.
+            fila = primera + (i - primera) % len(self.tarjetas)
+            if fila >= len(self.resultados):
+                tarjeta.place_forget()
+                self.filas_tarjetas[i] = None
+                continue
+            if self.filas_tarjetas[i] != fila:
+                libro = self.resultados[fila]
+                tarjeta.update_info(libro['Titulo'], libro['Autor'], libro['Puntaje_Total'])
+                tarjeta.update_image(libro['Ruta_Imagen']) # La carátula se pide al entrar en vista.
+                self.filas_tarjetas[i] = fila
+            tarjeta.place(x=0, y=fila * ALTO_FILA - self.desplazamiento, relwidth=1.0)
+
+        total = self.alto_total()
+        if total > ALTO_LISTA:
+            self.scrollbar.set(self.desplazamiento / total, (self.desplazamiento + ALTO_LISTA) / total)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        ultima = (self.desplazamiento + ALTO_LISTA) // ALTO_FILA
+        # Las carátulas de las filas que vienen a continuación se preparan antes de verlas.
+        self.controller.precargar_portadas(self.resultados[ultima + 1:ultima + 1 + LIBROS_PRECARGA])
+        if not self.completo and not self.cargando and ultima >= len(self.resultados) - FILAS_ANTES_DE_PAGINAR:
+            self.cargando = True
+            self.controller.mostrar_mas()
+
 # --- Frame de Resultados Finales ---
 class ResultFrame(ctk.CTkFrame):
     """Frame que muestra las recomendaciones finales de los libros."""
@@ -414,17 +620,9 @@ class ResultFrame(ctk.CTkFrame):
                                          font=controller.font_pregunta, text_color=COLOR_TEXTO_OSCURO)
         self.label_titulo.grid(row=0, column=0, pady=(20, 10))
         
-        # Contenedor para las tarjetas de libros.
-        self.cards_container = ctk.CTkFrame(self.result_card, fg_color="transparent")
-        self.cards_container.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
-        self.cards_container.grid_columnconfigure(0, weight=1)
-        
-        # Instancia de las dos tarjetas de libros.
-        self.book_card_1 = BookCard(self.cards_container, controller)
-        self.book_card_2 = BookCard(self.cards_container, controller)
-        
-        self.book_card_1.grid(row=0, column=0, padx=0, pady=10, sticky="ew")
-        self.book_card_2.grid(row=1, column=0, padx=0, pady=10, sticky="ew")
+        # Lista desplazable con las recomendaciones (las tarjetas se reutilizan al desplazarse).
+        self.lista = ListaResultados(self.result_card, controller)
+        self.lista.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
         
         # Botón para reiniciar la aplicación.
         self.start_over_button = ctk.CTkButton(self.result_card, text="Volver a Empezar", 
@@ -435,50 +633,87 @@ class ResultFrame(ctk.CTkFrame):
                                                font=controller.font_button,
                                                width=250, height=55, corner_radius=28) 
                                                        
-        self.start_over_button.grid(row=2, column=0, padx=10, pady=(30, 20))
+        self.start_over_button.grid(row=3, column=0, padx=10, pady=(10, 20))
 
+        # Aviso mientras llega la siguiente página del ranking (se pide al desplazarse hacia el final).
+        self.pagina_label = ctk.CTkLabel(self.result_card, text="Cargando más recomendaciones...",
+                                         font=controller.font_card_info, text_color=COLOR_SECUNDARIO)
 
-    def update_results(self, recomendaciones):
-        """Recibe una lista de diccionarios con la información completa de los libros y actualiza las tarjetas."""
-        card_widgets = [self.book_card_1, self.book_card_2]
-        
-        if not recomendaciones:
-            # Caso sin resultados: muestra un mensaje de error o inactividad.
-            self.book_card_1.update_info("No se encontró una recomendación adecuada.", "Motor inactivo", 0.0)
-            self.book_card_1.update_image("no_image.jpg")
-            self.book_card_2.grid_remove() # Oculta la segunda tarjeta.
+        # Estado de progreso mientras la inferencia corre en segundo plano (ocupa el lugar de las tarjetas).
+        self.progress_container = ctk.CTkFrame(self.result_card, fg_color="transparent")
+        self.progress_container.grid_columnconfigure(0, weight=1)
+        self.progress_label = ctk.CTkLabel(self.progress_container, text="Calculando recomendaciones...",
+                                           font=controller.font_opcion, text_color=COLOR_TEXTO_OSCURO)
+        self.progress_label.grid(row=0, column=0, pady=(30, 10))
+        self.progress_bar = ctk.CTkProgressBar(self.progress_container, mode="indeterminate",
+                                               progress_color=COLOR_PRIMARIO, width=250)
+        self.progress_bar.grid(row=1, column=0, pady=(0, 30))
+
+        # Botón para volver a la última pregunta; solo se muestra mientras se calcula (cancela la inferencia).
+        self.back_button = ctk.CTkButton(self.result_card, text="Volver", 
+                                         command=controller.go_back,
+                                         fg_color=COLOR_SECUNDARIO, 
+                                         hover_color="#918187", 
+                                         text_color=COLOR_TEXTO_OSCURO, 
+                                         font=controller.font_button,
+                                         width=250, height=45, corner_radius=28) 
+
+    def mostrar_progreso(self, nueva_busqueda=True):
+        """
+        Muestra el estado "Calculando..." mientras la inferencia corre en segundo plano.
+
+        :param nueva_busqueda: Si es True se oculta la lista (es de una búsqueda anterior); al
+                               pedir la siguiente página se conserva y solo se muestra un aviso.
+        """
+        if not nueva_busqueda:
+            self.pagina_label.grid(row=2, column=0, padx=10, pady=(0, 0))
             return
+        self.lista.grid_remove()
+        self.pagina_label.grid_remove()
+        self.progress_container.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
+        self.back_button.grid(row=2, column=0, padx=10, pady=(20, 0))
+        self.progress_bar.start()
 
-        # Itera sobre las dos primeras recomendaciones (si existen).
-        for i, libro_info in enumerate(recomendaciones[:2]):
-            if i < len(card_widgets):
-                card = card_widgets[i]
-                
-                # Accedemos a los datos directamente del diccionario.
-                titulo = libro_info['Titulo']
-                autor = libro_info['Autor']
-                puntaje = libro_info['Puntaje_Total']
-                ruta_imagen = libro_info['Ruta_Imagen']
-                
-                card.update_info(titulo, autor, puntaje)
-                card.update_image(ruta_imagen)
-                card.grid() # Asegura que la tarjeta esté visible.
-            
-        # Controla la visibilidad de la segunda tarjeta si solo hay una recomendación.
-        if len(recomendaciones) < 2:
-            self.book_card_2.grid_remove()
-        elif len(recomendaciones) >= 2:
-            self.book_card_2.grid(row=1, column=0, padx=0, pady=10, sticky="ew")
+    def ocultar_progreso(self):
+        """Quita el estado de progreso y vuelve a mostrar las tarjetas."""
+        self.progress_bar.stop()
+        self.progress_container.grid_remove()
+        self.back_button.grid_remove()
+        self.pagina_label.grid_remove()
+        self.lista.grid()
+
+    @trazar()
+    def update_results(self, recomendaciones):
+        """Recibe la primera página del ranking (lista de diccionarios) y la muestra en la lista."""
+        self.ocultar_progreso()
+        self.lista.mostrar(recomendaciones, self.controller.libros_definitivos)
+
+    @trazar()
+    def agregar_resultados(self, siguientes, pedidos):
+        """Añade al final de la lista una página más del ranking."""
+        self.ocultar_progreso()
+        self.lista.agregar(siguientes, pedidos)
 
+    @trazar(inicia=True)
     def reset_app(self):
         """Reinicia el estado de la aplicación para comenzar un nuevo cuestionario."""
+        # Una inferencia todavía en curso ya no interesa: su resultado se descarta.
+        self.controller.cancelar_tarea()
+        self.ocultar_progreso()
         self.controller.current_step = 0
-        # Restablece todas las variables de respuesta a None.
-        self.controller.var_genero.set(None) 
-        self.controller.var_ritmo.set(None)
-        self.controller.var_complejidad.set(None) 
-        self.controller.var_motivacion.set(None) 
-        self.controller.var_compromiso.set(None) 
+        self.controller.preguntas_hechas = []
+        # Vacía las respuestas ("" y no None: un StringVar guardaría el texto "None", que pasaría
+        # la validación de go_next y llegaría como respuesta al motor) y quita el botón resaltado.
+        for frame_name, nombre_variable in PANTALLAS_PREGUNTA.values():
+            getattr(self.controller, nombre_variable).set("")
+            frame = self.controller.frames.get(frame_name)
+            if frame is not None:
+                frame.marcar_opcion(None, frame.option_buttons)
+        # Descarta los puntajes incrementales y el ranking del cuestionario anterior.
+        self.controller.estado.reiniciar()
+        self.controller.respuestas_actuales = []
+        self.controller.ranking = None
+        self.controller.libros_definitivos = None
         # Vuelve a mostrar la pantalla de introducción.
         self.controller.show_frame("IntroFrame")
 
@@ -489,6 +724,7 @@ class ResultFrame(ctk.CTkFrame):
 class App(ctk.CTk):
     """Clase principal que gestiona la ventana, el estado y la navegación."""
     def __init__(self, bg_image_name):
+        fin_importaciones = self._ms_desde_inicio()
         super().__init__()
         
         self.title("SERL - Sistema Experto de Recomendación")
@@ -500,43 +736,51 @@ class App(ctk.CTk):
         ctk.set_appearance_mode("Light") # Configura el tema claro.
 
         # --- IMAGEN DE FONDO ---
+        # Decodifica y redimensiona imágenes en un hilo trabajador (con caché en memoria y en disco).
+        self.imagenes = ServicioImagenes(self)
         self.bg_image = None
-        self.bg_label = None
-        try:
-            # Carga la imagen de fondo, asumiendo que está en BASE_DIR.
-            image_path = os.path.join(BASE_DIR, bg_image_name) 
-            img = Image.open(image_path).resize((550, 650))
-            self.bg_image = ctk.CTkImage(light_image=img, size=img.size)
-            self.bg_label = ctk.CTkLabel(self, text="", image=self.bg_image)
-            # Coloca la imagen para que cubra toda la ventana.
-            self.bg_label.place(x=0, y=0, relwidth=1, relheight=1) 
-            self.configure(fg_color="transparent") 
-        except Exception:
-            # Si no se carga la imagen, usa el color de fondo inactivo.
-            self.configure(fg_color=COLOR_FONDO_INACTIVO) 
-            
+        # La etiqueta se crea ya (antes que los frames, para quedar debajo) y recibe la imagen al llegar.
+        self.bg_label = ctk.CTkLabel(self, text="")
+        # Coloca la imagen para que cubra toda la ventana.
+        self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
+        # Hasta que la imagen esté lista (o si no se puede cargar), usa el color de fondo inactivo.
+        self.configure(fg_color=COLOR_FONDO_INACTIVO)
+        # Carga la imagen de fondo, asumiendo que está en BASE_DIR.
+        self.imagenes.solicitar(os.path.join(BASE_DIR, bg_image_name), TAMANO_FONDO, self.mostrar_fondo)
+
         # --- CONFIGURACIÓN DEL MOTOR ---
-        self.motor = MotorRecomendacion() # Instancia el motor de inferencia.
-        self.motor.cargar_reglas() # Carga las reglas lógicas (e.g., IF genero AND ritmo THEN libro).
-        self.motor.cargar_conocimiento_json() # Carga la base de hechos (e.g., la lista de libros).
-
-        # --- FUENTES ---
-        self.font_pregunta = ctk.CTkFont(family=FUENTE_PRINCIPAL, size=22, weight="bold")
-        self.font_opcion = ctk.CTkFont(family=FUENTE_PRINCIPAL, size=16, weight="normal")
-        self.font_button = ctk.CTkFont(family=FUENTE_PRINCIPAL, size=16, weight="bold")
-        self.font_card_title = ctk.CTkFont(family=FUENTE_PRINCIPAL, size=16, weight="bold")
-        self.font_card_info = ctk.CTkFont(family=FUENTE_PRINCIPAL, size=14, weight="normal")
-        self.font_intro = ctk.CTkFont(family=FUENTE_PRINCIPAL, size=30, weight="bold")
-        
+        # La carga del motor, la inferencia final y las páginas siguientes de la lista corren
+        # en este hilo; la ventana revisa el resultado con after().
+        self.ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inferencia")
+        # Tarea en curso: (futuro, función que recibe el resultado), o None.
+        self.tarea = None
+        self.protocol("WM_DELETE_WINDOW", self.cerrar)
+        # Motor y estado incremental: None hasta que termina la carga en segundo plano.
+        self.motor = None
+        self.estado = None
+        # Informe de arranque: (etapa, milisegundos desde el inicio del proceso).
+        self.tiempos_arranque = [("importaciones", fin_importaciones), ("ventana y fondo", self._ms_desde_inicio())]
+        # Duración de cada etapa de _cargar_motor: [(etapa, ms)].
+        self.etapas_motor = []
+        self.primer_pintado = False
+        carga = self.ejecutor.submit(self._cargar_motor)
+        self.after(INTERVALO_REVISION_MS, self._revisar_carga, carga)
+
         # --- VARIABLES DE CONTROL ---
         self.current_step = 0 # Contador para el paso actual (0=Intro, 1-5=Preguntas, 6=Resultado).
+        # Preguntas hechas, en el orden en que se hicieron (el paso n es la n-ésima de la lista).
+        self.preguntas_hechas = []
         self.max_steps = 5 # Número total de preguntas.
         # Variables de control que almacenan la respuesta del usuario para cada pregunta.
-        self.var_genero = ctk.StringVar(value=None) 
-        self.var_ritmo = ctk.StringVar(value=None)
-        self.var_complejidad = ctk.StringVar(value=None)
-        self.var_motivacion = ctk.StringVar(value=None) 
-        self.var_compromiso = ctk.StringVar(value=None) 
+        self.var_genero = ctk.StringVar(value="") 
+        self.var_ritmo = ctk.StringVar(value="")
+        self.var_complejidad = ctk.StringVar(value="")
+        self.var_motivacion = ctk.StringVar(value="") 
+        self.var_compromiso = ctk.StringVar(value="") 
+        # Ranking perezoso de la última inferencia (se consume página a página al desplazar la lista).
+        self.respuestas_actuales = []
+        self.ranking = None
+        self.libros_definitivos = None # Filas definitivas de la lista (None: todas).
 
         # --- CONTENEDOR PRINCIPAL ---
         # Marco transparente que contendrá todas las pantallas (Frames).
@@ -546,89 +790,285 @@ class App(ctk.CTk):
         self.main_container.grid_rowconfigure(0, weight=1)
 
         # --- SISTEMA DE GESTIÓN DE PÁGINAS ---  
+        # Clase de cada pantalla por su nombre; cada frame se construye la primera vez que se muestra.
+        self.clases_frames = {F.__name__: F for F in (IntroFrame, GenreFrame, RhythmFrame, ComplexityFrame,
+                                                      MotivationFrame, CommitmentFrame, ResultFrame)}
         self.frames = {} # Diccionario para almacenar las instancias de cada frame por su nombre.
-        
-        # Itera sobre todas las clases de frame.
-        for F in (IntroFrame, GenreFrame, RhythmFrame, ComplexityFrame, MotivationFrame, CommitmentFrame, ResultFrame):
-            frame = F(self.main_container, self) # Instancia el frame.
-            self.frames[F.__name__] = frame # Almacena la instancia en el diccionario.
-            # Coloca todos los frames en la misma posición (se usa tkraise para alternar la vista).
-            frame.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
 
         # Inicia la interfaz mostrando la pantalla de introducción.
         self.show_frame("IntroFrame")
+        self.tiempos_arranque.append(("pantalla de inicio", self._ms_desde_inicio()))
+        self.after_idle(self._marcar_primer_pintado)
+        # Con SERL_TRAZA_UI, cada interacción se mide hasta que no queda inferencia en curso
+        # ni tarjetas esperando su carátula (los precargados no cuentan).
+        trazador_ui.instalar(self, pantalla=lambda: self.pantalla_actual,
+                             ocupado=lambda: self.tarea is not None
+                             or any(self.imagenes.pendientes.values()))
+
+    # --- FUENTES ---
+    # Se crean la primera vez que un frame las usa (la pantalla de inicio solo necesita dos).
+    @cached_property
+    def font_pregunta(self):
+        return ctk.CTkFont(family=FUENTE_PRINCIPAL, size=22, weight="bold")
+
+    @cached_property
+    def font_opcion(self):
+        return ctk.CTkFont(family=FUENTE_PRINCIPAL, size=16, weight="normal")
+
+    @cached_property
+    def font_button(self):
+        return ctk.CTkFont(family=FUENTE_PRINCIPAL, size=16, weight="bold")
+
+    @cached_property
+    def font_card_title(self):
+        return ctk.CTkFont(family=FUENTE_PRINCIPAL, size=16, weight="bold")
+
+    @cached_property
+    def font_card_info(self):
+        return ctk.CTkFont(family=FUENTE_PRINCIPAL, size=14, weight="normal")
+
+    @cached_property
+    def font_intro(self):
+        return ctk.CTkFont(family=FUENTE_PRINCIPAL, size=30, weight="bold")
+
+    # --- ARRANQUE ---
+    @staticmethod
+    def _ms_desde_inicio():
+        return (time.perf_counter() - INICIO_PROCESO) * 1000.0
 
+    def _cargar_motor(self):
+        """
+        Importa y carga el motor (se ejecuta en el hilo trabajador, mientras se ve la pantalla de inicio).
+
+        :return: (motor, estado_incremental, [(etapa, ms)]) con la duración de cada etapa.
+        """
+        etapas = []
+        inicio = time.perf_counter()
+        def medir(etapa):
+            nonlocal inicio
+            ahora = time.perf_counter()
+            etapas.append((etapa, (ahora - inicio) * 1000.0))
+            inicio = ahora
+
+        # Intenta importar la lógica del sistema experto que contiene las reglas y el conocimiento.
+        from motor_inferencia import MotorRecomendacion
+        medir("importar motor")
+        motor = MotorRecomendacion() # Instancia el motor de inferencia.
+        motor.cargar_reglas() # Carga las reglas lógicas (e.g., IF genero AND ritmo THEN libro).
+        medir("cargar reglas")
+        motor.cargar_conocimiento_json() # Carga la base de hechos (e.g., la lista de libros).
+        medir("cargar catálogo")
+        # Precalcula en segundo plano las recomendaciones de todas las combinaciones de respuestas.
+        motor.precalcular_espacio_respuestas(k=LIBROS_POR_PAGINA)
+        # Puntuación incremental: cada respuesta se aplica en cuanto se elige.
+        estado = motor.crear_estado_incremental()
+        medir("estado incremental")
+        return motor, estado, etapas
+
+    def _revisar_carga(self, carga):
+        """Publica el motor cargado en segundo plano y habilita el cuestionario (hilo de Tk)."""
+        if not carga.done():
+            self.after(INTERVALO_REVISION_MS, self._revisar_carga, carga)
+            return
+        try:
+            self.motor, self.estado, etapas = carga.result()
+        except ImportError:
+            # Muestra un error si el archivo del motor no se encuentra y termina la aplicación.
+            print("Error: No se encontró motor_inferencia.py. Asegúrate de que el archivo existe.")
+            self.cerrar()
+            return
+        self.tiempos_arranque.append(("motor listo", self._ms_desde_inicio()))
+        self.etapas_motor = etapas
+        self.obtener_frame("IntroFrame").habilitar_inicio()
+        self._informar_arranque()
+
+    def _marcar_primer_pintado(self):
+        """Registra el momento en que la pantalla de inicio quedó dibujada."""
+        self.update_idletasks()
+        self.tiempos_arranque.append(("primer pintado", self._ms_desde_inicio()))
+        self.primer_pintado = True
+        self._informar_arranque()
+
+    def _informar_arranque(self):
+        """Imprime dónde se fue el tiempo de arranque, cuando ya hay pintado y motor."""
+        if not self.primer_pintado or self.motor is None:
+            return
+        print("⏱️ Tiempos de arranque (ms desde el inicio del proceso):")
+        for etapa, ms in sorted(self.tiempos_arranque, key=lambda t: t[1]):
+            print(f"   {etapa:<22}{ms:9.1f}")
+        print("   Carga del motor en segundo plano (ms por etapa):")
+        for etapa, ms in self.etapas_motor:
+            print(f"     {etapa:<20}{ms:9.1f}")
+
+    def obtener_frame(self, frame_name):
+        """Devuelve el frame pedido, construyéndolo si es la primera vez que se usa."""
+        frame = self.frames.get(frame_name)
+        if frame is None:
+            frame = self.clases_frames[frame_name](self.main_container, self) # Instancia el frame.
+            self.frames[frame_name] = frame # Almacena la instancia en el diccionario.
+            # Coloca todos los frames en la misma posición (se usa tkraise para alternar la vista).
+            frame.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
+        return frame
+
+    @trazar()
     def show_frame(self, frame_name):
         """Muestra un frame específico y lo trae al frente."""
-        frame = self.frames[frame_name]
+        self.pantalla_actual = frame_name
+        frame = self.obtener_frame(frame_name)
         frame.tkraise() # Trae el frame deseado al frente.
         if hasattr(frame, 'update_buttons'):
             # Llama al método update_buttons para actualizar el estado del botón 'atrás'.
             frame.update_buttons()
             
     # --- NAVEGACIÓN ---
+    @trazar(inicia=True)
     def go_next(self):
-        """Avanza al siguiente paso (pregunta) o ejecuta la inferencia si es el último paso."""
+        """Avanza a la siguiente pregunta o ejecuta la inferencia si el ranking ya está decidido."""
         if self.current_step == 0:
-            self.current_step = 1
-            self.show_frame("GenreFrame")
+            self.mostrar_siguiente_pregunta()
             return
-        elif self.current_step == 1:
-            if self.var_genero.get() in [None, ""]: return # Validación: No avanza si no hay selección.
-            self.current_step = 2
-            self.show_frame("RhythmFrame")
-        elif self.current_step == 2:
-            if self.var_ritmo.get() in [None, ""]: return # Validación.
-            self.current_step = 3
-            self.show_frame("ComplexityFrame")
-        elif self.current_step == 3:
-            if self.var_complejidad.get() in [None, ""]: return # Validación.
-            self.current_step = 4
-            self.show_frame("MotivationFrame") 
-        elif self.current_step == 4:
-            if self.var_motivacion.get() in [None, ""]: return # Validación.
-            self.current_step = 5
-            self.show_frame("CommitmentFrame") 
-        elif self.current_step == 5: 
-            if self.var_compromiso.get() in [None, ""]: return # Validación.
+        elif 1 <= self.current_step <= self.max_steps:
+            variable = getattr(self, PANTALLAS_PREGUNTA[self.preguntas_hechas[-1]][1])
+            if variable.get() in [None, ""]: return # Validación: No avanza si no hay selección.
+            self.mostrar_siguiente_pregunta()
+
+    def mostrar_siguiente_pregunta(self):
+        """
+        Muestra la pregunta que el motor elige con las respuestas dadas hasta ahora (la que
+        más acota los libros que aún pueden quedar primeros). Si las preguntas restantes ya no
+        pueden cambiar las recomendaciones, o no quedan, se pasa directo a los resultados.
+        """
+        pregunta = self.estado.siguiente_pregunta(LIBROS_DESTACADOS)
+        if pregunta not in PANTALLAS_PREGUNTA:
             self.ejecutar_inferencia() # Último paso: ejecuta la lógica del sistema experto.
             return
-        
+        self.preguntas_hechas.append(pregunta)
+        self.current_step = len(self.preguntas_hechas)
+        self.show_frame(PANTALLAS_PREGUNTA[pregunta][0])
+
+    def mostrar_fondo(self, ctk_img):
+        """Coloca la imagen de fondo cuando el servicio de imágenes la entrega."""
+        if ctk_img is None:
+            return
+        self.bg_image = ctk_img
+        self.bg_label.configure(image=ctk_img)
+        self.configure(fg_color="transparent")
+
+    def precargar_portadas(self, libros):
+        """Prepara en segundo plano las carátulas de los libros que probablemente se mostrarán."""
+        self.imagenes.precargar([os.path.join(IMAGENES_DIR, libro['Ruta_Imagen']) for libro in libros],
+                                TAMANO_PORTADA)
+
+    def registrar_respuesta(self, respuesta):
+        """Aplica la respuesta del paso actual al estado incremental del motor."""
+        self.estado.fijar_respuesta(self.current_step, respuesta)
+
+    @trazar(inicia=True)
     def go_back(self):
-        """Retrocede al paso (pregunta) anterior."""
-        if self.current_step == 2:
-            self.current_step = 1
-            self.show_frame("GenreFrame")
-        elif self.current_step == 3:
-            self.current_step = 2
-            self.show_frame("RhythmFrame")
-        elif self.current_step == 4:
-            self.current_step = 3
-            self.show_frame("ComplexityFrame") 
-        elif self.current_step == 5:
-            self.current_step = 4
-            self.show_frame("MotivationFrame") 
+        """Retrocede a la pregunta anterior (en el orden en que se hicieron)."""
+        # Si se vuelve mientras se calculan las recomendaciones, la inferencia se cancela.
+        self.cancelar_tarea()
+        if self.current_step == 6:
+            # Desde la pantalla de progreso se vuelve a la última pregunta (con su respuesta).
+            self.obtener_frame("ResultFrame").ocultar_progreso()
+        elif self.current_step >= 2:
+            # Deshace exactamente el delta de la pregunta que se abandona.
+            self.estado.deshacer_desde(self.current_step)
+            self.preguntas_hechas.pop()
+        else:
+            return
+        self.current_step = len(self.preguntas_hechas)
+        self.show_frame(PANTALLAS_PREGUNTA[self.preguntas_hechas[-1]][0])
+
+    def calcular_en_segundo_plano(self, funcion, al_terminar):
+        """
+        Ejecuta `funcion()` en el hilo de inferencia y entrega su resultado en el hilo de Tk.
+
+        Solo hay una tarea vigente: pedir otra cancela la anterior.
+        :param funcion: Cálculo a ejecutar (no debe tocar widgets).
+        :param al_terminar: Recibe el resultado (una lista vacía si el cálculo falló).
+        """
+        self.cancelar_tarea()
+        futuro = self.ejecutor.submit(funcion)
+        self.tarea = (futuro, al_terminar)
+        self.after(INTERVALO_REVISION_MS, self._revisar_tarea, futuro)
+
+    def _revisar_tarea(self, futuro):
+        """Entrega el resultado de la tarea si ya terminó; si no, vuelve a revisar más tarde."""
+        if self.tarea is None or self.tarea[0] is not futuro:
+            return # Tarea cancelada o reemplazada: su resultado se descarta.
+        if not futuro.done():
+            self.after(INTERVALO_REVISION_MS, self._revisar_tarea, futuro)
+            return
+        al_terminar = self.tarea[1]
+        self.tarea = None
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            print(f"❌ Error: Falló la inferencia en segundo plano: {e}")
+            resultado = []
+        al_terminar(resultado)
+
+    def cancelar_tarea(self):
+        """
+        Cancela la tarea en curso.
+
+        Si todavía no empezó, no llega a ejecutarse; si ya está corriendo, termina en el hilo
+        de inferencia pero su resultado nunca se muestra.
+        """
+        if self.tarea is not None:
+            self.tarea[0].cancel()
+            self.tarea = None
+
+    def cerrar(self):
+        """Cierra la ventana sin esperar a las tareas pendientes."""
+        self.cancelar_tarea()
+        self.ejecutor.shutdown(wait=False, cancel_futures=True)
+        self.imagenes.cerrar()
+        self.destroy()
         
     def ejecutar_inferencia(self):
         """Recopila las respuestas del usuario y pide recomendaciones al motor."""
-        respuestas_usuario = [
-            self.var_genero.get(),
-            self.var_ritmo.get(),
-            self.var_complejidad.get(),
-            self.var_motivacion.get(),
-            self.var_compromiso.get()
-        ]
+        # Solo las preguntas que se hicieron, en el orden fijo del cuestionario: con todas
+        # respondidas el resultado es el mismo que con el orden de siempre.
+        respuestas_usuario = [getattr(self, variable).get()
+                              for pregunta, (_, variable) in PANTALLAS_PREGUNTA.items()
+                              if pregunta in self.preguntas_hechas]
         
-        # Llama al método del motor con las respuestas del usuario.
-        recomendaciones_data, _ = self.motor.inferir_recomendaciones(respuestas_usuario) 
-        
-        # Muestra los resultados en el ResultFrame.
-        result_frame = self.frames["ResultFrame"]
-        result_frame.update_results(recomendaciones_data)
+        # El ranking perezoso solo se crea si el usuario se desplaza hasta el final de la lista.
+        self.respuestas_actuales = respuestas_usuario
+        self.ranking = None
+        # Con preguntas sin hacer, solo los primeros LIBROS_DESTACADOS son definitivos.
+        self.libros_definitivos = (None if len(respuestas_usuario) == len(PANTALLAS_PREGUNTA)
+                                   else LIBROS_DESTACADOS)
         
+        # Muestra el ResultFrame en estado de progreso mientras el motor calcula.
+        result_frame = self.obtener_frame("ResultFrame")
+        result_frame.mostrar_progreso()
         self.current_step = 6 # Establece el paso a Resultados.
         self.show_frame("ResultFrame")
 
+        # La inferencia corre en el hilo trabajador sobre una copia de las respuestas (el estado
+        # incremental es del hilo de Tk); el motor es seguro entre hilos y sirve el resultado
+        # desde la caché de rankings cuando ya se calculó. Los resultados llegan a update_results.
+        self.calcular_en_segundo_plano(
+            lambda: self.motor.inferir_recomendaciones(respuestas_usuario, LIBROS_POR_PAGINA)[0],
+            result_frame.update_results)
+
+    def mostrar_mas(self):
+        """Pide la siguiente página del ranking sin volver a ejecutar la inferencia."""
+        result_frame = self.obtener_frame("ResultFrame")
+        pedidos = min(LIBROS_POR_PAGINA, LIBROS_RESULTADO - len(result_frame.lista.resultados))
+        if self.ranking is None:
+            # Ranking perezoso completo, saltando la primera página que ya se mostró. Crear el
+            # generador no calcula nada: la puntuación ocurre al pedirle libros, en el trabajador.
+            ranking = self.motor.iterar_recomendaciones(self.respuestas_actuales)
+            self.ranking = islice(ranking, LIBROS_POR_PAGINA, None)
+        ranking = self.ranking
+        result_frame.mostrar_progreso(nueva_busqueda=False)
+        self.calcular_en_segundo_plano(lambda: list(islice(ranking, pedidos)),
+                                       lambda siguientes: result_frame.agregar_resultados(siguientes, pedidos))
+
 
 # ----------------------------------------------------------------------
 ## 3. EJECUCIÓN DEL SISTEMA
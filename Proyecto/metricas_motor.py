@@ -0,0 +1,190 @@
+# =================================================================================
+# metricas_motor.py (Temporizadores por fase, contadores y perfilador por muestreo del motor)
+# =================================================================================
+# Cada inferencia completa registra, con una sola toma del cerrojo, cuánto tardó cada fase:
+#   - reglas:          emparejar las respuestas con la red de reglas (activaciones).
+#   - puntuacion:      sumar los FC a los libros (o recorrer el índice del modo activo).
+#   - ranking:         elegir los k mejores (en los modos con índice va dentro de puntuacion).
+#   - materializacion: construir los diccionarios de salida.
+# y los contadores de reglas disparadas y libros tocados. Las consultas a la caché de
+# rankings cuentan aciertos y fallos. El costo es unas pocas lecturas del reloj por
+# inferencia, así que las métricas están siempre activas.
+#
+# Exportación: instantanea() (JSON), como_prometheus() (formato de texto de Prometheus) y
+# exportar(ruta) para dejar el archivo a un recolector (ej: textfile collector de node_exporter).
+# El perfilador por muestreo es opcional y se enciende en caliente con iniciar_muestreo().
+import json           # Exportación de la instantánea.
+import os             # Reemplazo atómico del archivo exportado.
+import sys            # Pilas de los hilos en ejecución (sys._current_frames).
+import threading      # Cerrojo de los contadores e hilo del perfilador.
+import time           # Reloj de los temporizadores.
+from collections import Counter # Muestras por pila del perfilador.
+
+# Fases de la inferencia, en el orden en que ocurren.
+FASES = ('reglas', 'puntuacion', 'ranking', 'materializacion')
+# Contadores acumulados del motor.
+CONTADORES = ('inferencias', 'reglas_disparadas', 'libros_tocados', 'aciertos_cache', 'fallos_cache')
+# Segundos entre dos muestras del perfilador.
+INTERVALO_MUESTREO_S = 0.005
+# Prefijo de los nombres de las métricas en formato Prometheus.
+PREFIJO_PROMETHEUS = 'serl_motor'
+# Archivos del motor: el perfilador solo cuenta pilas que pasan por ellos.
+MODULOS_MOTOR = ('motor_', 'catalogo_', 'modelo_conocimiento', 'snapshot_conocimiento')
+
+
+def reloj():
+    """Reloj monotónico de alta resolución (segundos) usado por los temporizadores."""
+    return time.perf_counter()
+
+
+class MetricasMotor:
+    """Temporizadores y contadores acumulados de un MotorRecomendacion (seguros entre hilos)."""
+
+    def __init__(self):
+        self.cerrojo = threading.Lock()
+        # Perfilador por muestreo (apagado): hilo, señal de parada y muestras por pila.
+        self.hilo_muestreo = None
+        self.detener = threading.Event()
+        self.muestras = Counter()
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Pone a cero temporizadores y contadores (ej: antes de medir un cambio del motor)."""
+        with self.cerrojo:
+            self.inicio = time.monotonic()
+            self.segundos = dict.fromkeys(FASES, 0.0)
+            self.contadores = dict.fromkeys(CONTADORES, 0)
+
+    # --- REGISTRO (hot path) ---
+    def registrar_inferencia(self, reglas=0.0, puntuacion=0.0, ranking=0.0, materializacion=0.0,
+                             reglas_disparadas=0, libros_tocados=0, inferencias=1):
+        """
+        Suma los segundos de cada fase y los contadores de una inferencia completa.
+
+        :param inferencias: Usuarios atendidos (más de uno cuando se registra un lote entero).
+        """
+        with self.cerrojo:
+            segundos = self.segundos
+            segundos['reglas'] += reglas
+            segundos['puntuacion'] += puntuacion
+            segundos['ranking'] += ranking
+            segundos['materializacion'] += materializacion
+            contadores = self.contadores
+            contadores['inferencias'] += inferencias
+            contadores['reglas_disparadas'] += reglas_disparadas
+            contadores['libros_tocados'] += libros_tocados
+
+    def registrar_cache(self, acierto):
+        """Cuenta una consulta a la caché de rankings."""
+        with self.cerrojo:
+            self.contadores['aciertos_cache' if acierto else 'fallos_cache'] += 1
+
+    # --- EXPORTACIÓN ---
+    def instantanea(self):
+        """Devuelve un diccionario (serializable a JSON) con los contadores y tiempos actuales."""
+        with self.cerrojo:
+            segundos = dict(self.segundos)
+            contadores = dict(self.contadores)
+            transcurrido = time.monotonic() - self.inicio
+        inferencias = contadores['inferencias']
+        consultas = contadores['aciertos_cache'] + contadores['fallos_cache']
+        return {
+            "segundos_activo": round(transcurrido, 3),
+            "contadores": contadores,
+            "tasa_aciertos_cache": round(contadores['aciertos_cache'] / consultas, 4) if consultas else 0.0,
+            "fases_ms": {fase: {"total": round(total * 1000, 3),
+                                "media": round(total * 1000 / inferencias, 4) if inferencias else 0.0}
+                         for fase, total in segundos.items()},
+            "muestreo_activo": self.hilo_muestreo is not None
+        }
+
+    def como_prometheus(self):
+        """Devuelve las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+        with self.cerrojo:
+            segundos = dict(self.segundos)
+            contadores = dict(self.contadores)
+        lineas = [f"# HELP {PREFIJO_PROMETHEUS}_fase_segundos_total Tiempo acumulado por fase de la inferencia.",
+                  f"# TYPE {PREFIJO_PROMETHEUS}_fase_segundos_total counter"]
+        for fase, total in segundos.items():
+            lineas.append(f'{PREFIJO_PROMETHEUS}_fase_segundos_total{{fase="{fase}"}} {total:.9f}')
+        for nombre, valor in contadores.items():
+            lineas.append(f"# TYPE {PREFIJO_PROMETHEUS}_{nombre}_total counter")
+            lineas.append(f"{PREFIJO_PROMETHEUS}_{nombre}_total {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, ruta, formato='prometheus'):
+        """
+        Escribe las métricas en un archivo, de forma atómica.
+
+        :param formato: 'prometheus' (texto) o 'json'.
+        :return: True si se escribió, False si hubo un error.
+        """
+        contenido = (self.como_prometheus() if formato == 'prometheus'
+                     else json.dumps(self.instantanea(), ensure_ascii=False, indent=2))
+        temporal = ruta + '.tmp'
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                f.write(contenido)
+            os.replace(temporal, ruta)
+        except OSError as error:
+            print(f"❌ Error: No se pudieron exportar las métricas a {ruta}: {error}")
+            return False
+        return True
+
+    # --- PERFILADOR POR MUESTREO ---
+    def iniciar_muestreo(self, intervalo=INTERVALO_MUESTREO_S):
+        """
+        Enciende el perfilador: cada `intervalo` segundos toma la pila de los hilos que están
+        dentro del motor. Se puede encender y apagar mientras el proceso atiende peticiones.
+        """
+        if self.hilo_muestreo is not None:
+            return
+        self.detener.clear()
+        self.hilo_muestreo = threading.Thread(target=self._muestrear, args=(intervalo,),
+                                              name="muestreo-motor", daemon=True)
+        self.hilo_muestreo.start()
+
+    def detener_muestreo(self):
+        """Apaga el perfilador (conserva las muestras tomadas)."""
+        hilo = self.hilo_muestreo
+        if hilo is None:
+            return
+        self.detener.set()
+        hilo.join()
+        self.hilo_muestreo = None
+
+    def _muestrear(self, intervalo):
+        propio = threading.get_ident()
+        while not self.detener.wait(intervalo):
+            for ident, marco in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = []
+                while marco is not None:
+                    codigo = marco.f_code
+                    pila.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                    marco = marco.f_back
+                # La pila se recorta a partir del primer marco del motor (de la raíz a la hoja).
+                pila.reverse()
+                for i, nombre in enumerate(pila):
+                    if nombre.startswith(MODULOS_MOTOR):
+                        with self.cerrojo:
+                            self.muestras[";".join(pila[i:])] += 1
+                        break
+
+    def perfil(self, n=20):
+        """Las `n` pilas con más muestras, como lista de (pila "a;b;c", muestras)."""
+        with self.cerrojo:
+            return self.muestras.most_common(n)
+
+    def exportar_perfil(self, ruta):
+        """Escribe las muestras en formato de pilas colapsadas (flamegraph.pl, speedscope)."""
+        with self.cerrojo:
+            lineas = [f"{pila} {n}\n" for pila, n in self.muestras.most_common()]
+        try:
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.writelines(lineas)
+        except OSError as error:
+            print(f"❌ Error: No se pudo escribir el perfil en {ruta}: {error}")
+            return False
+        return True
@@ -3,6 +3,48 @@
 # Define la estructura de las reglas para la inferencia.
 # =========================================================
 
+# Operadores de las premisas compuestas (claves en reglas_inferencia.json).
+OPERADOR_Y = 'y'   # Conjunción: todas las premisas deben cumplirse.
+OPERADOR_O = 'o'   # Disyunción: basta con que se cumpla una.
+
+class PremisaCompuesta:
+    """
+    Premisa formada por varias condiciones unidas con Y / O.
+
+    Cada condición es una respuesta del usuario (cadena) u otra PremisaCompuesta, así que
+    se pueden anidar (ej: "Fantasia Y (Ritmo Rápido O Complejidad Baja)").
+    """
+
+    def __init__(self, operador, premisas):
+        """
+        :param operador: OPERADOR_Y u OPERADOR_O.
+        :param premisas: Lista de respuestas (cadenas) o PremisaCompuesta.
+        """
+        if operador not in (OPERADOR_Y, OPERADOR_O) or not premisas:
+            raise ValueError(f"Premisa compuesta no válida: {operador!r} {premisas!r}")
+        self.operador = operador
+        self.premisas = tuple(premisas)
+
+    def __repr__(self):
+        union = ' Y ' if self.operador == OPERADOR_Y else ' O '
+        return '(' + union.join(str(premisa) for premisa in self.premisas) + ')'
+
+def premisa_desde_json(dato):
+    """
+    Convierte la premisa de una regla del JSON en una cadena o una PremisaCompuesta.
+
+    :param dato: Una respuesta ("Fantasia") o un objeto {"y": [...]} / {"o": [...]}
+                 cuyos elementos son, a su vez, premisas.
+    :raises ValueError: Si la premisa no tiene una de esas formas.
+    """
+    if isinstance(dato, str):
+        return dato
+    if isinstance(dato, dict) and len(dato) == 1:
+        operador, premisas = next(iter(dato.items()))
+        if isinstance(premisas, list):
+            return PremisaCompuesta(operador, [premisa_desde_json(p) for p in premisas])
+    raise ValueError(f"Premisa no válida: {dato!r}")
+
 class ReglaInferencia:
     """
     Define la estructura de una regla IF-THEN (Si-Entonces). 
@@ -11,13 +53,15 @@ class ReglaInferencia:
     asignándole un Factor de Certeza (FC).
     """
     
-    def __init__(self, respuesta_usuario, atributo_esperado, fc):
+    def __init__(self, respuesta_usuario, atributo_esperado, fc, pregunta=None):
         """
         Método constructor para inicializar una nueva ReglaInferencia.
 
-        :param respuesta_usuario: La premisa (IF). La opción seleccionada por el usuario (ej: "Fantasia").
+        :param respuesta_usuario: La premisa (IF). La opción seleccionada por el usuario (ej: "Fantasia"),
+                                  o una PremisaCompuesta que combina varias respuestas con Y / O.
         :param atributo_esperado: La conclusión (THEN). La característica que se busca en el libro (ej: "Genero_Fantasia").
         :param fc: El Factor de Certeza (FC) asociado a esta conclusión (ej: 0.8 o 1.0).
+        :param pregunta: Pregunta del cuestionario a la que pertenece la premisa (ej: "Genero").
         """
         # Premisa de la regla: La respuesta específica dada por el usuario.
         self.respuesta_usuario = respuesta_usuario
@@ -27,6 +71,13 @@ class ReglaInferencia:
         
         # Factor de Certeza: Determina la fuerza con la que esta regla contribuye a la recomendación.
         self.fc = fc
+
+        # Pregunta de origen: agrupa las respuestas alternativas de una misma pantalla.
+        self.pregunta = pregunta
+
+    def es_simple(self):
+        """Indica si la premisa es una sola respuesta (y no una PremisaCompuesta)."""
+        return isinstance(self.respuesta_usuario, str)
         
     def __repr__(self):
         """
@@ -34,4 +85,151 @@ class ReglaInferencia:
         o para imprimir la regla en un formato legible.
         """
         return (f"IF User chose '{self.respuesta_usuario}' "
-                f"THEN expect '{self.atributo_esperado}' (FC: {self.fc})")
\ No newline at end of file
+                f"THEN expect '{self.atributo_esperado}' (FC: {self.fc})")
+
+# ---------------------------------------------------------
+# Red de discriminación (estilo Rete) para las premisas.
+# ---------------------------------------------------------
+class RedRete:
+    """
+    Compila las premisas de las reglas en una red de nodos compartidos.
+
+    - Nodos alfa: uno por respuesta distinta; es la única prueba que se hace sobre cada
+      respuesta, sin importar cuántas reglas la usen.
+    - Nodos Y / O: uno por combinación distinta de nodos hijos. Dos reglas con la misma
+      subcondición (ej: "Fantasia Y Ritmo Rápido") comparten el nodo y se evalúa una vez.
+    Cada nodo guarda las reglas que se activan cuando se cumple (sus terminales) y sus
+    nodos padre, a los que avisa solo cuando cambia de estado.
+    """
+
+    def __init__(self, reglas):
+        """
+        :param reglas: Lista de ReglaInferencia, en el orden del archivo de reglas.
+        """
+        # Nodo alfa de cada respuesta: {respuesta: id_nodo}.
+        self.nodo_alfa = {}
+        # Estructura de los nodos, en listas paralelas indexadas por id_nodo.
+        self.requeridos = []  # Hijos que deben cumplirse (1 en alfa y O, todos en Y).
+        self.padres = []      # Nodos que dependen de este.
+        self.terminales = []  # (orden_regla, regla) que se activan al cumplirse el nodo.
+        self.reglas_nodo = []  # Solo las reglas de `terminales`, listas para devolver.
+        # Clave estructural -> id_nodo, para compartir condiciones repetidas.
+        self.nodos_por_clave = {}
+
+        for orden, regla in enumerate(reglas):
+            nodo = self._compilar(regla.respuesta_usuario)
+            self.terminales[nodo].append((orden, regla))
+            self.reglas_nodo[nodo].append(regla)
+
+    def _nuevo_nodo(self, clave, requeridos):
+        nodo = self.nodos_por_clave[clave] = len(self.requeridos)
+        self.requeridos.append(requeridos)
+        self.padres.append([])
+        self.terminales.append([])
+        self.reglas_nodo.append([])
+        return nodo
+
+    def _compilar(self, premisa):
+        """Devuelve el nodo que representa una premisa, creándolo (con sus hijos) si no existe."""
+        if isinstance(premisa, str):
+            nodo = self.nodo_alfa.get(premisa)
+            if nodo is None:
+                nodo = self.nodo_alfa[premisa] = self._nuevo_nodo(('alfa', premisa), 1)
+            return nodo
+
+        # Los hijos se ordenan y se quitan repetidos: "A Y B" y "B Y A" son el mismo nodo.
+        hijos = tuple(sorted({self._compilar(p) for p in premisa.premisas}))
+        if len(hijos) == 1:
+            return hijos[0]
+        clave = (premisa.operador, hijos)
+        nodo = self.nodos_por_clave.get(clave)
+        if nodo is None:
+            requeridos = len(hijos) if premisa.operador == OPERADOR_Y else 1
+            nodo = self._nuevo_nodo(clave, requeridos)
+            for hijo in hijos:
+                self.padres[hijo].append(nodo)
+        return nodo
+
+    def crear_memoria(self):
+        """Crea una memoria de trabajo vacía para evaluar un conjunto de respuestas."""
+        return MemoriaRete(self)
+
+class MemoriaRete:
+    """
+    Estado de la red para las respuestas afirmadas hasta ahora (memoria de trabajo).
+
+    Solo guarda, por nodo, cuántos hijos se cumplen. Afirmar o retractar una respuesta
+    recorre únicamente los nodos cuyo estado cambia, así que el costo depende de las reglas
+    afectadas por esa respuesta y no del tamaño de la base de reglas.
+    """
+
+    def __init__(self, red):
+        self.red = red
+        # {id_nodo: hijos cumplidos}; en un nodo alfa, veces que se afirmó la respuesta.
+        self.conteo = {}
+
+    def afirmar(self, respuesta):
+        """
+        Añade una respuesta y devuelve las reglas que se activan con ella, en el orden del archivo.
+
+        Las reglas de una sola respuesta se activan cada vez que esta se afirma, igual que
+        antes de existir la red; las compuestas, cuando su premisa pasa a cumplirse.
+        """
+        red = self.red
+        nodo = red.nodo_alfa.get(respuesta)
+        if nodo is None:
+            return ()
+        veces = self.conteo.get(nodo, 0) + 1
+        self.conteo[nodo] = veces
+        if veces > 1 or not red.padres[nodo]:
+            # Sin nodos que dependan del cambio: las reglas del nodo alfa, ya ordenadas.
+            return red.reglas_nodo[nodo]
+
+        activadas = list(red.terminales[nodo])
+        self._propagar(nodo, 1, activadas)
+        activadas.sort(key=lambda terminal: terminal[0])
+        return [regla for _, regla in activadas]
+
+    def retractar(self, respuesta):
+        """Quita una respuesta afirmada antes (ej: al retroceder en el cuestionario)."""
+        red = self.red
+        nodo = red.nodo_alfa.get(respuesta)
+        if nodo is None:
+            return
+        veces = self.conteo[nodo] - 1
+        if veces:
+            self.conteo[nodo] = veces
+            return
+        del self.conteo[nodo]
+        self._propagar(nodo, -1, None)
+
+    def reglas_pendientes(self):
+        """Reglas con premisa compuesta que todavía no se cumplen (pueden activarse más adelante)."""
+        red = self.red
+        alfas = set(red.nodo_alfa.values())
+        return [regla for nodo, reglas in enumerate(red.reglas_nodo)
+                if reglas and nodo not in alfas and self.conteo.get(nodo, 0) < red.requeridos[nodo]
+                for regla in reglas]
+
+    def _propagar(self, nodo, delta, activadas):
+        """Avisa a los padres de un nodo que cambió de estado, en cascada mientras haya cambios."""
+        red = self.red
+        conteo = self.conteo
+        pendientes = [nodo]
+        while pendientes:
+            hijo = pendientes.pop()
+            for padre in red.padres[hijo]:
+                antes = conteo.get(padre, 0)
+                despues = antes + delta
+                if despues:
+                    conteo[padre] = despues
+                else:
+                    del conteo[padre]
+                requeridos = red.requeridos[padre]
+                if delta > 0 and despues == requeridos:
+                    # El padre pasa a cumplirse: se activan sus reglas y se avisa a sus padres.
+                    activadas.extend(red.terminales[padre])
+                    pendientes.append(padre)
+                elif delta < 0 and antes == requeridos:
+                    # El padre deja de cumplirse.
+                    pendientes.append(padre)
@@ -0,0 +1,226 @@
+# =================================================================================
+# motor_aproximado.py (Recuperación aproximada con un índice IVF para catálogos enormes)
+# =================================================================================
+# Cada libro se representa como un vector: un 1 por cada valor de atributo que tiene
+# (one-hot ponderado) más su Rating_Base normalizado. Las respuestas de un usuario se
+# convierten en un vector de consulta con el FC acumulado de cada valor activado, de modo
+# que el puntaje del motor es Rating_Base + consulta · libro (un producto interno).
+#
+# El índice IVF (inverted file) agrupa los libros con k-means en `n_listas` listas. Al
+# consultar, solo se abren las `n_sondeos` listas que prometen más puntaje (según el mejor
+# rating de la lista y cuántos de sus libros tienen cada valor activado); sus libros se
+# vuelven a puntuar de forma exacta y de ellos salen los k mejores. Más sondeos
+# dan más recall y más latencia: con n_sondeos = n_listas el resultado es exacto.
+#
+# NumPy es obligatorio para este modo (igual que para motor_vectorizado).
+import copy           # Copia superficial del índice al aplicar ediciones del catálogo.
+from motor_vectorizado import np, seleccionar_mejores # NumPy opcional y selección con desempate.
+
+# Iteraciones de k-means al construir el índice.
+ITERACIONES_KMEANS = 10
+# Libros de muestra por lista con los que se entrena k-means (el resto solo se asigna).
+MUESTRAS_POR_LISTA = 64
+# Peso del Rating_Base normalizado (0..1) frente a cada atributo al agrupar los libros.
+PESO_RATING = 1.0
+# Libros que se asignan a la vez a su centroide más cercano (limita la memoria temporal).
+LIBROS_POR_BLOQUE = 65_536
+# Sondeos por defecto del modo aproximado.
+SONDEOS_POR_DEFECTO = 16
+
+
+class IndiceIVF:
+    """
+    Índice IVF sobre el catálogo para recuperar candidatos antes del re-puntuado exacto.
+
+    Los candidatos se puntúan igual que en el motor en serie (mismo orden de suma de los
+    FC y mismo desempate), así que cualquier libro que aparece en el resultado tiene su
+    puntaje exacto; lo aproximado es solo qué libros llegan a ser candidatos.
+    """
+
+    def __init__(self, libros, columnas, n_listas=None, semilla=0):
+        """
+        :param libros: CatalogoColumnar con la Base de Hechos.
+        :param columnas: Columnas de atributos que las reglas pueden buscar.
+        :param n_listas: Número de listas (centroides); por defecto, la raíz del número de libros.
+        :param semilla: Semilla de k-means, para que el índice sea reproducible.
+        """
+        self.libros = libros
+        self.nombres_columnas = tuple(columnas)
+        # Dimensión de los vectores: los valores conocidos al entrenar más el rating.
+        self.n_valores = len(libros.valores)
+        vigentes = self._vigentes(libros)
+        ratings = np.frombuffer(libros.ratings, dtype=np.float64)
+        if len(vigentes):
+            self.rating_minimo = float(ratings[vigentes].min())
+            self.escala_rating = float(ratings[vigentes].max()) - self.rating_minimo or 1.0
+        else:
+            self.rating_minimo, self.escala_rating = 0.0, 1.0
+
+        n_listas = n_listas or max(1, int(round(len(vigentes) ** 0.5)))
+        n_listas = max(1, min(n_listas, len(vigentes)))
+        generador = np.random.default_rng(semilla)
+        muestra = vigentes
+        if len(vigentes) > MUESTRAS_POR_LISTA * n_listas:
+            muestra = generador.choice(vigentes, MUESTRAS_POR_LISTA * n_listas, replace=False)
+        self.centroides = self._entrenar(self._vectores(libros, muestra), n_listas, generador)
+
+        # Lista de cada fila del catálogo (-1 para las eliminadas).
+        self.asignacion = np.full(len(libros.ids), -1, dtype=np.int32)
+        for inicio in range(0, len(vigentes), LIBROS_POR_BLOQUE):
+            bloque = vigentes[inicio:inicio + LIBROS_POR_BLOQUE]
+            self.asignacion[bloque] = self._asignar(self._vectores(libros, bloque))
+        # Posiciones de cada lista, en orden del catálogo.
+        orden = vigentes[np.argsort(self.asignacion[vigentes], kind='stable')]
+        cortes = np.cumsum(np.bincount(self.asignacion[vigentes], minlength=len(self.centroides)))[:-1]
+        self.listas = np.split(orden, cortes)
+        self._resumir_listas()
+        # Libros re-puntuados en la última consulta (para medir qué fracción del catálogo se tocó).
+        self.libros_evaluados = 0
+
+    @staticmethod
+    def _vigentes(libros):
+        mascara = np.ones(len(libros.ids), dtype=bool)
+        if libros.eliminados:
+            mascara[sorted(libros.eliminados)] = False
+        return np.flatnonzero(mascara)
+
+    def _vectores(self, libros, posiciones):
+        """Vectores (one-hot de atributos + rating normalizado) de los libros en `posiciones`."""
+        vectores = np.zeros((len(posiciones), self.n_valores + 1), dtype=np.float32)
+        filas = np.arange(len(posiciones))
+        for columna in self.nombres_columnas:
+            codigos = np.frombuffer(libros.atributos[columna], dtype=np.uint32)[posiciones]
+            # Un valor que apareció después de entrenar no tiene dimensión propia.
+            conocidos = codigos < self.n_valores
+            vectores[filas[conocidos], codigos[conocidos]] = 1.0
+        ratings = np.frombuffer(libros.ratings, dtype=np.float64)[posiciones]
+        vectores[:, -1] = (ratings - self.rating_minimo) / self.escala_rating * PESO_RATING
+        return vectores
+
+    def _asignar(self, vectores):
+        """Índice del centroide más cercano a cada vector (distancia euclídea)."""
+        # ||x - c||² = ||x||² - 2 x·c + ||c||²; ||x||² no cambia el argmin.
+        distancias = (self.centroides ** 2).sum(axis=1) - 2.0 * (vectores @ self.centroides.T)
+        return distancias.argmin(axis=1).astype(np.int32)
+
+    def _entrenar(self, vectores, n_listas, generador):
+        """k-means (algoritmo de Lloyd) sobre la muestra; devuelve los centroides."""
+        if len(vectores) == 0:
+            return np.zeros((1, self.n_valores + 1), dtype=np.float32)
+        self.centroides = vectores[generador.choice(len(vectores), n_listas, replace=False)].copy()
+        for _ in range(ITERACIONES_KMEANS):
+            asignacion = self._asignar(vectores)
+            conteo = np.bincount(asignacion, minlength=n_listas)
+            sumas = np.zeros_like(self.centroides)
+            np.add.at(sumas, asignacion, vectores)
+            # Una lista que se quedó sin libros conserva su centroide anterior.
+            llenas = conteo > 0
+            self.centroides[llenas] = sumas[llenas] / conteo[llenas, np.newaxis]
+        return self.centroides
+
+    def _resumir_listas(self):
+        """
+        Resumen de cada lista para elegir qué listas sondear.
+
+        `presencia[l, v]` es la fracción de libros de la lista l que tienen el valor v y
+        `rating_maximo[l]` el mayor Rating_Base de la lista: la prioridad de una lista es el
+        rating de su mejor libro más el FC que se espera que sumen sus libros.
+        """
+        ratings = np.frombuffer(self.libros.ratings, dtype=np.float64)
+        self.presencia = np.zeros((len(self.listas), self.n_valores), dtype=np.float64)
+        self.rating_maximo = np.full(len(self.listas), -np.inf)
+        for l, lista in enumerate(self.listas):
+            if len(lista):
+                self.presencia[l] = self._vectores(self.libros, lista)[:, :-1].mean(axis=0)
+                self.rating_maximo[l] = ratings[lista].max()
+
+    def mejores(self, activaciones, k, n_sondeos=SONDEOS_POR_DEFECTO):
+        """
+        Devuelve (aproximadamente) los k mejores libros para las activaciones dadas.
+
+        :param activaciones: Lista ordenada de pares (atributo_esperado, fc).
+        :param n_sondeos: Listas que se abren; más sondeos, más recall y más latencia.
+        :return: Lista de tuplas (posición_libro, puntaje) en orden de recomendación.
+        """
+        self.libros_evaluados = 0
+        libros = self.libros
+        codigo_valor = libros.codigo_valor
+        codificadas = [(codigo_valor.get(atributo), fc) for atributo, fc in activaciones]
+        if k <= 0 or not codificadas:
+            return []
+
+        # Vector de consulta: FC acumulado de cada valor activado.
+        consulta = np.zeros(self.n_valores, dtype=np.float64)
+        for codigo, fc in codificadas:
+            if codigo is not None and codigo < self.n_valores:
+                consulta[codigo] += fc
+        prioridad = self.rating_maximo + self.presencia @ consulta
+        n_sondeos = max(1, min(n_sondeos, len(self.listas)))
+        if n_sondeos < len(self.listas):
+            sondeadas = np.argpartition(-prioridad, n_sondeos - 1)[:n_sondeos]
+        else:
+            sondeadas = range(len(self.listas))
+        candidatos = np.concatenate([self.listas[l] for l in sondeadas])
+        self.libros_evaluados = len(candidatos)
+
+        # Re-puntuado exacto de los candidatos, activación por activación como en MatrizCatalogo.
+        codigos = [np.frombuffer(libros.atributos[columna], dtype=np.uint32)[candidatos]
+                   for columna in self.nombres_columnas]
+        puntajes = np.frombuffer(libros.ratings, dtype=np.float64)[candidatos]
+        primera = np.full(len(candidatos), len(codificadas), dtype=np.int64)
+        emparejado = np.zeros(len(candidatos), dtype=bool)
+        for j, (codigo, fc) in enumerate(codificadas):
+            if codigo is None:
+                continue
+            fila = codigos[0] == codigo
+            for columna in codigos[1:]:
+                fila |= columna == codigo
+            puntajes = puntajes + fc * fila
+            primera[fila & ~emparejado] = j
+            emparejado |= fila
+        return seleccionar_mejores(puntajes, primera, emparejado, k, candidatos)
+
+    def actualizado(self, libros, posiciones):
+        """
+        Índice para una versión editada del catálogo, sin volver a entrenar k-means.
+
+        Los libros editados se quitan de su lista y los vigentes se asignan al centroide más
+        cercano; las listas que no cambian se comparten con este índice.
+        :param libros: Copia editada del catálogo de este índice (mismas posiciones).
+        :param posiciones: Posiciones agregadas, actualizadas o eliminadas en la copia.
+        :return: IndiceIVF nuevo sobre `libros`.
+        """
+        nuevo = copy.copy(self)
+        nuevo.libros = libros
+        nuevo.asignacion = np.full(len(libros.ids), -1, dtype=np.int32)
+        nuevo.asignacion[:len(self.asignacion)] = self.asignacion
+        posiciones = np.array(sorted(posiciones), dtype=np.int64)
+        nuevo.asignacion[posiciones] = -1
+        vigentes = np.array([p for p in posiciones if libros.vigente(p)], dtype=np.int64)
+        if len(vigentes):
+            nuevo.asignacion[vigentes] = self._asignar(self._vectores(libros, vigentes))
+
+        anteriores = np.full(len(posiciones), -1, dtype=np.int32)
+        dentro = posiciones < len(self.asignacion)
+        anteriores[dentro] = self.asignacion[posiciones[dentro]]
+        tocadas = set(anteriores.tolist()) | set(nuevo.asignacion[posiciones].tolist())
+        tocadas.discard(-1)
+        nuevo.listas = list(self.listas)
+        for l in tocadas:
+            lista = self.listas[l]
+            lista = lista[~np.isin(lista, posiciones)]
+            agregadas = posiciones[nuevo.asignacion[posiciones] == l]
+            nuevo.listas[l] = np.sort(np.concatenate([lista, agregadas]))
+        # El resumen de las listas tocadas se recalcula; el del resto se comparte.
+        nuevo.presencia = self.presencia.copy()
+        nuevo.rating_maximo = self.rating_maximo.copy()
+        ratings = np.frombuffer(libros.ratings, dtype=np.float64)
+        for l in tocadas:
+            lista = nuevo.listas[l]
+            if len(lista):
+                nuevo.presencia[l] = nuevo._vectores(libros, lista)[:, :-1].mean(axis=0)
+                nuevo.rating_maximo[l] = ratings[lista].max()
+            else:
+                nuevo.presencia[l] = 0.0
+                nuevo.rating_maximo[l] = -np.inf
+        return nuevo
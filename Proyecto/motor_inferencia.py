@@ -3,7 +3,20 @@
 # =================================================================================
 import json           # Módulo para trabajar con archivos JSON (la Base de Hechos/Conocimiento).
 import os             # Módulo para interactuar con el sistema operativo (manejo de rutas).
-from modelo_conocimiento import ReglaInferencia # Importa la clase de regla que definimos antes.
+import time           # Reloj monotónico para espaciar las revisiones del archivo de reglas.
+import heapq          # Montículos para seleccionar los k mejores libros sin ordenar todo el catálogo.
+import itertools      # Producto cartesiano del espacio de respuestas del cuestionario.
+import threading      # Hilo de fondo que precalcula la tabla de recomendaciones.
+from collections import OrderedDict # Caché LRU de rankings ya calculados.
+from catalogo_columnar import CatalogoColumnar # Base de Hechos en columnas compactas.
+from modelo_conocimiento import ReglaInferencia, RedRete, premisa_desde_json # Importa la clase de regla que definimos antes.
+from motor_vectorizado import MatrizCatalogo, numpy_disponible # Backend NumPy opcional para lotes.
+from motor_paralelo import LIBROS_MINIMOS_POR_FRAGMENTO, PoolFragmentos # Puntuación en varios procesos.
+from motor_umbral import IndiceUmbral # Top-k con terminación temprana (algoritmo del umbral).
+from motor_aproximado import SONDEOS_POR_DEFECTO, IndiceIVF # Recuperación aproximada (IVF).
+from snapshot_conocimiento import abrir_snapshot, escribir_snapshot # Arranque rápido desde binario.
+from metricas_motor import MetricasMotor, reloj # Temporizadores por fase y contadores del motor.
+from cuestionario_adaptativo import siguiente_pregunta # Orden adaptativo de las preguntas.
 import random         # Módulo importado (aunque no se usa en la lógica final de inferencia, puede ser para funciones futuras).
 
 # --- CONFIGURACIÓN DE RUTA ---
@@ -11,146 +24,1133 @@ import random         # Módulo importado (aunque no se usa en la lógica final
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)) 
 # Define la ruta completa al archivo JSON de la base de conocimiento.
 CONOCIMIENTO_FILE = os.path.join(BASE_DIR, 'base_conocimiento.json')
+# Define la ruta al archivo JSON con las reglas de inferencia (la Base de Reglas).
+REGLAS_FILE = os.path.join(BASE_DIR, 'reglas_inferencia.json')
+
+# Segundos mínimos entre dos revisiones de la fecha de modificación del archivo de reglas.
+INTERVALO_REVISION_REGLAS = 1.0
+
+# Número máximo de rankings (respuestas, k) que conserva la caché LRU. Cubre con holgura
+# las 216 combinaciones del cuestionario para varios valores de k.
+TAMANO_CACHE_RANKING = 2048
+
+# Fracción de filas eliminadas (lápidas) a partir de la cual una edición compacta el catálogo.
+FRACCION_ELIMINADOS_COMPACTAR = 0.25
+# Libros editados en un lote por encima de los cuales la caché se vacía entera en lugar de
+# revisar ranking por ranking cuáles pueden cambiar.
+EDICIONES_MAX_INVALIDACION_SELECTIVA = 256
+# Entradas vencidas que tolera el montículo del cuestionario en curso (además de una por libro
+# puntuado) antes de reconstruirlo.
+HOLGURA_MONTICULO_ESTADO = 1024
+
+# Columnas de cada libro que las reglas pueden buscar (en el orden del JSON).
+COLUMNAS_ATRIBUTOS = (
+    'Atributo_1_Genero',
+    'Atributo_2_Ritmo',
+    'Atributo_3_Complejidad',
+    'Atributo_4_Motivacion',
+    'Atributo_5_Compromiso'
+)
+
+# Niveles de trazabilidad de la inferencia (de menor a mayor detalle).
+TRAZA_NINGUNA = 0   # No se registra nada (modo por defecto, sin costo).
+TRAZA_REGLAS = 1    # Solo las reglas activadas.
+TRAZA_COMPLETA = 2  # Reglas activadas y cada libro puntuado por ellas.
+
+class TrazaInferencia:
+    """
+    Registro estructurado del razonamiento de una inferencia.
+
+    Durante la puntuación solo se guardan tuplas compactas (regla, posición, delta, total);
+    el texto legible se genera únicamente cuando alguien lo pide con `como_texto()`.
+    Iterar la traza produce esas mismas líneas de texto.
+    """
+
+    def __init__(self, nivel, libros):
+        """
+        :param nivel: Uno de TRAZA_NINGUNA, TRAZA_REGLAS o TRAZA_COMPLETA.
+        :param libros: CatalogoColumnar usado para mostrar títulos al renderizar.
+        """
+        self.nivel = nivel
+        self.libros = libros
+        # Eventos (regla, posición_libro, delta, total). La posición y el total son None en una activación.
+        self.eventos = []
+
+    def como_texto(self):
+        """Renderiza los eventos como líneas de texto legibles."""
+        lineas = []
+        for regla, posicion, delta, total in self.eventos:
+            if posicion is None:
+                lineas.append(f"Regla Activada: {regla.respuesta_usuario} -> {regla.atributo_esperado} (FC: {delta})")
+            else:
+                titulo = self.libros.titulos[posicion]
+                lineas.append(f"  |-> Acumulando: Libro '{titulo}' recibió +{delta}. Total: {total:.2f}")
+        return lineas
+
+    def __iter__(self):
+        return iter(self.como_texto())
+
+    def __len__(self):
+        return len(self.eventos)
 
 class MotorRecomendacion:
     """Clase principal que gestiona la base de conocimiento JSON y la lógica de inferencia."""
     def __init__(self):
         # Lista vacía que almacenará los objetos ReglaInferencia.
         self.reglas = []
-        # Lista vacía que almacenará los diccionarios de libros cargados desde el JSON (Base de Hechos).
-        self.libros = [] 
+        # Reglas compiladas en una red de discriminación (RedRete) indexada por respuesta.
+        self.red_reglas = RedRete([])
+        # Archivo de reglas cargado y su fecha de modificación (para la recarga en caliente).
+        self.ruta_reglas = REGLAS_FILE
+        self.mtime_reglas = None
+        self.ultima_revision_reglas = 0.0
+        # Libros cargados desde el JSON (Base de Hechos), guardados por columnas junto con su
+        # índice invertido. Cada libro se identifica por su posición en el catálogo.
+        # Cada inferencia toma esta referencia una sola vez, así que ve columnas e índice
+        # coherentes aunque otro hilo publique una edición mientras tanto.
+        self.libros = CatalogoColumnar(COLUMNAS_ATRIBUTOS)
+        self.libros.construir_indice()
+        # Serializa las ediciones del catálogo entre sí y con las recargas completas.
+        self.cerrojo_edicion = threading.RLock()
+        # Codificación NumPy del catálogo; se construye la primera vez que se usa inferir_lote.
+        self.matriz_catalogo = None
+        # Catálogo en SQLite (CatalogoSQLite); si está activo, sustituye a la lista de libros.
+        self.catalogo_sqlite = None
+        # Modo paralelo (opcional): procesos pedidos y fragmentos residentes del catálogo,
+        # que se crean la primera vez que se usan.
+        self.procesos_paralelos = 0
+        self.pool_fragmentos = None
+        self.cerrojo_fragmentos = threading.Lock()
+        # Modo top-k por umbral (opcional) y sus listas ordenadas por rating, que se
+        # construyen la primera vez que se usan.
+        self.top_k_umbral = False
+        self.indice_umbral = None
+        # Modo aproximado (opcional): listas IVF que se abren por consulta, número de listas
+        # pedido (None: automático) y el índice, que se construye la primera vez que se usa.
+        self.sondeos_aproximados = 0
+        self.listas_aproximadas = None
+        self.indice_aproximado = None
+
+        # --- CACHÉ DE RECOMENDACIONES ---
+        # Versión del conocimiento: aumenta cada vez que cambian las reglas o el catálogo.
+        self.version_conocimiento = 0
+        # Caché LRU {(respuestas, k): [recomendaciones]} de la versión actual.
+        self.cache_ranking = OrderedDict()
+        self.cerrojo_cache = threading.Lock()
+        # k de la tabla precalculada (None si no se pidió precálculo).
+        self.k_precalculo = None
 
-    def cargar_conocimiento_json(self):
-        """Carga los datos de los libros (Base de Hechos) desde el archivo JSON."""
+        # --- INSTRUMENTACIÓN ---
+        # Tiempo por fase de cada inferencia completa, reglas disparadas, libros tocados y
+        # aciertos de caché (ver metricas_motor); exportable como JSON o Prometheus.
+        self.metricas = MetricasMotor()
+
+    def cargar_conocimiento_json(self, ruta=CONOCIMIENTO_FILE, usar_snapshot=True):
+        """
+        Carga los datos de los libros (Base de Hechos) desde el archivo JSON.
+
+        Con `usar_snapshot`, los libros se leen de la instantánea binaria del JSON
+        (ruta + '.snap') si sigue vigente; si no, el JSON se recorre de forma incremental
+        para escribirla y los arranques siguientes ya no lo decodifican.
+        :param ruta: Archivo con la forma de base_conocimiento.json (por defecto, CONOCIMIENTO_FILE).
+        :param usar_snapshot: Si es False, se decodifica siempre el JSON completo con json.load.
+        """
         try:
-            # Abre y lee el archivo JSON.
-            with open(CONOCIMIENTO_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            # Extrae la lista de libros del diccionario cargado. Si 'libros' no existe, usa una lista vacía.
-            self.libros = data.get('libros', []) 
+            libros = self.leer_snapshot(ruta) if usar_snapshot else None
+            if libros is None:
+                # Abre y lee el archivo JSON.
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                # Extrae la lista de libros del diccionario cargado. Si 'libros' no existe, usa una lista vacía.
+                libros = CatalogoColumnar.desde_libros(data.get('libros', []), COLUMNAS_ATRIBUTOS)
+            # Construye las estructuras de búsqueda una sola vez, al cargar, y publica el catálogo.
+            self.construir_indices(libros)
             # print(f"✅ {len(self.libros)} libros cargados desde JSON.") # Mensaje de depuración.
             return True
         except FileNotFoundError:
-            print(f"❌ Error: El archivo {CONOCIMIENTO_FILE} no fue encontrado.")
+            print(f"❌ Error: El archivo {ruta} no fue encontrado.")
             return False
         except json.JSONDecodeError:
             print(f"❌ Error: El archivo JSON no es válido.")
             return False
+        except (KeyError, TypeError, ValueError):
+            print(f"❌ Error: El archivo {ruta} contiene un libro incompleto.")
+            return False
+
+    def leer_snapshot(self, ruta):
+        """
+        Devuelve los libros desde la instantánea binaria de `ruta`, creándola si hace falta.
 
-    def cargar_reglas(self):
-        """Carga las reglas de inferencia (el conocimiento experto)."""
-        # Limpia cualquier regla precargada.
-        self.reglas.clear()
+        :return: CatalogoColumnar, o None si no se pudo usar la instantánea (en ese caso
+                 se recurre a json.load, que reporta el error si lo hay).
+        """
+        snapshot = abrir_snapshot(ruta)
+        if snapshot is None:
+            try:
+                escribir_snapshot(ruta)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                # JSON ausente o inválido, o carpeta sin permisos de escritura.
+                return None
+            snapshot = abrir_snapshot(ruta)
+            if snapshot is None:
+                return None
+        try:
+            # Las columnas de la instantánea pasan al catálogo sin construir diccionarios.
+            return CatalogoColumnar.desde_snapshot(snapshot, COLUMNAS_ATRIBUTOS)
+        finally:
+            snapshot.cerrar()
 
-        # --- DEFINICIÓN DE REGLAS DE ALTO NIVEL ---
-        # Por cada respuesta posible en la GUI, se crea una ReglaInferencia que mapea 
-        # esa respuesta a un atributo del libro con un Factor de Certeza (FC) específico.
-        
-        # Reglas para GÉNERO (FC alto, pues el género es crucial)
-        self.reglas.append(ReglaInferencia('Romance', 'Romance', 0.95))
-        self.reglas.append(ReglaInferencia('Comic', 'Comic', 0.95))
-        self.reglas.append(ReglaInferencia('Ciencia Ficción', 'Ciencia Ficción', 0.95))
-        self.reglas.append(ReglaInferencia('Fantasia', 'Fantasia', 0.95))
-
-        # Reglas para RITMO (FC ligeramente menor)
-        self.reglas.append(ReglaInferencia('Ritmo Rápido', 'Rápido', 0.85)) 
-        self.reglas.append(ReglaInferencia('Ritmo Lento', 'Lento', 0.80)) 
-
-        # Reglas para COMPLEJIDAD
-        self.reglas.append(ReglaInferencia('Complejidad Alta', 'Alta', 0.90)) 
-        self.reglas.append(ReglaInferencia('Complejidad Media', 'Media', 0.85))
-        self.reglas.append(ReglaInferencia('Complejidad Baja', 'Baja', 0.70)) 
-
-        # Reglas para MOTIVACIÓN
-        self.reglas.append(ReglaInferencia('Motivación_Evadir', 'Evadir', 0.70))
-        self.reglas.append(ReglaInferencia('Motivación_Aprender', 'Aprender', 0.75))
-        self.reglas.append(ReglaInferencia('Motivación_Emocional', 'Emocional', 0.80))
-        
-        # Reglas para COMPROMISO (FC más bajo, ya que es menos determinante que el género/ritmo)
-        self.reglas.append(ReglaInferencia('Compromiso_Corto', 'Corto', 0.60))
-        self.reglas.append(ReglaInferencia('Compromiso_Medio', 'Medio', 0.65))
-        self.reglas.append(ReglaInferencia('Compromiso_Largo', 'Largo', 0.60))
-        
-    def inferir_recomendaciones(self, respuestas_usuario):
+    def construir_indices(self, libros=None):
+        """
+        Construye el índice invertido atributo -> posiciones de libros y publica el catálogo.
+
+        Cada lista de posiciones (posting list) respeta el orden del catálogo y no repite un
+        libro aunque el mismo valor aparezca en dos columnas (ej: 'Media' en ritmo y
+        complejidad), igual que la comprobación `atributo in atributos_libro` original.
+        :param libros: Catálogo nuevo a publicar; por defecto, el actual (self.libros).
+        """
+        with self.cerrojo_edicion:
+            libros = self.libros if libros is None else libros
+            if not isinstance(libros, CatalogoColumnar):
+                # Compatibilidad: una lista de diccionarios asignada directamente a self.libros.
+                libros = CatalogoColumnar.desde_libros(libros, COLUMNAS_ATRIBUTOS)
+            libros.construir_indice()
+
+            # Se publica ya completo, para que un hilo que esté infiriendo no vea un índice a medias.
+            self.libros = libros
+            # La codificación vectorizada, las listas por rating y los fragmentos quedan
+            # obsoletos con el catálogo anterior.
+            self.matriz_catalogo = None
+            self.indice_umbral = None
+            self.indice_aproximado = None
+            self.descartar_fragmentos()
+            self.invalidar_cache()
+
+    # --- EDICIÓN INCREMENTAL DEL CATÁLOGO ---
+    def editar_catalogo(self):
+        """
+        Abre un lote de ediciones del catálogo, para usar con `with`:
+
+            with motor.editar_catalogo() as edicion:
+                edicion.agregar(libro_nuevo)
+                edicion.actualizar(libro_modificado)
+                edicion.eliminar(libro_id)
+
+        Las ediciones se aplican sobre una copia; al salir del bloque sin errores la copia se
+        publica de una sola vez, así que las inferencias en curso ven el catálogo anterior o
+        el nuevo completo, nunca un lote a medias. Si el bloque lanza una excepción, no se
+        publica nada.
+        """
+        return EdicionCatalogo(self)
+
+    def agregar_libro(self, libro):
+        """Añade un libro (diccionario con la forma de base_conocimiento.json) al final del catálogo."""
+        return self._editar_libro(EdicionCatalogo.agregar, libro)
+
+    def actualizar_libro(self, libro):
+        """Reemplaza los datos del libro con el mismo ID_Libro; conserva su lugar en el catálogo."""
+        return self._editar_libro(EdicionCatalogo.actualizar, libro)
+
+    def eliminar_libro(self, libro_id):
+        """Quita del catálogo el libro con ese ID_Libro."""
+        return self._editar_libro(EdicionCatalogo.eliminar, libro_id)
+
+    def _editar_libro(self, operacion, argumento):
+        """Aplica una sola edición como un lote propio; reporta el error si no es válida."""
+        try:
+            with self.editar_catalogo() as edicion:
+                operacion(edicion, argumento)
+            return True
+        except KeyError as error:
+            print(f"❌ Error: Al libro le falta el campo {error}.")
+            return False
+        except (TypeError, ValueError) as error:
+            print(f"❌ Error: {error}")
+            return False
+
+    def publicar_edicion(self, edicion):
+        """
+        Publica el catálogo editado por un lote y pone al día sus estructuras derivadas.
+
+        El índice invertido ya viene actualizado en la copia; las listas por rating del modo
+        umbral se corrigen solo en los valores tocados, y de la caché se descartan únicamente
+        los rankings que los libros editados pueden cambiar. La matriz NumPy y los fragmentos
+        paralelos se reconstruyen la próxima vez que se usen.
+        """
+        libros = edicion.libros
+        indice_umbral = self.indice_umbral
+        if indice_umbral is not None and indice_umbral.libros is edicion.anterior:
+            indice_umbral = indice_umbral.actualizado(libros, edicion.posiciones)
+        else:
+            indice_umbral = None
+        indice_aproximado = self.indice_aproximado
+        if indice_aproximado is not None and indice_aproximado.libros is edicion.anterior:
+            indice_aproximado = indice_aproximado.actualizado(libros, edicion.posiciones)
+        else:
+            indice_aproximado = None
+        publicado = libros
+        if len(libros.eliminados) > FRACCION_ELIMINADOS_COMPACTAR * len(libros.ids):
+            # Demasiadas lápidas: se reescriben las columnas sin ellas. El orden de los libros
+            # vigentes no cambia, así que los rankings en caché siguen siendo válidos.
+            publicado = libros.compactado()
+            indice_umbral = indice_aproximado = None
+
+        # Una sola asignación publica columnas e índice juntos.
+        self.libros = publicado
+        self.indice_umbral = indice_umbral
+        self.indice_aproximado = indice_aproximado
+        self.matriz_catalogo = None
+        self.descartar_fragmentos()
+        self.invalidar_cache_por_libros(libros, edicion.posiciones, edicion.ids_afectados)
+
+    def usar_paralelo(self, n_procesos):
+        """
+        Activa (o desactiva) la puntuación en varios procesos.
+
+        El catálogo se reparte en `n_procesos` fragmentos, cada uno residente en su propio
+        proceso; cada fragmento calcula sus k mejores y aquí se combinan. Los resultados son
+        idénticos a los del modo en serie. Solo se usa si cada fragmento tendría al menos
+        LIBROS_MINIMOS_POR_FRAGMENTO libros, y no con trazabilidad completa (que necesita
+        registrar cada libro puntuado).
+        :param n_procesos: Número de procesos (ej: os.cpu_count()); 0 o 1 lo desactivan.
+        """
+        self.descartar_fragmentos()
+        self.procesos_paralelos = n_procesos or 0
+
+    def obtener_fragmentos(self, libros=None):
+        """
+        Devuelve el PoolFragmentos del catálogo `libros` (por defecto, el publicado),
+        creándolo si hace falta, o None.
+
+        También devuelve None si `libros` dejó de ser el catálogo publicado (una edición se
+        publicó durante la inferencia); quien llama recurre entonces al modo en serie.
+        """
+        libros = self.libros if libros is None else libros
+        n_procesos = min(self.procesos_paralelos, len(libros) // LIBROS_MINIMOS_POR_FRAGMENTO)
+        if n_procesos < 2:
+            return None
+        with self.cerrojo_fragmentos:
+            if libros is not self.libros:
+                return None
+            if self.pool_fragmentos is None or self.pool_fragmentos.libros is not libros:
+                if self.pool_fragmentos is not None:
+                    self.pool_fragmentos.cerrar()
+                self.pool_fragmentos = PoolFragmentos(libros, COLUMNAS_ATRIBUTOS, n_procesos)
+            return self.pool_fragmentos
+
+    def descartar_fragmentos(self):
+        """Termina los procesos del modo paralelo; se recrean al volver a usarse."""
+        with self.cerrojo_fragmentos:
+            if self.pool_fragmentos is not None:
+                self.pool_fragmentos.cerrar()
+                self.pool_fragmentos = None
+
+    def usar_top_k_umbral(self, activo=True):
+        """
+        Activa (o desactiva) el cálculo del top-k con el algoritmo del umbral.
+
+        En lugar de acumular el puntaje de todos los libros emparejados, se recorren las
+        listas de los atributos activados ordenadas por Rating_Base y la búsqueda se detiene
+        en cuanto ningún libro sin ver puede entrar en los k mejores. Los resultados son
+        idénticos a los del modo normal; no se usa con trazabilidad completa.
+        """
+        self.top_k_umbral = activo
+
+    def usar_vecinos_aproximados(self, n_sondeos=SONDEOS_POR_DEFECTO, n_listas=None):
+        """
+        Activa (o desactiva) la recuperación aproximada con un índice IVF (requiere NumPy).
+
+        Los libros se agrupan con k-means en `n_listas` listas y cada consulta solo re-puntúa,
+        de forma exacta, los libros de las `n_sondeos` listas más prometedoras. Es el ajuste
+        entre recall y latencia: con n_sondeos igual al número de listas el resultado es el
+        del motor exacto. `medir_recall` mide cuánto se pierde. No se usa con trazabilidad
+        completa.
+        :param n_sondeos: Listas abiertas por consulta; 0 desactiva el modo.
+        :param n_listas: Listas del índice; por defecto, la raíz del número de libros.
+        :return: False si se pidió el modo y NumPy no está instalado.
+        """
+        if n_sondeos and not numpy_disponible():
+            print("❌ Error: El modo aproximado necesita NumPy instalado.")
+            return False
+        if n_listas != self.listas_aproximadas:
+            self.indice_aproximado = None
+        self.sondeos_aproximados = n_sondeos or 0
+        self.listas_aproximadas = n_listas
+        # Los rankings en caché pueden no coincidir con los del nuevo modo.
+        self.invalidar_cache()
+        return True
+
+    def obtener_indice_aproximado(self, libros):
+        """Devuelve el IndiceIVF del catálogo `libros`, construyéndolo si hace falta."""
+        indice = self.indice_aproximado
+        if indice is None or indice.libros is not libros:
+            indice = IndiceIVF(libros, COLUMNAS_ATRIBUTOS, self.listas_aproximadas)
+            if libros is self.libros:
+                self.indice_aproximado = indice
+        return indice
+
+    def medir_recall(self, lista_de_respuestas, k=2):
+        """
+        Recall@k del modo aproximado frente al motor exacto.
+
+        :param lista_de_respuestas: Conjuntos de respuestas con los que medir.
+        :return: Fracción (0 a 1) de los k mejores libros exactos que el índice IVF también
+                 devuelve, o None si el modo no está activo o no hubo resultados.
+        """
+        if not self.sondeos_aproximados:
+            return None
+        libros = self.libros
+        indice = self.obtener_indice_aproximado(libros)
+        encontrados = esperados = 0
+        for respuestas in lista_de_respuestas:
+            exactos = heapq.nlargest(k, self.puntuar_libros(respuestas, libros=libros).items(),
+                                     key=lambda item: item[1])
+            aproximados = indice.mejores(self.activaciones_ordenadas(respuestas), k, self.sondeos_aproximados)
+            exactas = {posicion for posicion, _ in exactos}
+            esperados += len(exactas)
+            encontrados += len(exactas & {posicion for posicion, _ in aproximados})
+        return encontrados / esperados if esperados else None
+
+    def usar_catalogo_sqlite(self, catalogo):
+        """
+        Activa el catálogo en SQLite como Base de Hechos.
+
+        La puntuación y la selección de los k mejores se delegan a una única consulta SQL
+        indexada y los resultados se leen fila a fila, así que el arranque no depende del
+        tamaño del catálogo. Con None se vuelve al catálogo en memoria.
+        :param catalogo: Instancia de catalogo_sqlite.CatalogoSQLite, o None.
+        """
+        self.catalogo_sqlite = catalogo
+        self.invalidar_cache()
+
+    def cargar_reglas(self, ruta=None):
+        """
+        Carga las reglas de inferencia (el conocimiento experto) desde el archivo JSON.
+
+        Cada entrada mapea una respuesta posible de la GUI a un atributo del libro con un
+        Factor de Certeza (FC) específico. En lugar de "respuesta_usuario", una regla puede
+        tener una "premisa" compuesta, ej: {"y": ["Fantasia", "Ritmo Rápido"]} o
+        {"o": [...]}, anidables. Si el archivo no es válido se conservan las reglas que ya
+        estaban cargadas.
+        :param ruta: Archivo de reglas a usar; por defecto, el último cargado (REGLAS_FILE).
+        """
+        ruta = ruta or self.ruta_reglas
+        try:
+            # La fecha se toma antes de leer: si el archivo cambia durante la lectura,
+            # la siguiente revisión volverá a cargarlo.
+            mtime = os.stat(ruta).st_mtime_ns
+            with open(ruta, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            reglas = [ReglaInferencia(premisa_desde_json(r['premisa']) if 'premisa' in r else r['respuesta_usuario'],
+                                      r['atributo_esperado'], float(r['fc']), r.get('pregunta'))
+                      for r in data.get('reglas', [])]
+        except FileNotFoundError:
+            print(f"❌ Error: El archivo {ruta} no fue encontrado.")
+            return False
+        except json.JSONDecodeError:
+            print(f"❌ Error: El archivo de reglas JSON no es válido.")
+            return False
+        except (KeyError, TypeError, ValueError):
+            print(f"❌ Error: El archivo {ruta} contiene una regla incompleta.")
+            return False
+
+        self.reglas = reglas
+        self.compilar_reglas()
+        self.ruta_reglas = ruta
+        self.mtime_reglas = mtime
+        self.ultima_revision_reglas = time.monotonic()
+        return True
+
+    def compilar_reglas(self):
+        """
+        Compila `self.reglas` en una red de discriminación (RedRete).
+
+        Emparejar una respuesta pasa a ser una búsqueda por hash de su nodo alfa en lugar de
+        comparar la respuesta contra todas las reglas; las premisas compuestas solo se
+        reevalúan cuando cambia alguna de sus condiciones.
+        """
+        # Se asigna de una sola vez para que una inferencia en curso no vea una red a medias.
+        self.red_reglas = RedRete(self.reglas)
+        self.invalidar_cache()
+
+    def recargar_reglas_si_cambiaron(self):
+        """
+        Recarga las reglas en caliente si su archivo se modificó desde la última carga.
+
+        La fecha del archivo se consulta como mucho una vez cada INTERVALO_REVISION_REGLAS
+        segundos, así que llamarla en cada inferencia es prácticamente gratis.
+        :return: True si se recargaron las reglas.
+        """
+        if not self.revision_reglas_pendiente():
+            return False
+        self.ultima_revision_reglas = time.monotonic()
+        try:
+            mtime = os.stat(self.ruta_reglas).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self.mtime_reglas:
+            return False
+        # Se marca esta versión como vista aunque falle, para no reportar el mismo error
+        # en cada revisión; se volverá a intentar cuando el archivo cambie de nuevo.
+        self.mtime_reglas = mtime
+        return self.cargar_reglas(self.ruta_reglas)
+
+    def revision_reglas_pendiente(self):
+        """
+        Indica si toca revisar la fecha del archivo de reglas (solo compara relojes, sin
+        tocar el disco), para que quien sirve desde la caché sepa cuándo llamar a
+        recargar_reglas_si_cambiaron.
+        """
+        return (self.mtime_reglas is not None
+                and time.monotonic() - self.ultima_revision_reglas >= INTERVALO_REVISION_REGLAS)
+
+    def reglas_activadas(self, respuestas_usuario):
+        """
+        Devuelve, en orden, las reglas que se activan con las respuestas del usuario.
+
+        Una regla se activa cuando su premisa se cumple con las respuestas dadas hasta ese
+        momento (Encadenamiento Hacia Adelante). Cada respuesta se afirma en la red compilada
+        y solo se evalúan los nodos que dependen de ella.
+        """
+        memoria = self.red_reglas.crear_memoria()
+        for respuesta in respuestas_usuario:
+            yield from memoria.afirmar(respuesta)
+
+    def puntuar_libros(self, respuestas_usuario, traza=None, libros=None, reglas=None):
         """
         Implementa el Encadenamiento Hacia Adelante con Ponderación (FC). 
         
         Evalúa las respuestas del usuario contra la base de reglas para puntuar los libros.
         :param respuestas_usuario: Lista de cadenas con las opciones elegidas por el usuario.
-        :return: Lista de diccionarios con la información de los libros recomendados y una lista de trazabilidad.
+        :param traza: TrazaInferencia opcional donde se registran los eventos del razonamiento.
+        :param libros: Catálogo a puntuar (por defecto, el publicado en self.libros).
+        :param reglas: Reglas ya activadas por esas respuestas, si el llamador las obtuvo antes.
+        :return: Diccionario {posición_libro: Puntaje_Total} en el orden en que se puntuó cada libro.
         """
-        # Diccionario para almacenar la puntuación acumulada de cada libro: {ID_Libro: Puntaje_Total}
+        # Diccionario para almacenar la puntuación acumulada de cada libro: {posición_libro: Puntaje_Total}
         puntajes_libros = {}
-        # Lista para registrar qué reglas se activaron y por qué (trazabilidad del razonamiento).
-        trazabilidad = []
-        
-        # 1. Proceso de Inferencia (Iteración sobre las respuestas del usuario)
-        for respuesta in respuestas_usuario:
-            # Por cada respuesta del usuario, busca qué reglas de la Base de Reglas se activan.
-            for regla in self.reglas:
-                # Condición de activación de la regla (Encadenamiento Hacia Adelante)
-                if regla.respuesta_usuario == respuesta:
-                    # Registra la activación de la regla para la trazabilidad.
-                    trazabilidad.append(f"Regla Activada: {regla.respuesta_usuario} -> {regla.atributo_esperado} (FC: {regla.fc})")
-
-                    atributo_buscado = regla.atributo_esperado
-                    fc = regla.fc
+        libros = self.libros if libros is None else libros
+        ratings = libros.ratings
+        indice_atributos = libros.indice_atributos
+        nivel = traza.nivel if traza is not None else TRAZA_NINGUNA
+        if reglas is None:
+            reglas = self.reglas_activadas(respuestas_usuario)
+
+        # 1. Proceso de Inferencia (Encadenamiento Hacia Adelante sobre las reglas activadas)
+        for regla in reglas:
+            atributo_buscado = regla.atributo_esperado
+            fc = regla.fc
+
+            # Registra la activación de la regla para la trazabilidad (solo si se pidió).
+            if nivel >= TRAZA_REGLAS:
+                traza.eventos.append((regla, None, fc, None))
                     
-                    # 2. Búsqueda y Ponderación en la Base de Hechos (Libros JSON)
-                    # Una vez que una regla se activa, se aplica su conclusión a todos los libros.
-                    for libro in self.libros:
-                        # Extraemos los atributos relevantes del libro en una lista para facilitar la búsqueda.
-                        atributos_libro = [
-                            libro['Atributo_1_Genero'],
-                            libro['Atributo_2_Ritmo'],
-                            libro['Atributo_3_Complejidad'],
-                            libro['Atributo_4_Motivacion'],
-                            libro['Atributo_5_Compromiso']
-                        ]
-                        
-                        # Si el atributo buscado por la regla está presente en el libro, se puntúa.
-                        if atributo_buscado in atributos_libro:
-                            libro_id = libro['ID_Libro']
-                            titulo = libro['Titulo']
-                            # El 'Rating_Base' actúa como un puntaje inicial o de popularidad.
-                            rating_base = libro['Rating_Base'] 
-                            
-                            puntuacion_regla = fc
-                            
-                            # Inicialización del puntaje del libro: si el libro no tiene puntaje, 
-                            # se inicializa con su Rating_Base.
-                            if libro_id not in puntajes_libros:
-                                puntajes_libros[libro_id] = rating_base
-                                
-                            # Acumulación: Sumamos el Factor de Certeza de la regla activada al puntaje total.
-                            puntajes_libros[libro_id] += puntuacion_regla
-
-                            trazabilidad.append(f"  |-> Acumulando: Libro '{titulo}' recibió +{fc}. Total: {puntajes_libros[libro_id]:.2f}")
-
-        # 3. Clasificación y Salida
-        # Ordenamos los libros en orden descendente por su puntaje acumulado.
-        recomendaciones_ordenadas = sorted(
-            puntajes_libros.items(), # puntajes_libros.items() devuelve [(id, puntaje), ...]
-            key=lambda item: item[1], # La clave de ordenamiento es el puntaje (item[1]).
-            reverse=True # Orden descendente (el más alto primero).
-        )
-        
+            # 2. Búsqueda y Ponderación en la Base de Hechos (Libros JSON)
+            # El índice invertido entrega directamente los libros que tienen el atributo,
+            # así que solo se recorren los libros que la regla realmente puntúa.
+            libros_activados = indice_atributos.get(atributo_buscado, ())
+            if nivel >= TRAZA_COMPLETA:
+                for posicion in libros_activados:
+                    if posicion not in puntajes_libros:
+                        puntajes_libros[posicion] = ratings[posicion]
+                    puntajes_libros[posicion] += fc
+                    traza.eventos.append((regla, posicion, fc, puntajes_libros[posicion]))
+            else:
+                for posicion in libros_activados:
+                    # Acumulación: Sumamos el Factor de Certeza de la regla activada al puntaje total.
+                    if posicion in puntajes_libros:
+                        puntajes_libros[posicion] += fc
+                    else:
+                        # El 'Rating_Base' actúa como un puntaje inicial o de popularidad.
+                        puntajes_libros[posicion] = ratings[posicion] + fc
+
+        return puntajes_libros
+
+    def inferir_recomendaciones(self, respuestas_usuario, k=2, nivel_traza=TRAZA_NINGUNA):
+        """
+        Puntúa los libros y devuelve los k mejores.
+
+        Sin trazabilidad, el resultado se sirve desde la caché de rankings cuando esa
+        combinación de respuestas ya se calculó con las reglas y el catálogo actuales.
+        :param respuestas_usuario: Lista de cadenas con las opciones elegidas por el usuario.
+        :param k: Número de recomendaciones a devolver (2 en la pantalla de resultados).
+        :param nivel_traza: TRAZA_NINGUNA (por defecto), TRAZA_REGLAS o TRAZA_COMPLETA.
+        :return: Lista de diccionarios con la información de los libros recomendados y la TrazaInferencia.
+        """
+        self.recargar_reglas_si_cambiaron()
+        # La versión se lee antes de tomar el catálogo: si se publica una edición entre ambos,
+        # el resultado se calcula con el catálogo nuevo y se descarta en lugar de guardarse.
+        version = self.version_conocimiento
+        # Registro del razonamiento; queda vacío si no se pidió trazabilidad.
+        traza = TrazaInferencia(nivel_traza, self.libros)
+
+        # Una traza necesita recorrer la inferencia, así que solo sin ella se usa la caché.
+        if nivel_traza != TRAZA_NINGUNA:
+            return self.calcular_recomendaciones(respuestas_usuario, k, traza), traza
+
+        clave = (tuple(respuestas_usuario), k)
+        recomendaciones = self.consultar_cache(clave)
+        if recomendaciones is None:
+            recomendaciones = self.calcular_recomendaciones(respuestas_usuario, k, traza)
+            self.guardar_en_cache(clave, recomendaciones, version)
+        # Copias, para que quien reciba el resultado no pueda alterar la caché.
+        return [dict(r) for r in recomendaciones], traza
+
+    def calcular_recomendaciones(self, respuestas_usuario, k, traza):
+        """Ejecuta la inferencia completa (sin caché) y devuelve los k mejores libros."""
+        inicio = reloj()
+        if self.catalogo_sqlite is not None:
+            # Con SQLite la consulta puntúa y ordena; la traza solo registra las reglas.
+            activaciones = self.activaciones_ordenadas(respuestas_usuario, traza)
+            fin_reglas = reloj()
+            recomendaciones = list(self.catalogo_sqlite.iterar_puntuados(activaciones, k))
+            self.metricas.registrar_inferencia(reglas=fin_reglas - inicio, puntuacion=reloj() - fin_reglas,
+                                               reglas_disparadas=len(activaciones))
+            return recomendaciones
+
+        # Toda la inferencia usa el catálogo con el que se creó la traza.
+        libros = traza.libros if traza is not None else self.libros
+        completa = traza is not None and traza.nivel >= TRAZA_COMPLETA
+        n_sondeos = self.sondeos_aproximados
+        # Modos con índice: devuelven ya los k mejores (puntuación y ranking en un solo paso).
+        indice = None
+        if n_sondeos and not completa:
+            # Candidatos del índice IVF, re-puntuados de forma exacta.
+            indice = self.obtener_indice_aproximado(libros)
+        elif not completa:
+            # Cada proceso puntúa su fragmento; aquí solo se combinan sus k mejores.
+            indice = self.obtener_fragmentos(libros)
+            if indice is None and self.top_k_umbral:
+                indice = self.indice_umbral
+                if indice is None or indice.libros is not libros:
+                    indice = IndiceUmbral(libros, COLUMNAS_ATRIBUTOS)
+                    if libros is self.libros:
+                        self.indice_umbral = indice
+
+        if indice is not None:
+            activaciones = self.activaciones_ordenadas(respuestas_usuario, traza)
+            fin_reglas = reloj()
+            if n_sondeos:
+                mejores = indice.mejores(activaciones, k, n_sondeos)
+            else:
+                mejores = indice.mejores(activaciones, k)
+            fin_puntuacion = fin_ranking = reloj()
+            n_reglas = len(activaciones)
+            libros_tocados = getattr(indice, 'libros_evaluados', 0)
+        else:
+            reglas = list(self.reglas_activadas(respuestas_usuario))
+            fin_reglas = reloj()
+            puntajes_libros = self.puntuar_libros(respuestas_usuario, traza, libros, reglas)
+            fin_puntuacion = reloj()
+
+            # 3. Clasificación y Salida
+            # heapq.nlargest mantiene un montículo de tamaño k en lugar de ordenar todos los libros
+            # puntuados; ante empates conserva el orden de llegada, igual que sorted(...)[:k].
+            mejores = heapq.nlargest(k, puntajes_libros.items(), key=lambda item: item[1])
+            fin_ranking = reloj()
+            n_reglas = len(reglas)
+            libros_tocados = len(puntajes_libros)
+
         # 4. Obtener la información completa de los libros recomendados
-        recomendaciones_finales = []
-        # Tomamos solo las 2 mejores recomendaciones (los dos primeros elementos).
-        for libro_id, puntaje in recomendaciones_ordenadas[:2]: 
-            # Busca la información completa del libro en la lista original 'self.libros'.
-            libro_info = next((l for l in self.libros if l['ID_Libro'] == libro_id), None)
-            
-            if libro_info:
-                # Estructura el diccionario final con el puntaje total.
-                recomendaciones_finales.append({
-                    "ID_Libro": libro_id,
-                    "Titulo": libro_info['Titulo'],
-                    "Autor": libro_info['Autor'],
-                    "Ruta_Imagen": libro_info['Ruta_Imagen'],
-                    "Puntaje_Total": puntaje # Puntaje total (Rating_Base + suma de FC).
-                })
-
-        # Devuelve la lista de las 2 mejores recomendaciones y el registro de la inferencia.
-        return recomendaciones_finales, trazabilidad
\ No newline at end of file
+        recomendaciones = [self.crear_recomendacion(posicion, puntaje, libros) for posicion, puntaje in mejores]
+        self.metricas.registrar_inferencia(fin_reglas - inicio, fin_puntuacion - fin_reglas,
+                                           fin_ranking - fin_puntuacion, reloj() - fin_ranking,
+                                           n_reglas, libros_tocados)
+        return recomendaciones
+
+    # --- CACHÉ Y TABLA PRECALCULADA ---
+    def consultar_cache(self, clave, contar=True):
+        """
+        Devuelve el ranking guardado para (respuestas, k), o None si no está en caché.
+
+        :param contar: Si es False, la consulta no cuenta en las métricas de aciertos (precálculo).
+        """
+        with self.cerrojo_cache:
+            recomendaciones = self.cache_ranking.get(clave)
+            if recomendaciones is not None:
+                # Marca la entrada como usada recientemente (política LRU).
+                self.cache_ranking.move_to_end(clave)
+        if contar:
+            self.metricas.registrar_cache(recomendaciones is not None)
+        return recomendaciones
+
+    def guardar_en_cache(self, clave, recomendaciones, version):
+        """
+        Guarda un ranking si se calculó con la versión vigente del conocimiento.
+
+        :param version: Valor de version_conocimiento al comenzar el cálculo; si las reglas o
+                        el catálogo cambiaron mientras tanto, el resultado se descarta.
+        """
+        with self.cerrojo_cache:
+            if version != self.version_conocimiento:
+                return
+            self.cache_ranking[clave] = [dict(r) for r in recomendaciones]
+            self.cache_ranking.move_to_end(clave)
+            while len(self.cache_ranking) > TAMANO_CACHE_RANKING:
+                self.cache_ranking.popitem(last=False)
+
+    def invalidar_cache(self):
+        """
+        Descarta los rankings guardados porque cambiaron las reglas o el catálogo.
+
+        Si se había pedido la tabla precalculada, se vuelve a construir en segundo plano.
+        """
+        with self.cerrojo_cache:
+            self.version_conocimiento += 1
+            self.cache_ranking.clear()
+        if self.k_precalculo is not None:
+            self.precalcular_espacio_respuestas(self.k_precalculo)
+
+    def invalidar_cache_por_libros(self, libros, posiciones, ids_afectados):
+        """
+        Descarta solo los rankings en caché que una edición del catálogo puede cambiar.
+
+        Un ranking se descarta si contiene alguno de los libros editados, o si alguno de ellos
+        (con sus datos nuevos) empareja una de sus reglas y alcanza el puntaje del último
+        libro del ranking. Los demás siguen siendo exactos y se conservan. Con lotes grandes
+        se vacía la caché completa.
+        :param libros: Catálogo editado (antes de compactar), para leer los libros nuevos.
+        :param posiciones: Posiciones editadas en `libros`.
+        :param ids_afectados: ID_Libro de todos los libros agregados, actualizados o eliminados.
+        """
+        if len(posiciones) > EDICIONES_MAX_INVALIDACION_SELECTIVA:
+            self.invalidar_cache()
+            return
+        editados = [(set(libros.codigos_libro(posicion)), libros.ratings[posicion])
+                    for posicion in posiciones if libros.vigente(posicion)]
+        with self.cerrojo_cache:
+            # Los cálculos que empezaron con el catálogo anterior ya no se guardan.
+            self.version_conocimiento += 1
+            entradas = list(self.cache_ranking.items())
+
+        descartadas = []
+        for clave, recomendaciones in entradas:
+            (respuestas, k) = clave
+            if any(r['ID_Libro'] in ids_afectados for r in recomendaciones):
+                descartadas.append(clave)
+                continue
+            codificadas = [(libros.codigo_valor.get(atributo, -1), fc)
+                           for atributo, fc in self.activaciones_ordenadas(respuestas)]
+            minimo = recomendaciones[-1]['Puntaje_Total'] if len(recomendaciones) >= k else None
+            for codigos, rating in editados:
+                # Mismo orden de suma que puntuar_libros, para comparar puntajes exactos.
+                puntaje, emparejado = rating, False
+                for codigo, fc in codificadas:
+                    if codigo in codigos:
+                        puntaje += fc
+                        emparejado = True
+                if emparejado and (minimo is None or puntaje >= minimo):
+                    descartadas.append(clave)
+                    break
+
+        with self.cerrojo_cache:
+            for clave in descartadas:
+                self.cache_ranking.pop(clave, None)
+        if self.k_precalculo is not None:
+            # Recalcula en segundo plano solo las combinaciones descartadas.
+            self.precalcular_espacio_respuestas(self.k_precalculo)
+
+    def espacio_respuestas(self):
+        """
+        Enumera todas las combinaciones de respuestas del cuestionario.
+
+        Las opciones de cada pregunta salen de las reglas (campo 'pregunta'), en el orden en
+        que aparecen en el archivo: 4 géneros x 2 ritmos x 3 complejidades x 3 motivaciones x
+        3 compromisos = 216 combinaciones con las reglas actuales.
+        """
+        return itertools.product(*self.opciones_por_pregunta().values())
+
+    def opciones_por_pregunta(self):
+        """Opciones de cada pregunta del cuestionario {pregunta: [respuestas]}, en el orden del archivo."""
+        opciones = {}
+        for regla in self.reglas:
+            # Las reglas compuestas combinan respuestas que ya aparecen en las simples.
+            if regla.pregunta is not None and regla.es_simple():
+                opciones.setdefault(regla.pregunta, {})[regla.respuesta_usuario] = None
+        return {pregunta: list(respuestas) for pregunta, respuestas in opciones.items()}
+
+    def precalcular_espacio_respuestas(self, k=2, en_segundo_plano=True):
+        """
+        Calcula el ranking de todas las combinaciones de respuestas y lo guarda en la caché.
+
+        Después, cada petición del cuestionario es una búsqueda en diccionario. La tabla se
+        reconstruye sola (en segundo plano) cada vez que cambian las reglas o el catálogo.
+        :param k: Número de recomendaciones por combinación.
+        :param en_segundo_plano: Si es True, el cálculo corre en un hilo daemon.
+        :return: El hilo lanzado, o None si el cálculo se hizo en el hilo actual.
+        """
+        self.k_precalculo = k
+        version = self.version_conocimiento
+        if not en_segundo_plano:
+            self._llenar_tabla(k, version)
+            return None
+        hilo = threading.Thread(target=self._llenar_tabla, args=(k, version),
+                                name="precalculo-recomendaciones", daemon=True)
+        hilo.start()
+        return hilo
+
+    def _llenar_tabla(self, k, version):
+        """Recorre el espacio de respuestas; se detiene si el conocimiento cambia a mitad."""
+        traza = TrazaInferencia(TRAZA_NINGUNA, self.libros)
+        for combinacion in self.espacio_respuestas():
+            if version != self.version_conocimiento:
+                return
+            clave = (combinacion, k)
+            if self.consultar_cache(clave, contar=False) is None:
+                self.guardar_en_cache(clave, self.calcular_recomendaciones(combinacion, k, traza), version)
+
+    def iterar_recomendaciones(self, respuestas_usuario):
+        """
+        Generador perezoso del ranking completo ("mostrar más").
+
+        La inferencia se ejecuta una sola vez; después cada libro se extrae de un montículo
+        solo cuando se pide, así que recorrer las primeras páginas cuesta O(n + p·log n)
+        en lugar de ordenar todo el catálogo puntuado.
+        :param respuestas_usuario: Lista de cadenas con las opciones elegidas por el usuario.
+        :return: Iterador de diccionarios de libros en orden de recomendación.
+        """
+        self.recargar_reglas_si_cambiaron()
+        if self.catalogo_sqlite is not None:
+            # El cursor de SQLite ya entrega el ranking ordenado, fila a fila.
+            yield from self.catalogo_sqlite.iterar_puntuados(self.activaciones_ordenadas(respuestas_usuario))
+            return
+
+        libros = self.libros
+        puntajes_libros = self.puntuar_libros(respuestas_usuario, libros=libros)
+        # (-puntaje, orden_de_llegada, posición) reproduce el desempate de inferir_recomendaciones.
+        monticulo = [(-puntaje, orden, posicion)
+                     for orden, (posicion, puntaje) in enumerate(puntajes_libros.items())]
+        heapq.heapify(monticulo)
+        while monticulo:
+            puntaje_negativo, _, posicion = heapq.heappop(monticulo)
+            yield self.crear_recomendacion(posicion, -puntaje_negativo, libros)
+
+    def activaciones_ordenadas(self, respuestas_usuario, traza=None):
+        """Lista ordenada de pares (atributo_esperado, fc) para CatalogoSQLite o los fragmentos paralelos."""
+        activaciones = []
+        for regla in self.reglas_activadas(respuestas_usuario):
+            if traza is not None and traza.nivel >= TRAZA_REGLAS:
+                traza.eventos.append((regla, None, regla.fc, None))
+            activaciones.append((regla.atributo_esperado, regla.fc))
+        return activaciones
+
+    def crear_recomendacion(self, posicion, puntaje, libros=None):
+        """
+        Estructura el diccionario de salida de un libro recomendado a partir de sus columnas.
+
+        :param libros: Catálogo con el que se puntuó (por defecto, el publicado en self.libros).
+        """
+        libros = self.libros if libros is None else libros
+        return {
+            "ID_Libro": libros.ids[posicion],
+            "Titulo": libros.titulos[posicion],
+            "Autor": libros.autores[posicion],
+            "Ruta_Imagen": libros.rutas_imagen[posicion],
+            "Puntaje_Total": puntaje # Puntaje total (Rating_Base + suma de FC).
+        }
+
+    def crear_estado_incremental(self):
+        """Crea un EstadoIncremental para puntuar un cuestionario pregunta a pregunta."""
+        return EstadoIncremental(self)
+
+    def inferir_lote(self, lista_de_respuestas, k=2):
+        """
+        Calcula las recomendaciones de muchos usuarios en una sola llamada.
+
+        Con NumPy instalado, el catálogo se codifica una vez como matriz de atributos y cada
+        bloque de usuarios se puntúa con operaciones de arreglos sobre todo el catálogo.
+        Sin NumPy pero con el modo paralelo activo, el lote completo se envía de una vez a
+        cada fragmento. En otro caso (o con el catálogo en SQLite o el modo aproximado), se recurre a
+        `calcular_recomendaciones` usuario por usuario. El lote nunca consulta la caché de rankings
+        (quien lo llama ya la consultó), así que cada usuario cuenta como mucho un fallo en las métricas.
+        :param lista_de_respuestas: Lista de listas de respuestas (una por usuario).
+        :param k: Número de recomendaciones por usuario.
+        :return: Lista (una por usuario) de listas de diccionarios de libros recomendados.
+        """
+        self.recargar_reglas_si_cambiaron()
+        if self.catalogo_sqlite is not None or self.sondeos_aproximados:
+            return [self.calcular_recomendaciones(respuestas, k, None) for respuestas in lista_de_respuestas]
+        libros = self.libros
+        if not numpy_disponible():
+            fragmentos = self.obtener_fragmentos(libros)
+            if fragmentos is None:
+                return [self.calcular_recomendaciones(respuestas, k, None) for respuestas in lista_de_respuestas]
+            inicio = reloj()
+            lista_activaciones = [self.activaciones_ordenadas(respuestas) for respuestas in lista_de_respuestas]
+            fin_reglas = reloj()
+            selecciones = fragmentos.mejores_lote(lista_activaciones, k)
+            return self._materializar_lote(selecciones, libros, lista_activaciones, inicio, fin_reglas)
+
+        matriz = self.matriz_catalogo
+        if matriz is None or matriz.libros is not libros:
+            matriz = MatrizCatalogo(libros, COLUMNAS_ATRIBUTOS)
+            if libros is self.libros:
+                self.matriz_catalogo = matriz
+
+        inicio = reloj()
+        lista_activaciones = [matriz.codificar_activaciones(self.reglas_activadas(respuestas))
+                              for respuestas in lista_de_respuestas]
+        fin_reglas = reloj()
+        selecciones = matriz.puntuar_lote(lista_activaciones, k)
+        return self._materializar_lote(selecciones, libros, lista_activaciones, inicio, fin_reglas)
+
+    def _materializar_lote(self, selecciones, libros, lista_activaciones, inicio, fin_reglas):
+        """Construye los resultados de un lote y registra sus tiempos (puntuación y ranking van juntos)."""
+        fin_puntuacion = reloj()
+        resultados = [[self.crear_recomendacion(posicion, puntaje, libros) for posicion, puntaje in seleccion]
+                      for seleccion in selecciones]
+        self.metricas.registrar_inferencia(fin_reglas - inicio, fin_puntuacion - fin_reglas, 0.0,
+                                           reloj() - fin_puntuacion,
+                                           sum(len(activaciones) for activaciones in lista_activaciones),
+                                           inferencias=len(resultados))
+        return resultados
+
+class EdicionCatalogo:
+    """
+    Lote de ediciones del catálogo (ver MotorRecomendacion.editar_catalogo).
+
+    Trabaja sobre una copia del catálogo publicado que mantiene su índice invertido y su
+    mapa de IDs libro a libro; al cerrar el lote, el motor la publica de una sola vez.
+    Los lotes se aplican de a uno: abrir otro espera a que termine el anterior.
+    """
+
+    def __init__(self, motor):
+        self.motor = motor
+        # Catálogo publicado al abrir el lote y su copia editable.
+        self.anterior = None
+        self.libros = None
+        # Posiciones tocadas en la copia e ID_Libro de los libros afectados.
+        self.posiciones = set()
+        self.ids_afectados = set()
+
+    def __enter__(self):
+        self.motor.cerrojo_edicion.acquire()
+        try:
+            self.anterior = self.motor.libros
+            self.libros = self.anterior.copiar()
+        except BaseException:
+            self.motor.cerrojo_edicion.release()
+            raise
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            if tipo is None and self.posiciones:
+                self.motor.publicar_edicion(self)
+        finally:
+            self.motor.cerrojo_edicion.release()
+        return False
+
+    def agregar(self, libro):
+        """
+        Añade un libro al final del catálogo.
+
+        :raises ValueError: Si ya existe un libro con su ID_Libro o sus campos no son válidos.
+        :raises KeyError: Si al libro le falta un campo.
+        """
+        if self.libros.posicion_de(libro['ID_Libro']) is not None:
+            raise ValueError(f"Ya existe un libro con ID_Libro {libro['ID_Libro']!r}")
+        posicion = self.libros.agregar(libro)
+        self.posiciones.add(posicion)
+        self.ids_afectados.add(libro['ID_Libro'])
+        return posicion
+
+    def actualizar(self, libro):
+        """
+        Reemplaza los datos del libro con el mismo ID_Libro.
+
+        :raises ValueError: Si no existe ese libro o sus campos no son válidos.
+        :raises KeyError: Si al libro le falta un campo.
+        """
+        posicion = self._posicion(libro['ID_Libro'])
+        self.libros.actualizar(posicion, libro)
+        self.posiciones.add(posicion)
+        self.ids_afectados.add(libro['ID_Libro'])
+        return posicion
+
+    def eliminar(self, libro_id):
+        """
+        Quita el libro con ese ID_Libro.
+
+        :raises ValueError: Si no existe ese libro.
+        """
+        posicion = self._posicion(libro_id)
+        self.libros.eliminar(posicion)
+        self.posiciones.add(posicion)
+        self.ids_afectados.add(libro_id)
+        return posicion
+
+    def _posicion(self, libro_id):
+        posicion = self.libros.posicion_de(libro_id)
+        if posicion is None:
+            raise ValueError(f"No existe un libro con ID_Libro {libro_id!r}")
+        return posicion
+
+class EstadoIncremental:
+    """
+    Puntuación incremental de un cuestionario en curso.
+
+    Cada respuesta aplica el delta de sus reglas en cuanto se elige y guarda un registro
+    para deshacerlo (posición_libro, puntaje anterior). Retroceder restaura exactamente esos
+    valores, sin restas en coma flotante, así que el estado siempre coincide con el de
+    puntuar desde cero las respuestas vigentes, y el último paso solo lee los k mejores.
+
+    Cada cambio de puntaje se anota también en un montículo (-puntaje, orden, posición) con
+    invalidación perezosa, para que leer los k mejores después de cada clic no recorra todos
+    los libros puntuados: las entradas cuyo puntaje u orden ya no coinciden se descartan al
+    llegar a la cima, y el montículo se reconstruye cuando las vencidas son demasiadas.
+    """
+
+    def __init__(self, motor):
+        """
+        :param motor: MotorRecomendacion con las reglas y el catálogo cargados.
+        """
+        self.motor = motor
+        # Puntajes acumulados {posición_libro: Puntaje_Total}, en el orden en que se puntuó cada libro.
+        self.puntajes = {}
+        # Orden en que se puntuó cada libro {posición_libro: n} (desempate, igual que el de `puntajes`).
+        self.orden = {}
+        self.siguiente_orden = 0
+        # Montículo de mínimos (-puntaje, orden, posición); puede tener entradas vencidas.
+        self.monticulo = []
+        # Pila de pasos aplicados: (paso, respuesta, registro_para_deshacer).
+        self.pila = []
+        # Respuestas afirmadas en la red de reglas (para las premisas compuestas).
+        self.memoria = motor.red_reglas.crear_memoria()
+        # Versión del conocimiento con la que se calcularon los puntajes y catálogo usado.
+        self.version = motor.version_conocimiento
+        self.libros = motor.libros
+
+    def respuestas(self):
+        """Respuestas aplicadas, en el orden de los pasos del cuestionario."""
+        return [respuesta for _, respuesta, _ in self.pila]
+
+    def fijar_respuesta(self, paso, respuesta):
+        """
+        Aplica (o reemplaza) la respuesta de un paso del cuestionario.
+
+        Si el paso ya tenía otra respuesta, se deshace primero su delta, junto con el de
+        cualquier paso posterior.
+        :param paso: Número de la pregunta (1, 2, ...).
+        :param respuesta: Opción elegida (ej: "Fantasia").
+        """
+        if self.pila and self.pila[-1][0] == paso and self.pila[-1][1] == respuesta:
+            return
+        self.deshacer_desde(paso)
+        self.pila.append((paso, respuesta, self._aplicar(respuesta)))
+
+    def deshacer_desde(self, paso):
+        """Deshace los deltas del paso indicado y de todos los posteriores."""
+        while self.pila and self.pila[-1][0] >= paso:
+            _, respuesta, registro = self.pila.pop()
+            self.memoria.retractar(respuesta)
+            # En orden inverso, para restaurar el valor más antiguo si un libro se tocó dos veces.
+            for posicion, anterior in reversed(registro):
+                if anterior is None:
+                    del self.puntajes[posicion]
+                    del self.orden[posicion]
+                else:
+                    self.puntajes[posicion] = anterior
+                    heapq.heappush(self.monticulo, (-anterior, self.orden[posicion], posicion))
+
+    def reiniciar(self):
+        """Vacía el estado para comenzar un cuestionario nuevo."""
+        self.puntajes = {}
+        self.orden = {}
+        self.siguiente_orden = 0
+        self.monticulo = []
+        self.pila = []
+        self.memoria = self.motor.red_reglas.crear_memoria()
+        self.version = self.motor.version_conocimiento
+        self.libros = self.motor.libros
+
+    def mejores(self, k=2):
+        """
+        Devuelve los k mejores libros con las respuestas aplicadas hasta ahora.
+
+        Si las reglas o el catálogo cambiaron desde que se aplicaron las respuestas, los
+        deltas se recalculan antes de leer el resultado.
+        """
+        motor = self.motor
+        motor.recargar_reglas_si_cambiaron()
+        respuestas = self.respuestas()
+        if motor.catalogo_sqlite is not None:
+            return motor.inferir_recomendaciones(respuestas, k)[0]
+
+        recomendaciones = motor.consultar_cache((tuple(respuestas), k))
+        if recomendaciones is not None:
+            return [dict(r) for r in recomendaciones]
+
+        if self.version != motor.version_conocimiento:
+            self._reaplicar()
+        return [motor.crear_recomendacion(posicion, puntaje, self.libros)
+                for posicion, puntaje in self.posiciones_mejores(k)]
+
+    def posiciones_mejores(self, k):
+        """
+        Los k mejores (posición_libro, puntaje) con las respuestas aplicadas, de mejor a peor.
+
+        Mismo resultado que heapq.nlargest sobre `puntajes` (empates por orden de puntuación),
+        pero leído de la cima del montículo: O(k log n) más las entradas vencidas descartadas.
+        """
+        puntajes, orden = self.puntajes, self.orden
+        if len(self.monticulo) > 2 * len(puntajes) + HOLGURA_MONTICULO_ESTADO:
+            self.monticulo = [(-puntaje, orden[posicion], posicion) for posicion, puntaje in puntajes.items()]
+            heapq.heapify(self.monticulo)
+        monticulo = self.monticulo
+        elegidas = []
+        vistas = set()
+        while monticulo and len(elegidas) < k:
+            entrada = heapq.heappop(monticulo)
+            negativo, numero, posicion = entrada
+            # Vencida (el puntaje cambió o el libro se deshizo) o repetida: se descarta.
+            if posicion in vistas or orden.get(posicion) != numero or puntajes[posicion] != -negativo:
+                continue
+            vistas.add(posicion)
+            elegidas.append(entrada)
+        # Las vigentes vuelven al montículo: la lectura no modifica el estado.
+        for entrada in elegidas:
+            heapq.heappush(monticulo, entrada)
+        return [(posicion, -negativo) for negativo, _, posicion in elegidas]
+
+    def siguiente_pregunta(self, k=2):
+        """
+        Pregunta que conviene hacer a continuación en un cuestionario adaptativo.
+
+        Es la que más reduce los libros que aún pueden terminar en el top-k; devuelve None
+        cuando el top-k ya no puede cambiar con ninguna respuesta restante (o no quedan
+        preguntas). Ver cuestionario_adaptativo.py.
+        """
+        motor = self.motor
+        motor.recargar_reglas_si_cambiaron()
+        if self.version != motor.version_conocimiento:
+            self._reaplicar()
+        pregunta, _ = siguiente_pregunta(self, k)
+        return pregunta
+
+    def _aplicar(self, respuesta):
+        """Suma el FC de las reglas activadas por la respuesta y devuelve el registro para deshacer."""
+        puntajes, orden, monticulo = self.puntajes, self.orden, self.monticulo
+        ratings = self.libros.ratings
+        indice_atributos = self.libros.indice_atributos
+        registro = []
+        for regla in self.memoria.afirmar(respuesta):
+            fc = regla.fc
+            for posicion in indice_atributos.get(regla.atributo_esperado, ()):
+                anterior = puntajes.get(posicion)
+                registro.append((posicion, anterior))
+                if anterior is None:
+                    puntaje = puntajes[posicion] = ratings[posicion] + fc
+                    orden[posicion] = self.siguiente_orden
+                    self.siguiente_orden += 1
+                else:
+                    puntaje = puntajes[posicion] = anterior + fc
+                heapq.heappush(monticulo, (-puntaje, orden[posicion], posicion))
+        return registro
+
+    def _reaplicar(self):
+        """Vuelve a aplicar todas las respuestas con las reglas y el catálogo actuales."""
+        pasos = [(paso, respuesta) for paso, respuesta, _ in self.pila]
+        self.reiniciar()
+        for paso, respuesta in pasos:
+            self.pila.append((paso, respuesta, self._aplicar(respuesta)))
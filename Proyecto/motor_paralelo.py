@@ -0,0 +1,161 @@
+# =================================================================================
+# motor_paralelo.py (Puntuación del catálogo repartida en varios procesos)
+# =================================================================================
+# El catálogo se divide en fragmentos contiguos y cada fragmento vive en su propio proceso
+# trabajador: se envía una sola vez, al crear el proceso, y allí se construye su índice
+# invertido. En cada petición solo viajan las activaciones (pares atributo, FC) y, de
+# vuelta, los k mejores libros de cada fragmento, que el proceso principal combina.
+import heapq          # Selección de los k mejores en cada fragmento y en la combinación.
+import itertools      # Encadenado de los resultados parciales.
+import multiprocessing # Contexto 'spawn' para crear los procesos trabajadores.
+from array import array # Listas de posiciones compactas dentro de cada fragmento.
+from bisect import bisect_right # Activación que puntuó primero a cada libro.
+from concurrent.futures import ProcessPoolExecutor # Un proceso residente por fragmento.
+
+# Libros mínimos por fragmento: por debajo, el costo de comunicar procesos supera la ganancia.
+LIBROS_MINIMOS_POR_FRAGMENTO = 10_000
+
+# Fragmento del catálogo que atiende el proceso trabajador actual (None en el proceso principal).
+_fragmento = None
+
+
+class FragmentoCatalogo:
+    """
+    Porción contigua del catálogo [inicio, inicio + n) con su propio índice invertido.
+
+    Puntúa igual que MotorRecomendacion.puntuar_libros: mismo orden de suma de los FC y
+    mismo orden de llegada de los libros, así que los puntajes coinciden bit a bit.
+    """
+
+    def __init__(self, inicio, ratings, columnas, valores, eliminados=()):
+        """
+        :param inicio: Posición en el catálogo completo del primer libro del fragmento.
+        :param ratings: array('d') con el Rating_Base de los libros del fragmento.
+        :param columnas: Lista de array('I') con los códigos de cada columna de atributos.
+        :param valores: Tabla código -> valor de atributo del catálogo.
+        :param eliminados: Posiciones (relativas al fragmento) de libros eliminados.
+        """
+        self.inicio = inicio
+        self.ratings = ratings
+        eliminados = set(eliminados)
+        por_codigo = [array('I') for _ in valores]
+        for posicion, codigos in enumerate(zip(*columnas)):
+            if posicion in eliminados:
+                continue
+            # set() elimina valores repetidos dentro del mismo libro.
+            for codigo in set(codigos):
+                por_codigo[codigo].append(posicion)
+        self.indice_atributos = {valor: por_codigo[codigo] for codigo, valor in enumerate(valores)}
+
+    def mejores(self, activaciones, k):
+        """
+        Puntúa el fragmento y devuelve sus k mejores libros.
+
+        :param activaciones: Lista ordenada de pares (atributo_esperado, fc).
+        :return: Lista de tuplas (puntaje, primera_activación, posición_global). Las dos
+                 últimas reproducen el desempate del motor en serie al combinar fragmentos.
+        """
+        puntajes = {}
+        ratings = self.ratings
+        # limites[j]: libros ya puntuados al terminar la activación j. Como el diccionario
+        # conserva el orden de llegada, sirve para saber qué activación puntuó antes a cada libro.
+        limites = []
+        for atributo, fc in activaciones:
+            for posicion in self.indice_atributos.get(atributo, ()):
+                if posicion in puntajes:
+                    puntajes[posicion] += fc
+                else:
+                    puntajes[posicion] = ratings[posicion] + fc
+            limites.append(len(puntajes))
+
+        # Ante empates, nlargest conserva el orden de llegada, igual que el motor en serie.
+        mejores = heapq.nlargest(k, enumerate(puntajes.items()), key=lambda item: item[1][1])
+        return [(puntaje, bisect_right(limites, llegada), self.inicio + posicion)
+                for llegada, (posicion, puntaje) in mejores]
+
+
+# --- FUNCIONES QUE SE EJECUTAN EN LOS PROCESOS TRABAJADORES ---
+def _iniciar_fragmento(inicio, ratings, columnas, valores, eliminados):
+    """Inicializador del proceso: construye su fragmento una sola vez."""
+    global _fragmento
+    _fragmento = FragmentoCatalogo(inicio, ratings, columnas, valores, eliminados)
+
+
+def _contar_libros():
+    """Confirma que el fragmento está listo (y devuelve su tamaño)."""
+    return len(_fragmento.ratings)
+
+
+def _mejores_fragmento(activaciones, k):
+    return _fragmento.mejores(activaciones, k)
+
+
+def _mejores_fragmento_lote(lista_activaciones, k):
+    return [_fragmento.mejores(activaciones, k) for activaciones in lista_activaciones]
+
+
+def combinar_mejores(parciales, k):
+    """
+    Combina los k mejores de cada fragmento en los k mejores globales.
+
+    El orden (puntaje descendente, primera activación, posición) es el mismo que produce
+    el motor en serie, y los k mejores globales siempre están entre los k de algún fragmento.
+    :return: Lista de tuplas (posición_global, puntaje).
+    """
+    mejores = heapq.nsmallest(k, itertools.chain.from_iterable(parciales),
+                              key=lambda item: (-item[0], item[1], item[2]))
+    return [(posicion, puntaje) for puntaje, _, posicion in mejores]
+
+
+class PoolFragmentos:
+    """
+    Conjunto de procesos trabajadores, cada uno con un fragmento residente del catálogo.
+
+    Se usa el método de arranque 'spawn' en todas las plataformas: los procesos no heredan
+    los hilos del proceso principal (ej: el precálculo de la caché) ni sus cerrojos.
+    """
+
+    def __init__(self, libros, columnas, n_procesos):
+        """
+        :param libros: CatalogoColumnar con la Base de Hechos.
+        :param columnas: Columnas de atributos que las reglas pueden buscar.
+        :param n_procesos: Número de fragmentos (y de procesos).
+        """
+        contexto = multiprocessing.get_context('spawn')
+        # Catálogo del que salieron los fragmentos (el motor los descarta si se edita).
+        self.libros = libros
+        n_libros = len(libros.ids)
+        tamano = -(-n_libros // n_procesos)
+        self.ejecutores = []
+        for inicio in range(0, n_libros, tamano):
+            fin = min(n_libros, inicio + tamano)
+            datos = (inicio, libros.ratings[inicio:fin],
+                     [libros.atributos[columna][inicio:fin] for columna in columnas],
+                     list(libros.valores),
+                     [posicion - inicio for posicion in libros.eliminados if inicio <= posicion < fin])
+            self.ejecutores.append(ProcessPoolExecutor(max_workers=1, mp_context=contexto,
+                                                       initializer=_iniciar_fragmento, initargs=datos))
+        # Arranca todos los procesos a la vez y espera a que tengan su fragmento listo.
+        for futuro in [ejecutor.submit(_contar_libros) for ejecutor in self.ejecutores]:
+            futuro.result()
+
+    def __len__(self):
+        return len(self.ejecutores)
+
+    def mejores(self, activaciones, k):
+        """Los k mejores libros del catálogo como lista de (posición, puntaje)."""
+        futuros = [ejecutor.submit(_mejores_fragmento, activaciones, k) for ejecutor in self.ejecutores]
+        return combinar_mejores([futuro.result() for futuro in futuros], k)
+
+    def mejores_lote(self, lista_activaciones, k):
+        """Como `mejores`, para muchos usuarios con un solo envío por fragmento."""
+        futuros = [ejecutor.submit(_mejores_fragmento_lote, lista_activaciones, k)
+                   for ejecutor in self.ejecutores]
+        por_fragmento = [futuro.result() for futuro in futuros]
+        return [combinar_mejores(parciales, k) for parciales in zip(*por_fragmento)]
+
+    def cerrar(self):
+        """Termina los procesos trabajadores."""
+        for ejecutor in self.ejecutores:
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+        self.ejecutores = []
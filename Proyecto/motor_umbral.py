@@ -0,0 +1,174 @@
+# =================================================================================
+# motor_umbral.py (Top-k con terminación temprana: algoritmo del umbral de Fagin)
+# =================================================================================
+# Para cada valor de atributo se guarda la lista de libros que lo tienen, ordenada por
+# Rating_Base de mayor a menor. Al recomendar, las listas de los atributos activados se
+# recorren en paralelo (acceso ordenado) y cada libro nuevo se puntúa completo leyendo sus
+# columnas (acceso directo). El umbral acota el mejor puntaje posible de un libro aún no
+# visto: el rating del siguiente libro de una lista más los FC que podría sumar. En cuanto
+# el k-ésimo mejor puntaje supera ese umbral, ningún libro sin ver puede entrar en el top-k
+# y la búsqueda se detiene.
+import heapq          # Montículo con los k mejores libros vistos hasta ahora.
+from array import array # Listas de posiciones compactas.
+
+# Libros que se leen de cada lista antes de volver a comprobar el umbral.
+LIBROS_POR_RONDA = 32
+# Margen relativo del umbral: la cota suma los FC en otro orden que el puntaje real, así que
+# puede diferir en el último bit; el margen evita detenerse por un error de redondeo.
+TOLERANCIA_UMBRAL = 1e-9
+
+
+def _buscar(lista, ratings, posicion):
+    """Primer índice de `lista` que no va antes de `posicion` (rating descendente, luego posición)."""
+    rating = ratings[posicion]
+    bajo, alto = 0, len(lista)
+    while bajo < alto:
+        medio = (bajo + alto) // 2
+        otra = lista[medio]
+        if ratings[otra] > rating or (ratings[otra] == rating and otra < posicion):
+            bajo = medio + 1
+        else:
+            alto = medio
+    return bajo
+
+
+class IndiceUmbral:
+    """
+    Listas de libros por valor de atributo, ordenadas por Rating_Base, para el top-k.
+
+    Los resultados coinciden con los del motor en serie: los puntajes se acumulan en el
+    mismo orden y los empates se resuelven por la primera activación que puntúa al libro
+    y luego por su posición en el catálogo.
+    """
+
+    def __init__(self, libros, columnas, listas=None):
+        """
+        :param libros: CatalogoColumnar con la Base de Hechos y su índice invertido.
+        :param columnas: Columnas de atributos que las reglas pueden buscar.
+        :param listas: Listas ya ordenadas (uso interno de `actualizado`).
+        """
+        self.libros = libros
+        self.nombres_columnas = tuple(columnas)
+        self.columnas = [libros.atributos[columna] for columna in columnas]
+        if listas is None:
+            ratings = libros.ratings
+            # sorted(reverse=True) es estable: a igual rating se conserva el orden del catálogo.
+            listas = {valor: array('I', sorted(posiciones, key=ratings.__getitem__, reverse=True))
+                      for valor, posiciones in libros.indice_atributos.items()}
+        self.listas = listas
+        # Libros puntuados en la última consulta (para medir qué fracción del catálogo se tocó).
+        self.libros_evaluados = 0
+
+    def actualizado(self, libros, posiciones):
+        """
+        Índice para una versión editada del catálogo, sin reordenar las listas completas.
+
+        Solo se tocan las listas de los valores que los libros editados tenían o tienen: cada
+        libro se quita con el rating que tenía y se vuelve a insertar con el nuevo. Las listas
+        que no cambian se comparten con este índice, que sigue siendo válido para sus lectores.
+        :param libros: Copia editada del catálogo de este índice (mismas posiciones).
+        :param posiciones: Posiciones agregadas, actualizadas o eliminadas en la copia.
+        :return: IndiceUmbral nuevo sobre `libros`.
+        """
+        anterior = self.libros
+        listas = dict(self.listas)
+        propias = set()
+
+        def editable(valor):
+            if valor not in propias:
+                lista = listas.get(valor)
+                listas[valor] = array('I') if lista is None else lista[:]
+                propias.add(valor)
+            return listas[valor]
+
+        cambios = []
+        for posicion in posiciones:
+            antes = set(anterior.codigos_libro(posicion)) if anterior.vigente(posicion) else set()
+            despues = set(libros.codigos_libro(posicion)) if libros.vigente(posicion) else set()
+            if antes and despues and anterior.ratings[posicion] != libros.ratings[posicion]:
+                # Con otro rating el libro cambia de lugar en todas sus listas.
+                cambios.append((posicion, antes, despues))
+            else:
+                cambios.append((posicion, antes - despues, despues - antes))
+
+        # Primero se quitan todos (las listas siguen ordenadas por los ratings anteriores) y
+        # después se insertan (lo que queda en las listas tiene el mismo rating en ambas versiones).
+        for posicion, quitar, _ in cambios:
+            for codigo in quitar:
+                lista = editable(anterior.valores[codigo])
+                del lista[_buscar(lista, anterior.ratings, posicion)]
+        for posicion, _, agregar in cambios:
+            for codigo in agregar:
+                lista = editable(libros.valores[codigo])
+                lista.insert(_buscar(lista, libros.ratings, posicion), posicion)
+        return IndiceUmbral(libros, self.nombres_columnas, listas)
+
+    def mejores(self, activaciones, k):
+        """
+        Devuelve los k mejores libros para las activaciones dadas.
+
+        :param activaciones: Lista ordenada de pares (atributo_esperado, fc).
+        :return: Lista de tuplas (posición_libro, puntaje) en orden de recomendación.
+        """
+        self.libros_evaluados = 0
+        if k <= 0:
+            return []
+        ratings = self.libros.ratings
+        columnas = self.columnas
+        codigo_valor = self.libros.codigo_valor
+        # Código de cada activación; -1 si ningún libro tiene ese valor.
+        codificadas = [(codigo_valor.get(atributo, -1), fc) for atributo, fc in activaciones]
+
+        # Cota de FC de un libro tomado de la lista del valor v: suma seguro los FC de las
+        # activaciones de v y, como mucho, los FC positivos del resto.
+        positivos = sum(fc for _, fc in activaciones if fc > 0)
+        listas = []
+        for valor in dict.fromkeys(atributo for atributo, _ in activaciones):
+            lista = self.listas.get(valor)
+            if lista:
+                propios = [fc for atributo, fc in activaciones if atributo == valor]
+                cota = positivos - sum(fc for fc in propios if fc > 0) + sum(propios)
+                listas.append((lista, cota))
+
+        vistos = set()
+        # Montículo de mínimos con los k mejores: (puntaje, -primera_activación, -posición),
+        # así el peor de los k queda en la cima.
+        mejores = []
+        profundidad = 0
+        while listas:
+            umbral = None
+            siguiente = profundidad + LIBROS_POR_RONDA
+            for lista, cota in listas:
+                for posicion in lista[profundidad:siguiente]:
+                    if posicion in vistos:
+                        continue
+                    vistos.add(posicion)
+                    # Acceso directo: el puntaje completo del libro, sumando los FC en el
+                    # orden de las activaciones, igual que puntuar_libros.
+                    codigos = {columna[posicion] for columna in columnas}
+                    puntaje = ratings[posicion]
+                    primera = None
+                    for j, (codigo, fc) in enumerate(codificadas):
+                        if codigo in codigos:
+                            puntaje += fc
+                            if primera is None:
+                                primera = j
+                    candidato = (puntaje, -primera, -posicion)
+                    if len(mejores) < k:
+                        heapq.heappush(mejores, candidato)
+                    elif candidato > mejores[0]:
+                        heapq.heapreplace(mejores, candidato)
+                if siguiente < len(lista):
+                    # El próximo libro sin leer de esta lista acota a todos los que siguen.
+                    cota_lista = ratings[lista[siguiente]] + cota
+                    if umbral is None or cota_lista > umbral:
+                        umbral = cota_lista
+            profundidad = siguiente
+            if umbral is None:
+                break  # Todas las listas se recorrieron completas.
+            if len(mejores) == k and mejores[0][0] > umbral + TOLERANCIA_UMBRAL * max(1.0, abs(umbral)):
+                break
+
+        self.libros_evaluados = len(vistos)
+        mejores.sort(reverse=True)
+        return [(-posicion_negativa, puntaje) for puntaje, _, posicion_negativa in mejores]
@@ -0,0 +1,153 @@
+# =================================================================================
+# motor_vectorizado.py (Backend NumPy para puntuar el catálogo completo por lotes)
+# =================================================================================
+# NumPy es opcional: si no está instalado, MotorRecomendacion recurre al bucle en Python.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Número máximo de celdas (usuarios x libros) que se procesan a la vez en un lote.
+# Limita la memoria de las matrices temporales (~8 bytes por celda y matriz).
+CELDAS_POR_BLOQUE = 4_000_000
+
+
+def numpy_disponible():
+    """Indica si el backend vectorizado puede usarse en este entorno."""
+    return np is not None
+
+
+class MatrizCatalogo:
+    """
+    Codificación entera del catálogo de libros para puntuarlo con operaciones de arreglos.
+
+    - `codigos`: matriz (libros x 5) con el código entero de cada atributo
+      (género, ritmo, complejidad, motivación, compromiso).
+    - `ratings`: vector con el Rating_Base de cada libro.
+    - `pertenencia`: matriz booleana (valores x libros) derivada de `codigos`; la fila de
+      un valor marca los libros que lo contienen en cualquiera de sus columnas.
+    """
+
+    def __init__(self, libros, columnas):
+        """
+        :param libros: CatalogoColumnar con la Base de Hechos.
+        :param columnas: Nombres de las columnas de atributos que las reglas pueden buscar.
+        """
+        self.libros = libros
+        # Diccionario {valor_atributo: código_entero}: los códigos internados del catálogo.
+        self.codigo_valor = dict(libros.codigo_valor)
+        n_libros = len(libros.ids)
+
+        # Las columnas del catálogo ya son arreglos de códigos: se copian sin recorrer los libros.
+        self.codigos = np.empty((n_libros, len(columnas)), dtype=np.int32)
+        for j, columna in enumerate(columnas):
+            self.codigos[:, j] = np.frombuffer(libros.atributos[columna], dtype=np.uint32, count=n_libros)
+        self.ratings = np.frombuffer(libros.ratings, dtype=np.float64, count=n_libros).copy()
+
+        # La fila extra (todo False) sirve de relleno para activaciones sin libros.
+        self.valor_vacio = len(self.codigo_valor)
+        self.pertenencia = np.zeros((self.valor_vacio + 1, n_libros), dtype=bool)
+        for j in range(len(columnas)):
+            self.pertenencia[self.codigos[:, j], np.arange(n_libros)] = True
+        if libros.eliminados:
+            # Las filas eliminadas conservan sus códigos, pero ninguna regla las empareja.
+            self.pertenencia[:, sorted(libros.eliminados)] = False
+
+    def codificar_activaciones(self, reglas):
+        """Convierte las reglas activadas (en orden) en pares (código_valor, fc)."""
+        return [(self.codigo_valor.get(regla.atributo_esperado, self.valor_vacio), regla.fc)
+                for regla in reglas]
+
+    def puntuar(self, activaciones, k):
+        """
+        Puntúa todo el catálogo para un solo conjunto de activaciones.
+
+        :return: Lista de tuplas (posición_libro, puntaje) de los k mejores libros.
+        """
+        n_libros = len(self.ratings)
+        puntajes = self.ratings.copy()
+        primera = np.full(n_libros, len(activaciones), dtype=np.int64)
+        emparejado = np.zeros(n_libros, dtype=bool)
+
+        for j, (codigo, fc) in enumerate(activaciones):
+            fila = self.pertenencia[codigo]
+            # Sumar fc * 0.0 deja el puntaje intacto, así que el resultado coincide
+            # bit a bit con el de la acumulación en Python.
+            puntajes += fc * fila
+            primera[fila & ~emparejado] = j
+            emparejado |= fila
+
+        return self._seleccionar(puntajes, primera, emparejado, k)
+
+    def puntuar_lote(self, lista_activaciones, k):
+        """
+        Puntúa el catálogo para muchos usuarios a la vez.
+
+        Las activaciones de todos los usuarios se alinean por posición (rellenando con el
+        valor vacío y FC 0) y cada posición se aplica a todo el bloque de usuarios con una
+        sola operación de arreglos. Se acumula posición a posición, y no con un único
+        producto matricial, porque el orden de suma de BLAS alteraría el último bit de los
+        puntajes y con él el desempate frente al motor en Python.
+
+        :return: Lista (una por usuario) de listas de tuplas (posición_libro, puntaje).
+        """
+        n_libros = len(self.ratings)
+        resultados = []
+        por_bloque = max(1, CELDAS_POR_BLOQUE // max(1, n_libros))
+
+        for inicio in range(0, len(lista_activaciones), por_bloque):
+            bloque = lista_activaciones[inicio:inicio + por_bloque]
+            n_usuarios = len(bloque)
+            largo = max((len(a) for a in bloque), default=0)
+
+            # Matrices (usuarios x posiciones) con el código de valor y el FC de cada activación.
+            valores = np.full((n_usuarios, largo), self.valor_vacio, dtype=np.int64)
+            fcs = np.zeros((n_usuarios, largo), dtype=np.float64)
+            for u, activaciones in enumerate(bloque):
+                for j, (codigo, fc) in enumerate(activaciones):
+                    valores[u, j] = codigo
+                    fcs[u, j] = fc
+
+            puntajes = np.repeat(self.ratings[np.newaxis, :], n_usuarios, axis=0)
+            primera = np.full((n_usuarios, n_libros), largo, dtype=np.int64)
+            emparejado = np.zeros((n_usuarios, n_libros), dtype=bool)
+
+            for j in range(largo):
+                filas = self.pertenencia[valores[:, j]]
+                puntajes += fcs[:, j, np.newaxis] * filas
+                primera[filas & ~emparejado] = j
+                emparejado |= filas
+
+            for u in range(n_usuarios):
+                resultados.append(self._seleccionar(puntajes[u], primera[u], emparejado[u], k))
+
+        return resultados
+
+    def _seleccionar(self, puntajes, primera, emparejado, k):
+        return seleccionar_mejores(puntajes, primera, emparejado, k)
+
+
+def seleccionar_mejores(puntajes, primera, emparejado, k, posiciones=None):
+    """
+    Selecciona los k mejores libros puntuados sin ordenar todo el catálogo.
+
+    El desempate replica al motor en Python: primero el libro que fue puntuado antes
+    (por la primera regla que lo activó y luego por su posición en el catálogo).
+    :param posiciones: Posición en el catálogo de cada elemento de los vectores; por
+                       defecto, los vectores cubren el catálogo completo.
+    :return: Lista de tuplas (posición_libro, puntaje).
+    """
+    candidatos = np.flatnonzero(emparejado)
+    if k <= 0 or len(candidatos) == 0:
+        return []
+    valores = puntajes[candidatos]
+    if len(candidatos) > k:
+        # np.partition encuentra el k-ésimo mayor puntaje en tiempo lineal; se conservan
+        # todos los empates con ese umbral para desempatarlos después.
+        umbral = np.partition(valores, len(valores) - k)[len(valores) - k]
+        mascara = valores >= umbral
+        candidatos = candidatos[mascara]
+        valores = valores[mascara]
+    libros = candidatos if posiciones is None else posiciones[candidatos]
+    orden = np.lexsort((libros, primera[candidatos], -valores))[:k]
+    return [(int(libros[i]), float(valores[i])) for i in orden]
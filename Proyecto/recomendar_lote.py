@@ -0,0 +1,293 @@
+# =================================================================================
+# recomendar_lote.py (Recomendaciones por lotes en streaming, sin interfaz gráfica)
+# =================================================================================
+# Uso:
+#   python recomendar_lote.py cuestionarios.jsonl --salida recomendaciones.jsonl --workers 4
+#   cat cuestionarios.csv | python recomendar_lote.py --formato csv --k 5 > recomendaciones.csv
+#
+# Entrada (un cuestionario por línea), desde un archivo o desde stdin ("-"):
+#   - JSONL: {"id": "u1", "respuestas": ["Fantasia", "Ritmo Rápido", ...]} o solo la lista.
+#   - CSV con cabecera: columna opcional "id" y una columna por respuesta (las vacías se ignoran).
+# Salida, en el mismo orden que la entrada:
+#   - JSONL: {"id": "u1", "recomendaciones": [...]}, o {"id": ..., "error": ...} si la línea es inválida.
+#   - CSV: id,posicion,ID_Libro,Titulo,Autor,Puntaje_Total (una fila por recomendación).
+#
+# La entrada se lee por bloques de --bloque cuestionarios y cada bloque se escribe en cuanto
+# está listo: en memoria solo están los bloques en curso (a lo sumo dos por trabajador), nunca
+# el archivo completo. Con --workers N, cada proceso carga su propio motor una sola vez y
+# puntúa bloques enteros con inferir_lote; los cuestionarios repetidos se sirven desde la
+# caché de rankings del motor. No importa customtkinter ni PIL: corre en nodos sin pantalla.
+import argparse       # Opciones de línea de comandos.
+import csv            # Entrada y salida en CSV.
+import io             # Envoltorios de texto UTF-8 para stdin/stdout.
+import json           # Entrada y salida en JSONL.
+import multiprocessing # Contexto 'spawn' para los procesos trabajadores.
+import re             # Bytes que no eran UTF-8 válido en la entrada.
+import sys            # stdin, stdout y stderr.
+import time           # Resumen de rendimiento al terminar.
+from collections import deque # Bloques enviados a los trabajadores, en orden.
+from contextlib import redirect_stdout # Mensajes del motor fuera de la salida de resultados.
+from concurrent.futures import ProcessPoolExecutor # Procesos trabajadores con su propio motor.
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice # Lectura de la entrada por bloques.
+
+from motor_inferencia import CONOCIMIENTO_FILE, REGLAS_FILE, MotorRecomendacion
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+TAMANO_BLOQUE = 1024          # Cuestionarios que se puntúan juntos con inferir_lote.
+BLOQUES_POR_TRABAJADOR = 2    # Bloques en vuelo por trabajador (acota la memoria).
+COLUMNAS_CSV = ('id', 'posicion', 'ID_Libro', 'Titulo', 'Autor', 'Puntaje_Total')
+# La entrada se decodifica con errors='surrogateescape': cada byte que no es UTF-8 válido queda
+# como un sustituto U+DC80..U+DCFF, que un texto UTF-8 correcto nunca contiene.
+BYTES_INVALIDOS = re.compile('[\udc80-\udcff]')
+ERROR_UTF8 = "La línea no es UTF-8 válido."
+
+# Motor del proceso trabajador actual (None en el proceso principal).
+_motor = None
+
+
+# ----------------------------------------------------------------------
+## 1. LECTURA Y ESCRITURA
+# ----------------------------------------------------------------------
+def leer_cuestionarios(archivo, formato):
+    """
+    Genera los cuestionarios de la entrada, uno por línea.
+
+    :param formato: 'jsonl' o 'csv'.
+    :return: Iterador de tuplas (id, respuestas, error); `respuestas` es None si la línea
+             es inválida y entonces `error` explica por qué. Sin "id", se usa el número de línea.
+             Una línea con bytes que no son UTF-8 es inválida y se identifica por su número.
+    """
+    if formato == 'csv':
+        lector = csv.reader(archivo)
+        cabecera = next(lector, None)
+        if cabecera is None:
+            return
+        columna_id = cabecera.index('id') if 'id' in cabecera else None
+        for numero, fila in enumerate(lector, start=2):
+            if not fila:
+                continue
+            if any(BYTES_INVALIDOS.search(valor) for valor in fila):
+                yield numero, None, ERROR_UTF8
+                continue
+            identificador = fila[columna_id] if columna_id is not None and columna_id < len(fila) else numero
+            respuestas = [valor for i, valor in enumerate(fila) if i != columna_id and valor]
+            yield identificador, respuestas, None
+        return
+
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        if BYTES_INVALIDOS.search(linea):
+            yield numero, None, ERROR_UTF8
+            continue
+        try:
+            datos = json.loads(linea)
+        except json.JSONDecodeError:
+            yield numero, None, "La línea no es JSON válido."
+            continue
+        identificador = numero
+        if isinstance(datos, dict):
+            identificador = datos.get('id', numero)
+            datos = datos.get('respuestas')
+        if not isinstance(datos, list) or not all(isinstance(r, str) for r in datos):
+            yield identificador, None, "'respuestas' debe ser una lista de cadenas."
+            continue
+        yield identificador, datos, None
+
+
+class EscritorResultados:
+    """Escribe los resultados de cada bloque en JSONL o CSV, en el orden de la entrada."""
+
+    def __init__(self, archivo, formato):
+        self.archivo = archivo
+        self.formato = formato
+        self.escritor_csv = None
+        if formato == 'csv':
+            self.escritor_csv = csv.writer(archivo, lineterminator='\n')
+            self.escritor_csv.writerow(COLUMNAS_CSV)
+
+    def escribir(self, bloque, resultados):
+        """
+        :param bloque: Lista de (id, respuestas, error) tal como salió de leer_cuestionarios.
+        :param resultados: Recomendaciones de los cuestionarios válidos del bloque, en orden.
+        """
+        pendientes = iter(resultados)
+        for identificador, respuestas, error in bloque:
+            recomendaciones = next(pendientes) if respuestas is not None else None
+            if self.escritor_csv is not None:
+                # En CSV una línea inválida no tiene filas; el error solo se cuenta en el resumen.
+                for posicion, libro in enumerate(recomendaciones or (), start=1):
+                    self.escritor_csv.writerow((identificador, posicion, libro['ID_Libro'], libro['Titulo'],
+                                                libro['Autor'], libro['Puntaje_Total']))
+            elif recomendaciones is None:
+                self.archivo.write(json.dumps({"id": identificador, "error": error}, ensure_ascii=False) + "\n")
+            else:
+                self.archivo.write(json.dumps({"id": identificador, "recomendaciones": recomendaciones},
+                                              ensure_ascii=False) + "\n")
+        # Cada bloque sale en cuanto está listo (ej: para encadenar con otro proceso por tubería).
+        self.archivo.flush()
+
+
+# ----------------------------------------------------------------------
+## 2. PUNTUACIÓN
+# ----------------------------------------------------------------------
+def cargar_motor(ruta_catalogo, ruta_reglas):
+    """Crea un MotorRecomendacion con las reglas y el catálogo dados; None si falla la carga."""
+    motor = MotorRecomendacion()
+    # Los mensajes de error del motor van a stderr: stdout puede ser la salida de resultados.
+    with redirect_stdout(sys.stderr):
+        if not motor.cargar_reglas(ruta_reglas) or not motor.cargar_conocimiento_json(ruta_catalogo):
+            return None
+    return motor
+
+
+def recomendar_bloque(motor, lista_de_respuestas, k):
+    """
+    Devuelve las k recomendaciones de cada cuestionario del bloque, en orden.
+
+    Cada combinación de respuestas distinta se puntúa una sola vez: primero se busca en la
+    caché de rankings del motor y las que faltan se puntúan juntas con inferir_lote.
+    """
+    version = motor.version_conocimiento
+    unicas = {tuple(respuestas): None for respuestas in lista_de_respuestas}
+    faltantes = []
+    for clave in unicas:
+        en_cache = motor.consultar_cache((clave, k))
+        if en_cache is None:
+            faltantes.append(clave)
+        else:
+            unicas[clave] = en_cache
+    if faltantes:
+        for clave, recomendaciones in zip(faltantes, motor.inferir_lote([list(c) for c in faltantes], k)):
+            unicas[clave] = recomendaciones
+            motor.guardar_en_cache((clave, k), recomendaciones, version)
+    return [unicas[tuple(respuestas)] for respuestas in lista_de_respuestas]
+
+
+# --- FUNCIONES QUE SE EJECUTAN EN LOS PROCESOS TRABAJADORES ---
+def _iniciar_trabajador(ruta_catalogo, ruta_reglas):
+    """Inicializador del proceso: carga su motor una sola vez (None si la carga falla)."""
+    global _motor
+    _motor = cargar_motor(ruta_catalogo, ruta_reglas)
+
+
+def _recomendar_bloque_trabajador(lista_de_respuestas, k):
+    if _motor is None:
+        raise RuntimeError("Un proceso trabajador no pudo cargar el motor.")
+    return recomendar_bloque(_motor, lista_de_respuestas, k)
+
+
+# ----------------------------------------------------------------------
+## 3. ORQUESTACIÓN
+# ----------------------------------------------------------------------
+def procesar(entrada, salida, formato_entrada, formato_salida, k=2, workers=0,
+             tamano_bloque=TAMANO_BLOQUE, ruta_catalogo=CONOCIMIENTO_FILE, ruta_reglas=REGLAS_FILE):
+    """
+    Lee cuestionarios de `entrada`, los puntúa por bloques y escribe los resultados en `salida`.
+
+    :param workers: Procesos trabajadores (0 o 1: en el proceso actual).
+    :return: (cuestionarios_leídos, líneas_inválidas), o None si no se pudo cargar el motor.
+    """
+    escritor = EscritorResultados(salida, formato_salida)
+    cuestionarios = leer_cuestionarios(entrada, formato_entrada)
+    leidos = invalidos = 0
+
+    def bloques():
+        nonlocal leidos, invalidos
+        while True:
+            bloque = list(islice(cuestionarios, tamano_bloque))
+            if not bloque:
+                return
+            leidos += len(bloque)
+            invalidos += sum(1 for _, respuestas, _ in bloque if respuestas is None)
+            yield bloque, [respuestas for _, respuestas, _ in bloque if respuestas is not None]
+
+    if workers <= 1:
+        motor = cargar_motor(ruta_catalogo, ruta_reglas)
+        if motor is None:
+            return None
+        for bloque, validas in bloques():
+            escritor.escribir(bloque, recomendar_bloque(motor, validas, k))
+        return leidos, invalidos
+
+    # Se usa 'spawn' (como en motor_paralelo): los trabajadores no heredan hilos ni cerrojos.
+    contexto = multiprocessing.get_context('spawn')
+    en_vuelo = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto, initializer=_iniciar_trabajador,
+                                 initargs=(ruta_catalogo, ruta_reglas)) as ejecutor:
+            for bloque, validas in bloques():
+                en_vuelo.append((bloque, ejecutor.submit(_recomendar_bloque_trabajador, validas, k)))
+                # Con el cupo lleno se espera al bloque más antiguo: la salida conserva el orden.
+                if len(en_vuelo) >= workers * BLOQUES_POR_TRABAJADOR:
+                    bloque, futuro = en_vuelo.popleft()
+                    escritor.escribir(bloque, futuro.result())
+            while en_vuelo:
+                bloque, futuro = en_vuelo.popleft()
+                escritor.escribir(bloque, futuro.result())
+    except (BrokenProcessPool, RuntimeError) as error:
+        print(f"❌ Error: {error or 'Un proceso trabajador terminó inesperadamente.'}", file=sys.stderr)
+        return None
+    return leidos, invalidos
+
+
+def formato_por_extension(ruta):
+    return 'csv' if ruta and ruta.lower().endswith('.csv') else 'jsonl'
+
+
+def principal(argumentos):
+    """Abre la entrada y la salida, ejecuta el proceso y muestra el resumen; devuelve el código de salida."""
+    if argumentos.k < 1 or argumentos.bloque < 1:
+        print("❌ Error: --k y --bloque deben ser al menos 1.", file=sys.stderr)
+        return 2
+    formato_entrada = argumentos.formato or formato_por_extension(argumentos.entrada)
+    formato_salida = argumentos.formato_salida
+    if formato_salida is None:
+        formato_salida = formato_por_extension(argumentos.salida) if argumentos.salida != '-' else formato_entrada
+
+    try:
+        if argumentos.entrada == '-':
+            entrada = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='surrogateescape', newline='')
+        else:
+            entrada = open(argumentos.entrada, 'r', encoding='utf-8', errors='surrogateescape', newline='')
+        if argumentos.salida == '-':
+            salida = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='', write_through=False)
+        else:
+            salida = open(argumentos.salida, 'w', encoding='utf-8', newline='')
+    except OSError as error:
+        print(f"❌ Error: {error}", file=sys.stderr)
+        return 1
+
+    inicio = time.perf_counter()
+    try:
+        with entrada, salida:
+            resultado = procesar(entrada, salida, formato_entrada, formato_salida, argumentos.k,
+                                 argumentos.workers, argumentos.bloque, argumentos.catalogo, argumentos.reglas)
+    except BrokenPipeError:
+        # El consumidor cerró la tubería (ej: `| head`): se termina sin volcar más salida.
+        sys.stdout = None
+        return 0
+    if resultado is None:
+        return 1
+    leidos, invalidos = resultado
+    duracion = time.perf_counter() - inicio
+    print(f"✅ {leidos} cuestionarios ({invalidos} inválidos) en {duracion:.2f} s "
+          f"({leidos / duracion if duracion else 0:.0f}/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recomendaciones por lotes, en streaming y sin interfaz gráfica.")
+    parser.add_argument("entrada", nargs='?', default='-', help="Archivo JSONL o CSV de cuestionarios ('-' = stdin).")
+    parser.add_argument("--salida", default='-', help="Archivo de resultados ('-' = stdout).")
+    parser.add_argument("--formato", choices=('jsonl', 'csv'),
+                        help="Formato de la entrada (por defecto, según la extensión; jsonl para stdin).")
+    parser.add_argument("--formato-salida", choices=('jsonl', 'csv'),
+                        help="Formato de la salida (por defecto, según la extensión o el de la entrada).")
+    parser.add_argument("--k", type=int, default=2, help="Recomendaciones por cuestionario.")
+    parser.add_argument("--workers", type=int, default=0, help="Procesos trabajadores (0 = en este proceso).")
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE, help="Cuestionarios por bloque.")
+    parser.add_argument("--catalogo", default=CONOCIMIENTO_FILE, help="Base de conocimiento (JSON).")
+    parser.add_argument("--reglas", default=REGLAS_FILE, help="Archivo de reglas (JSON).")
+    sys.exit(principal(parser.parse_args()))
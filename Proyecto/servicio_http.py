@@ -0,0 +1,373 @@
+# =================================================================================
+# servicio_http.py (Servicio HTTP/JSON asíncrono sobre MotorRecomendacion)
+# =================================================================================
+# Uso:  python servicio_http.py --puerto 8080 [--metricas-archivo serl.prom]
+#
+#   POST /recomendar   {"respuestas": ["Fantasia", "Ritmo Lento", ...], "k": 2}
+#   GET  /metricas     Contadores de latencia y rendimiento.
+#   GET  /metricas/motor   Tiempos por fase y contadores del motor (JSON).
+#   GET  /metrics      Las mismas métricas del motor en formato de texto de Prometheus.
+#   POST /perfil       {"activo": true, "intervalo_ms": 5} enciende o apaga el perfilador por muestreo.
+#   GET  /perfil       Pilas con más muestras del perfilador.
+#   GET  /salud        Estado del servicio y tamaño de la base de conocimiento.
+#
+# Solo usa la biblioteca estándar: se puede levantar y someter a carga en local.
+import argparse       # Opciones de línea de comandos.
+import asyncio        # Servidor TCP y bucle de eventos.
+import json           # Cuerpos de petición y respuesta.
+import time           # Medición de latencias.
+from collections import deque # Ventana de latencias recientes.
+from concurrent.futures import ThreadPoolExecutor # Hilo que ejecuta la puntuación por lotes.
+
+from motor_inferencia import MotorRecomendacion
+from metricas_motor import INTERVALO_MUESTREO_S
+
+# --- CONFIGURACIÓN POR DEFECTO ---
+HOST_POR_DEFECTO = "127.0.0.1"
+PUERTO_POR_DEFECTO = 8080
+TAMANO_MAX_LOTE = 64          # Peticiones máximas que se agrupan en un micro-lote.
+ESPERA_MAX_LOTE_MS = 2.0      # Tiempo máximo que la primera petición espera a otras.
+K_MAXIMO = 100                # Límite de recomendaciones por petición.
+LATENCIAS_EN_VENTANA = 10_000 # Latencias recientes usadas para los percentiles.
+TAMANO_MAX_CUERPO = 64 * 1024 # Bytes máximos aceptados en el cuerpo de una petición.
+PILAS_EN_PERFIL = 20          # Pilas que devuelve GET /perfil.
+INTERVALO_EXPORTACION_S = 15.0 # Segundos entre dos escrituras de --metricas-archivo.
+
+TEXTOS_ESTADO = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+                 500: "Internal Server Error"}
+
+
+class PeticionInvalida(Exception):
+    """Error en los datos enviados por el cliente (se responde con el código indicado)."""
+
+    def __init__(self, mensaje, codigo=400):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+
+class MetricasServicio:
+    """Contadores de latencia y rendimiento del servicio."""
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.peticiones = 0
+        self.errores = 0
+        self.aciertos_cache = 0
+        self.lotes = 0
+        self.peticiones_en_lotes = 0
+        # Latencias (en segundos) de las peticiones más recientes.
+        self.latencias = deque(maxlen=LATENCIAS_EN_VENTANA)
+
+    def registrar(self, latencia, error=False):
+        """Registra una petición atendida de /recomendar."""
+        self.peticiones += 1
+        if error:
+            self.errores += 1
+        self.latencias.append(latencia)
+
+    def registrar_lote(self, tamano):
+        """Registra un micro-lote enviado al motor."""
+        self.lotes += 1
+        self.peticiones_en_lotes += tamano
+
+    def instantanea(self):
+        """Devuelve un diccionario con los contadores y percentiles actuales."""
+        transcurrido = time.monotonic() - self.inicio
+        ordenadas = sorted(self.latencias)
+
+        def percentil(p):
+            if not ordenadas:
+                return 0.0
+            return ordenadas[min(len(ordenadas) - 1, int(p / 100 * len(ordenadas)))] * 1000
+
+        return {
+            "segundos_activo": round(transcurrido, 3),
+            "peticiones": self.peticiones,
+            "errores": self.errores,
+            "aciertos_cache": self.aciertos_cache,
+            "lotes": self.lotes,
+            "tamano_medio_lote": round(self.peticiones_en_lotes / self.lotes, 2) if self.lotes else 0.0,
+            "peticiones_por_segundo": round(self.peticiones / transcurrido, 2) if transcurrido else 0.0,
+            "latencia_ms": {
+                "p50": round(percentil(50), 3),
+                "p95": round(percentil(95), 3),
+                "p99": round(percentil(99), 3),
+                "max": round(ordenadas[-1] * 1000, 3) if ordenadas else 0.0
+            }
+        }
+
+
+class ServicioRecomendacion:
+    """
+    Servicio HTTP/JSON que comparte un único MotorRecomendacion entre todas las peticiones.
+
+    Las peticiones que no están en la caché del motor se encolan; un coordinador las agrupa
+    en micro-lotes (hasta TAMANO_MAX_LOTE peticiones o ESPERA_MAX_LOTE_MS milisegundos) y
+    las puntúa con una sola llamada a `inferir_lote` en un hilo aparte, de modo que el bucle
+    de eventos sigue aceptando conexiones mientras se puntúa.
+    """
+
+    def __init__(self, motor, tamano_max_lote=TAMANO_MAX_LOTE, espera_max_ms=ESPERA_MAX_LOTE_MS):
+        """
+        :param motor: MotorRecomendacion con reglas y catálogo ya cargados.
+        :param tamano_max_lote: Peticiones máximas por micro-lote.
+        :param espera_max_ms: Espera máxima para completar un micro-lote.
+        """
+        self.motor = motor
+        self.tamano_max_lote = tamano_max_lote
+        self.espera_max = espera_max_ms / 1000
+        self.metricas = MetricasServicio()
+        self.cola = None
+        self.tarea_lotes = None
+        self.tarea_exportacion = None
+        # Un solo hilo: el motor se usa desde un único hilo a la vez.
+        self.ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="motor")
+        # Hilo que enciende y apaga el perfilador (apagarlo espera a su hilo de muestreo), en
+        # orden de llegada y sin bloquear el bucle de eventos ni esperar a la puntuación.
+        self.ejecutor_perfil = ThreadPoolExecutor(max_workers=1, thread_name_prefix="perfil")
+
+    async def iniciar(self, host=HOST_POR_DEFECTO, puerto=PUERTO_POR_DEFECTO):
+        """Arranca el coordinador de lotes y el servidor TCP; devuelve el asyncio.Server."""
+        self.cola = asyncio.Queue()
+        # Se guarda la referencia para que la tarea no sea recolectada mientras corre.
+        self.tarea_lotes = asyncio.get_running_loop().create_task(self.coordinar_lotes())
+        return await asyncio.start_server(self.atender_conexion, host, puerto)
+
+    # --- MICRO-LOTES ---
+    async def recomendar(self, respuestas, k):
+        """Devuelve las k mejores recomendaciones, desde la caché o a través de un micro-lote."""
+        motor = self.motor
+        if motor.revision_reglas_pendiente():
+            # Antes de servir desde la caché: si el archivo de reglas cambió, la recarga (en el
+            # hilo del motor) invalida los rankings calculados con las reglas anteriores.
+            await asyncio.get_running_loop().run_in_executor(self.ejecutor, motor.recargar_reglas_si_cambiaron)
+        en_cache = motor.consultar_cache((tuple(respuestas), k))
+        if en_cache is not None:
+            self.metricas.aciertos_cache += 1
+            return en_cache
+        futuro = asyncio.get_running_loop().create_future()
+        await self.cola.put((respuestas, k, futuro))
+        return await futuro
+
+    async def coordinar_lotes(self):
+        """Agrupa las peticiones pendientes en micro-lotes y los envía al motor."""
+        bucle = asyncio.get_running_loop()
+        while True:
+            lote = [await self.cola.get()]
+            limite = bucle.time() + self.espera_max
+            while len(lote) < self.tamano_max_lote:
+                restante = limite - bucle.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self.cola.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            self.metricas.registrar_lote(len(lote))
+            try:
+                resultados = await bucle.run_in_executor(self.ejecutor, self.puntuar_lote, lote)
+            except Exception as error:
+                for _, _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(error)
+                continue
+            for (_, _, futuro), recomendaciones in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(recomendaciones)
+
+    def puntuar_lote(self, lote):
+        """Puntúa un micro-lote (en el hilo del motor), agrupando las peticiones por k."""
+        motor = self.motor
+        version = motor.version_conocimiento
+        resultados = [None] * len(lote)
+        por_k = {}
+        for i, (respuestas, k, _) in enumerate(lote):
+            por_k.setdefault(k, []).append(i)
+        for k, indices in por_k.items():
+            listas = motor.inferir_lote([lote[i][0] for i in indices], k)
+            for i, recomendaciones in zip(indices, listas):
+                resultados[i] = recomendaciones
+                motor.guardar_en_cache((tuple(lote[i][0]), k), recomendaciones, version)
+        return resultados
+
+    # --- HTTP ---
+    async def atender_conexion(self, lector, escritor):
+        """Atiende una conexión HTTP/1.1 (con keep-alive) hasta que el cliente la cierre."""
+        try:
+            while True:
+                try:
+                    linea = await lector.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # Línea de petición más larga que el límite del lector (readline lo
+                    # convierte en ValueError); el resto de la conexión ya no se puede leer.
+                    await self.responder(escritor, 400, {"error": "Línea de petición demasiado larga."}, False)
+                    break
+                if not linea:
+                    break
+                try:
+                    metodo, ruta, version = linea.decode('latin-1').split()
+                except ValueError:
+                    await self.responder(escritor, 400, {"error": "Línea de petición inválida."}, False)
+                    break
+
+                cabeceras = {}
+                try:
+                    while True:
+                        cabecera = await lector.readline()
+                        if cabecera in (b'\r\n', b'\n', b''):
+                            break
+                        nombre, _, valor = cabecera.decode('latin-1').partition(':')
+                        cabeceras[nombre.strip().lower()] = valor.strip()
+                except (ValueError, asyncio.LimitOverrunError):
+                    await self.responder(escritor, 431, {"error": "Cabecera demasiado larga."}, False)
+                    break
+
+                mantener = (version == 'HTTP/1.1' and cabeceras.get('connection', '').lower() != 'close')
+                try:
+                    longitud = int(cabeceras.get('content-length', 0))
+                except ValueError:
+                    longitud = -1
+                if not 0 <= longitud <= TAMANO_MAX_CUERPO:
+                    await self.responder(escritor, 413, {"error": "Cuerpo demasiado grande o inválido."}, False)
+                    break
+                cuerpo = await lector.readexactly(longitud) if longitud else b''
+
+                codigo, datos = await self.despachar(metodo, ruta.split('?', 1)[0], cuerpo)
+                await self.responder(escritor, codigo, datos, mantener)
+                if not mantener:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            escritor.close()
+
+    async def despachar(self, metodo, ruta, cuerpo):
+        """Enruta una petición y devuelve (código_http, datos_json)."""
+        if ruta == '/recomendar':
+            if metodo != 'POST':
+                return 405, {"error": "Use POST."}
+            inicio = time.perf_counter()
+            try:
+                respuestas, k = self.leer_peticion(cuerpo)
+                recomendaciones = await self.recomendar(respuestas, k)
+            except PeticionInvalida as error:
+                self.metricas.registrar(time.perf_counter() - inicio, error=True)
+                return error.codigo, {"error": str(error)}
+            except Exception as error:
+                self.metricas.registrar(time.perf_counter() - inicio, error=True)
+                return 500, {"error": f"Error interno: {error}"}
+            self.metricas.registrar(time.perf_counter() - inicio)
+            return 200, {"recomendaciones": recomendaciones}
+        if ruta == '/metricas' and metodo == 'GET':
+            return 200, self.metricas.instantanea()
+        if ruta == '/metricas/motor' and metodo == 'GET':
+            return 200, self.motor.metricas.instantanea()
+        if ruta == '/metrics' and metodo == 'GET':
+            # Texto plano: responder() lo envía con el Content-Type de Prometheus.
+            return 200, self.motor.metricas.como_prometheus()
+        if ruta == '/perfil':
+            return await self.atender_perfil(metodo, cuerpo)
+        if ruta == '/salud' and metodo == 'GET':
+            return 200, {"estado": "ok", "libros": len(self.motor.libros), "reglas": len(self.motor.reglas)}
+        return 404, {"error": f"Ruta no encontrada: {ruta}"}
+
+    async def atender_perfil(self, metodo, cuerpo):
+        """Enciende/apaga el perfilador por muestreo (POST) o devuelve sus pilas más frecuentes (GET)."""
+        metricas = self.motor.metricas
+        if metodo == 'POST':
+            try:
+                datos = json.loads(cuerpo or b'{}')
+                activo = bool(datos.get('activo', True))
+                intervalo = float(datos.get('intervalo_ms', INTERVALO_MUESTREO_S * 1000)) / 1000
+            except (json.JSONDecodeError, UnicodeDecodeError, AttributeError, TypeError, ValueError):
+                return 400, {"error": "Se esperaba {\"activo\": bool, \"intervalo_ms\": número}."}
+            # detener_muestreo espera a que termine el hilo de muestreo: fuera del bucle de eventos.
+            operacion = (lambda: metricas.iniciar_muestreo(intervalo)) if activo else metricas.detener_muestreo
+            await asyncio.get_running_loop().run_in_executor(self.ejecutor_perfil, operacion)
+            return 200, {"muestreo_activo": activo}
+        if metodo == 'GET':
+            return 200, {"muestreo_activo": metricas.hilo_muestreo is not None,
+                         "pilas": [{"pila": pila, "muestras": n} for pila, n in metricas.perfil(PILAS_EN_PERFIL)]}
+        return 405, {"error": "Use GET o POST."}
+
+    def leer_peticion(self, cuerpo):
+        """Valida el cuerpo JSON de /recomendar y devuelve (respuestas, k)."""
+        try:
+            datos = json.loads(cuerpo or b'{}')
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise PeticionInvalida("El cuerpo no es JSON válido.")
+        if not isinstance(datos, dict):
+            raise PeticionInvalida("Se esperaba un objeto JSON.")
+        respuestas = datos.get('respuestas')
+        if not isinstance(respuestas, list) or not all(isinstance(r, str) for r in respuestas):
+            raise PeticionInvalida("'respuestas' debe ser una lista de cadenas.")
+        k = datos.get('k', 2)
+        if not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= K_MAXIMO:
+            raise PeticionInvalida(f"'k' debe ser un entero entre 1 y {K_MAXIMO}.")
+        return respuestas, k
+
+    async def responder(self, escritor, codigo, datos, mantener):
+        """Escribe una respuesta HTTP con cuerpo JSON (o texto plano si `datos` es una cadena)."""
+        if isinstance(datos, str):
+            cuerpo = datos.encode('utf-8')
+            tipo = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+            tipo = "application/json; charset=utf-8"
+        cabecera = (f"HTTP/1.1 {codigo} {TEXTOS_ESTADO.get(codigo, '')}\r\n"
+                    f"Content-Type: {tipo}\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\n"
+                    f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+        escritor.write(cabecera.encode('latin-1') + cuerpo)
+        await escritor.drain()
+
+
+async def principal(argumentos):
+    """Carga el motor una sola vez y sirve peticiones hasta que se interrumpa el proceso."""
+    motor = MotorRecomendacion()
+    if not motor.cargar_reglas() or not motor.cargar_conocimiento_json():
+        return
+    motor.usar_paralelo(argumentos.procesos)
+    if argumentos.sondeos and not motor.usar_vecinos_aproximados(argumentos.sondeos):
+        return
+    servicio = ServicioRecomendacion(motor, argumentos.lote_max, argumentos.espera_ms)
+    servidor = await servicio.iniciar(argumentos.host, argumentos.puerto)
+    print(f"✅ Servicio de recomendación en http://{argumentos.host}:{argumentos.puerto} "
+          f"({len(motor.libros)} libros, {len(motor.reglas)} reglas)")
+    if argumentos.metricas_archivo:
+        # Se guarda la referencia para que la tarea no sea recolectada mientras corre.
+        servicio.tarea_exportacion = asyncio.get_running_loop().create_task(
+            exportar_periodicamente(motor, argumentos.metricas_archivo, argumentos.metricas_intervalo))
+    async with servidor:
+        await servidor.serve_forever()
+
+
+async def exportar_periodicamente(motor, ruta, intervalo):
+    """Reescribe el archivo de métricas del motor (formato Prometheus) cada `intervalo` segundos."""
+    while True:
+        await asyncio.sleep(intervalo)
+        motor.metricas.exportar(ruta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON del sistema experto de recomendación.")
+    parser.add_argument("--host", default=HOST_POR_DEFECTO, help="Dirección de escucha.")
+    parser.add_argument("--puerto", type=int, default=PUERTO_POR_DEFECTO, help="Puerto de escucha.")
+    parser.add_argument("--lote-max", type=int, default=TAMANO_MAX_LOTE,
+                        help="Peticiones máximas por micro-lote.")
+    parser.add_argument("--espera-ms", type=float, default=ESPERA_MAX_LOTE_MS,
+                        help="Milisegundos máximos de espera para completar un micro-lote.")
+    parser.add_argument("--procesos", type=int, default=0,
+                        help="Procesos para puntuar el catálogo en paralelo (0 = en serie).")
+    parser.add_argument("--sondeos", type=int, default=0,
+                        help="Listas IVF abiertas por consulta en el modo aproximado (0 = exacto).")
+    parser.add_argument("--metricas-archivo",
+                        help="Archivo donde exportar periódicamente las métricas del motor (Prometheus).")
+    parser.add_argument("--metricas-intervalo", type=float, default=INTERVALO_EXPORTACION_S,
+                        help="Segundos entre dos exportaciones de --metricas-archivo.")
+    try:
+        asyncio.run(principal(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
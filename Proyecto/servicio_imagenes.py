@@ -0,0 +1,164 @@
+# =================================================================================
+# servicio_imagenes.py (Carátulas preparadas fuera del hilo de Tk, con caché LRU y en disco)
+# =================================================================================
+# Abrir un JPEG y redimensionarlo en el callback de un botón congela la ventana justo cuando
+# aparece la pantalla de resultados. Aquí el trabajo pesado (decodificar y redimensionar)
+# se hace en un hilo trabajador, y el hilo de Tk solo envuelve la imagen ya lista en un
+# CTkImage. Dos niveles de caché evitan repetir ese trabajo:
+#   - En memoria: un LRU acotado de CTkImage listos para mostrar.
+#   - En disco: las miniaturas ya redimensionadas, con nombre derivado de la ruta de origen,
+#     su fecha de modificación y el tamaño pedido (si la imagen cambia, cambia el nombre).
+# Tkinter no es seguro entre hilos: el trabajador solo deja sus resultados en una cola, y el
+# hilo de Tk la vacía con after() mientras haya pedidos pendientes.
+import hashlib        # Nombre de archivo de cada miniatura en la caché de disco.
+import os             # Rutas, fechas de modificación y reemplazo atómico de archivos.
+import queue          # Resultados del hilo trabajador hacia el hilo de Tk.
+from collections import OrderedDict # Caché LRU de imágenes listas.
+from concurrent.futures import ThreadPoolExecutor # Hilo trabajador que decodifica las imágenes.
+import customtkinter as ctk # CTkImage, que se crea siempre en el hilo de Tk.
+# PIL se importa en el trabajador, la primera vez que decodifica: no retrasa el arranque de la ventana.
+
+# Imágenes listas (CTkImage) que se conservan en memoria.
+CAPACIDAD_LRU = 64
+# Milisegundos entre dos revisiones de la cola de resultados mientras hay pedidos pendientes.
+INTERVALO_SONDEO_MS = 15
+# Carpeta de la caché de miniaturas en disco (se crea al guardar la primera).
+DIRECTORIO_MINIATURAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.miniaturas')
+
+
+def ruta_miniatura(directorio, ruta, tamano):
+    """
+    Archivo de la caché de disco para la imagen `ruta` redimensionada a `tamano`.
+
+    :raises OSError: Si la imagen de origen no existe.
+    """
+    estado = os.stat(ruta)
+    clave = f"{os.path.abspath(ruta)}|{estado.st_mtime_ns}|{estado.st_size}|{tamano[0]}x{tamano[1]}"
+    return os.path.join(directorio, hashlib.sha1(clave.encode('utf-8')).hexdigest() + '.png')
+
+
+def preparar_miniatura(ruta, tamano, directorio=DIRECTORIO_MINIATURAS):
+    """
+    Devuelve la imagen `ruta` redimensionada a `tamano`, ya decodificada (se ejecuta en el trabajador).
+
+    Si la miniatura está en la caché de disco se lee de allí; si no, se genera y se guarda.
+    :param directorio: Carpeta de la caché de disco (None para no usarla).
+    :raises OSError: Si la imagen de origen no existe o no es legible.
+    """
+    from PIL import Image # Decodificación y redimensionado.
+    destino = ruta_miniatura(directorio, ruta, tamano) if directorio else None
+    if destino is not None and os.path.exists(destino):
+        try:
+            miniatura = Image.open(destino)
+            miniatura.load()
+            return miniatura
+        except OSError:
+            pass  # Miniatura dañada: se vuelve a generar.
+
+    imagen = Image.open(ruta)
+    # En JPEG, draft() decodifica directamente a una escala reducida (1/2, 1/4 o 1/8), mucho
+    # más rápido que decodificar la imagen completa para luego achicarla.
+    imagen.draft('RGB', tamano)
+    imagen = imagen.convert('RGB').resize(tamano)
+    if destino is not None:
+        try:
+            os.makedirs(directorio, exist_ok=True)
+            temporal = destino + '.tmp'
+            imagen.save(temporal, 'PNG')
+            # Reemplazo atómico: otra instancia de la aplicación nunca lee una miniatura a medias.
+            os.replace(temporal, destino)
+        except OSError:
+            pass  # Sin permisos de escritura: la miniatura solo se usa en memoria.
+    return imagen
+
+
+class ServicioImagenes:
+    """
+    Prepara imágenes en segundo plano y las entrega como CTkImage en el hilo de Tk.
+
+    Todos los métodos públicos deben llamarse desde el hilo de Tk.
+    """
+
+    def __init__(self, raiz, capacidad=CAPACIDAD_LRU, directorio_miniaturas=DIRECTORIO_MINIATURAS):
+        """
+        :param raiz: Widget de Tk (la ventana principal) con el que se programa after().
+        :param capacidad: Número máximo de CTkImage en la caché LRU.
+        :param directorio_miniaturas: Carpeta de la caché de disco (None para no usarla).
+        """
+        self.raiz = raiz
+        self.capacidad = capacidad
+        self.directorio_miniaturas = directorio_miniaturas
+        # Caché LRU {(ruta, tamaño): CTkImage}.
+        self.cache = OrderedDict()
+        # Pedidos en curso {(ruta, tamaño): [funciones a llamar con el resultado]}.
+        self.pendientes = {}
+        # Resultados terminados por el trabajador: (clave, futuro).
+        self.terminados = queue.Queue()
+        self.ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imagenes")
+        self.sondeo_programado = False
+
+    def solicitar(self, ruta, tamano, al_terminar=None):
+        """
+        Pide la imagen `ruta` redimensionada a `tamano`.
+
+        :param al_terminar: Función que recibe el CTkImage (o None si la imagen no se pudo
+                            cargar). Se llama en el hilo de Tk: de inmediato si la imagen ya
+                            estaba en memoria, o cuando el trabajador la termine.
+        :return: El CTkImage si ya estaba en memoria; None si se está preparando.
+        """
+        clave = (ruta, tuple(tamano))
+        imagen = self.cache.get(clave)
+        if imagen is not None:
+            self.cache.move_to_end(clave)
+            if al_terminar is not None:
+                al_terminar(imagen)
+            return imagen
+
+        esperando = self.pendientes.get(clave)
+        if esperando is None:
+            # Primer pedido de esta imagen: se encarga al trabajador una sola vez.
+            esperando = self.pendientes[clave] = []
+            futuro = self.ejecutor.submit(preparar_miniatura, ruta, clave[1], self.directorio_miniaturas)
+            futuro.add_done_callback(lambda f, clave=clave: self.terminados.put((clave, f)))
+            self._programar_sondeo()
+        if al_terminar is not None:
+            esperando.append(al_terminar)
+        return None
+
+    def precargar(self, rutas, tamano):
+        """Prepara en segundo plano imágenes que probablemente se mostrarán pronto."""
+        for ruta in rutas:
+            self.solicitar(ruta, tamano)
+
+    def cerrar(self):
+        """Descarta los pedidos que no empezaron y libera el hilo trabajador."""
+        self.ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    def _programar_sondeo(self):
+        if not self.sondeo_programado:
+            self.sondeo_programado = True
+            self.raiz.after(INTERVALO_SONDEO_MS, self._atender_terminados)
+
+    def _atender_terminados(self):
+        """Convierte en CTkImage las imágenes terminadas y avisa a quien las pidió (hilo de Tk)."""
+        self.sondeo_programado = False
+        while True:
+            try:
+                clave, futuro = self.terminados.get_nowait()
+            except queue.Empty:
+                break
+            imagen = None
+            try:
+                imagen = ctk.CTkImage(light_image=futuro.result(), size=clave[1])
+            except Exception:
+                # Imagen no encontrada o no legible: quien la pidió muestra su texto alternativo.
+                pass
+            if imagen is not None:
+                self.cache[clave] = imagen
+                self.cache.move_to_end(clave)
+                while len(self.cache) > self.capacidad:
+                    self.cache.popitem(last=False)
+            for al_terminar in self.pendientes.pop(clave, ()):
+                al_terminar(imagen)
+        if self.pendientes:
+            self._programar_sondeo()
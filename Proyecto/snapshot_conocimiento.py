@@ -0,0 +1,351 @@
+# =================================================================================
+# snapshot_conocimiento.py (Instantánea binaria de la base de conocimiento)
+# =================================================================================
+# La primera vez que se carga base_conocimiento.json, los libros se leen de forma
+# incremental (sin construir el documento completo) y se guardan en un archivo binario
+# columnar junto al JSON. En los arranques siguientes ese archivo se abre con mmap: no hay
+# decodificación JSON y las columnas se leen directamente del archivo mapeado.
+#
+# Formato (todos los enteros en little-endian):
+#   MAGIA (8 bytes) | largo de la cabecera (uint32) | cabecera JSON (utf-8) | secciones
+# Cada sección empieza alineada a 8 bytes; la cabecera guarda su (desplazamiento, largo):
+#   ids       int64[n]      ID_Libro de cada libro
+#   ratings   float64[n]    Rating_Base de cada libro
+#   <columna> uint32[n]     Índice en la tabla de cadenas (una sección por columna de texto)
+#   offsets   uint64[m+1]   Inicio de cada cadena dentro de 'cadenas'
+#   cadenas   bytes         Cadenas utf-8 sin repetir (los atributos se repiten mucho)
+import hashlib        # Huella SHA-256 del JSON de origen.
+import json           # Cabecera del archivo y lectura incremental del JSON.
+import mmap           # Mapeo del archivo binario en memoria.
+import os             # Fechas de modificación y rutas.
+import struct         # Codificación de la cabecera.
+import sys            # Orden de bytes de la máquina.
+from array import array # Columnas compactas mientras se construye la instantánea.
+
+MAGIA = b'SERLSNP1'
+# 2: la clave "libros" se busca solo en el objeto raíz; las instantáneas anteriores
+# pudieron guardarse desde una clave anidada y se regeneran.
+VERSION_FORMATO = 2
+# Extensión añadida al nombre del JSON para guardar su instantánea.
+EXTENSION_SNAPSHOT = '.snap'
+# Bytes leídos por cada bloque al recorrer el JSON de forma incremental.
+TAMANO_BLOQUE = 1 << 20
+# Un valor cortado al final del bloque falla a pocos caracteres del final ('-Infinit' son 8)
+# o como cadena sin cerrar; un error más atrás es un JSON mal formado y no se sigue leyendo.
+MARGEN_VALOR_CORTADO = 16
+# Caracteres máximos de un valor que se sigue leyendo sin poder decodificarlo. Un libro ocupa
+# menos de un KB: más que esto es una cadena sin cerrar, no un libro largo.
+LONGITUD_MAXIMA_VALOR = 16 << 20
+
+# Columnas de texto que se guardan como índices en la tabla de cadenas.
+COLUMNAS_TEXTO = (
+    'Titulo',
+    'Autor',
+    'Atributo_1_Genero',
+    'Atributo_2_Ritmo',
+    'Atributo_3_Complejidad',
+    'Atributo_4_Motivacion',
+    'Atributo_5_Compromiso',
+    'Ruta_Imagen'
+)
+
+
+def ruta_snapshot(ruta_json):
+    """Ruta del archivo binario asociado a un JSON de conocimiento."""
+    return ruta_json + EXTENSION_SNAPSHOT
+
+
+def huella_archivo(ruta):
+    """SHA-256 de un archivo, leído por bloques."""
+    huella = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b''):
+            huella.update(bloque)
+    return huella.hexdigest()
+
+
+def iterar_libros_json(ruta, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recorre la lista "libros" de un JSON con la forma de base_conocimiento.json libro a libro.
+
+    Solo mantiene en memoria el bloque de texto actual y el valor que se está decodificando,
+    así que el pico de memoria no depende del tamaño de la lista. La clave se busca entre las
+    claves del objeto raíz (los demás valores se decodifican para saltarlos), nunca dentro de
+    un valor, y se valida el documento completo, incluido que no haya nada después del objeto.
+    :raises json.JSONDecodeError: Si el archivo no es un JSON válido.
+    :raises ValueError: Si el JSON no tiene la forma esperada (raíz que no es un objeto,
+                        "libros" que no es una lista o que aparece dos veces); quien llama
+                        recurre entonces a json.load.
+    """
+    decodificador = json.JSONDecoder()
+    with open(ruta, 'r', encoding='utf-8') as f:
+        texto = ''
+        posicion = 0
+        fin_archivo = False
+
+        def leer_mas():
+            # Descarta lo ya consumido y añade el siguiente bloque del archivo.
+            nonlocal texto, posicion, fin_archivo
+            texto, posicion = texto[posicion:], 0
+            bloque = f.read(tamano_bloque)
+            if bloque:
+                texto += bloque
+            else:
+                fin_archivo = True
+
+        def siguiente_caracter():
+            """Salta los espacios y devuelve el siguiente carácter ('' al final del archivo)."""
+            nonlocal posicion
+            while True:
+                while posicion < len(texto) and texto[posicion] in ' \t\r\n':
+                    posicion += 1
+                if posicion < len(texto):
+                    return texto[posicion]
+                if fin_archivo:
+                    return ''
+                leer_mas()
+
+        def esperar(caracteres):
+            """Consume uno de `caracteres` (tras los espacios) y lo devuelve."""
+            nonlocal posicion
+            caracter = siguiente_caracter()
+            if not caracter or caracter not in caracteres:
+                raise json.JSONDecodeError(f"Se esperaba uno de {caracteres!r}", texto, posicion)
+            posicion += 1
+            return caracter
+
+        def decodificar():
+            """Decodifica el valor JSON que empieza en la posición actual."""
+            nonlocal posicion
+            siguiente_caracter()
+            while True:
+                try:
+                    valor, fin = decodificador.raw_decode(texto, posicion)
+                except json.JSONDecodeError as error:
+                    cortado = (error.pos >= len(texto) - MARGEN_VALOR_CORTADO
+                               or error.msg.startswith('Unterminated string'))
+                    if fin_archivo or not cortado or len(texto) - posicion > LONGITUD_MAXIMA_VALOR:
+                        raise
+                    # El valor está cortado al final del bloque: se lee el siguiente y se reintenta.
+                    leer_mas()
+                    continue
+                if fin >= len(texto) - MARGEN_VALOR_CORTADO and not fin_archivo:
+                    # Un número o literal cerca del final del bloque puede seguir en el próximo
+                    # ("1." se decodifica como 1 si el bloque termina justo después del punto).
+                    leer_mas()
+                    continue
+                posicion = fin
+                return valor
+
+        if siguiente_caracter() != '{':
+            raise ValueError("La raíz del JSON no es un objeto")
+        posicion += 1
+        libros_vistos = False
+        if siguiente_caracter() == '}':
+            posicion += 1
+        else:
+            while True:
+                if siguiente_caracter() != '"':
+                    raise json.JSONDecodeError("Se esperaba una clave", texto, posicion)
+                clave = decodificar()
+                esperar(':')
+                if clave != 'libros':
+                    decodificar()  # Otro valor del objeto raíz: se valida y se descarta.
+                else:
+                    if libros_vistos:
+                        # json.load se queda con la última; no se puede recorrer en un solo paso.
+                        raise ValueError("Clave 'libros' repetida")
+                    libros_vistos = True
+                    if siguiente_caracter() != '[':
+                        raise ValueError("'libros' no es una lista")
+                    posicion += 1
+                    if siguiente_caracter() == ']':
+                        posicion += 1
+                    else:
+                        # Decodifica cada libro de la lista por separado.
+                        while True:
+                            yield decodificar()
+                            if esperar(',]') == ']':
+                                break
+                if esperar(',}') == '}':
+                    break
+        if siguiente_caracter():
+            raise json.JSONDecodeError("Contenido después del objeto raíz", texto, posicion)
+        # Sin clave "libros" no hay libros, igual que data.get('libros', []).
+
+
+def escribir_snapshot(ruta_json, destino=None):
+    """
+    Lee el JSON de forma incremental y escribe su instantánea binaria.
+
+    :param ruta_json: Archivo con la forma de base_conocimiento.json.
+    :param destino: Archivo de salida (por defecto, ruta_json + '.snap').
+    :return: Ruta de la instantánea escrita.
+    :raises ValueError: Si un libro tiene un ID o un Rating_Base no numérico.
+    """
+    destino = destino or ruta_snapshot(ruta_json)
+    estado = os.stat(ruta_json)
+
+    ids = array('q')
+    ratings = array('d')
+    columnas = {columna: array('I') for columna in COLUMNAS_TEXTO}
+    tabla = {}
+    cadenas = []
+    for libro in iterar_libros_json(ruta_json):
+        libro_id, rating = libro['ID_Libro'], libro['Rating_Base']
+        if not isinstance(libro_id, int) or isinstance(rating, bool) or not isinstance(rating, (int, float)):
+            raise ValueError(f"Libro con ID o Rating_Base no numérico: {libro_id!r}")
+        ids.append(libro_id)
+        ratings.append(rating)
+        for columna in COLUMNAS_TEXTO:
+            valor = libro[columna]
+            indice = tabla.get(valor)
+            if indice is None:
+                indice = tabla[valor] = len(cadenas)
+                cadenas.append(valor)
+            columnas[columna].append(indice)
+
+    datos_cadenas = bytearray()
+    offsets = array('Q', [0])
+    for cadena in cadenas:
+        datos_cadenas += cadena.encode('utf-8')
+        offsets.append(len(datos_cadenas))
+
+    secciones = [('ids', ids), ('ratings', ratings)]
+    secciones += [(columna, columnas[columna]) for columna in COLUMNAS_TEXTO]
+    secciones += [('offsets', offsets), ('cadenas', datos_cadenas)]
+    if sys.byteorder != 'little':
+        for _, datos in secciones:
+            if isinstance(datos, array):
+                datos.byteswap()
+
+    cabecera = {
+        'version': VERSION_FORMATO,
+        'mtime_ns': estado.st_mtime_ns,
+        'tamano': estado.st_size,
+        'sha256': huella_archivo(ruta_json),
+        'n_libros': len(ids),
+        'n_cadenas': len(cadenas),
+        'secciones': {}
+    }
+    # Los desplazamientos dependen del largo de la cabecera, que a su vez los contiene;
+    # se reserva un tamaño fijo holgado para la cabecera y se rellena con espacios.
+    largo_cabecera = 4096
+    posicion = len(MAGIA) + 4 + largo_cabecera
+    for nombre, datos in secciones:
+        posicion += -posicion % 8
+        largo = len(datos) * (datos.itemsize if isinstance(datos, array) else 1)
+        cabecera['secciones'][nombre] = [posicion, largo]
+        posicion += largo
+    texto_cabecera = json.dumps(cabecera).encode('utf-8').ljust(largo_cabecera)
+
+    temporal = destino + '.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(MAGIA + struct.pack('<I', largo_cabecera) + texto_cabecera)
+        for nombre, datos in secciones:
+            f.write(b'\0' * (cabecera['secciones'][nombre][0] - f.tell()))
+            f.write(datos.tobytes() if isinstance(datos, array) else datos)
+    # Reemplazo atómico: un proceso que arranque a la vez nunca ve un archivo a medias.
+    os.replace(temporal, destino)
+    return destino
+
+
+class SnapshotCatalogo:
+    """
+    Vista de solo lectura sobre una instantánea binaria mapeada con mmap.
+
+    Las columnas numéricas e índices son memoryview sobre el archivo mapeado (no se copian);
+    las cadenas se decodifican una sola vez, ya que la tabla no tiene repetidos.
+    """
+
+    def __init__(self, archivo, mapa, cabecera):
+        self.archivo = archivo
+        self.mapa = mapa
+        self.cabecera = cabecera
+        self.n_libros = cabecera['n_libros']
+        secciones = cabecera['secciones']
+
+        def vista(nombre, formato):
+            inicio, largo = secciones[nombre]
+            return memoryview(mapa)[inicio:inicio + largo].cast(formato)
+
+        self.ids = vista('ids', 'q')
+        self.ratings = vista('ratings', 'd')
+        self.columnas = {columna: vista(columna, 'I') for columna in COLUMNAS_TEXTO}
+        offsets = vista('offsets', 'Q')
+        inicio_cadenas, largo_cadenas = secciones['cadenas']
+        datos = mapa[inicio_cadenas:inicio_cadenas + largo_cadenas]
+        self.cadenas = [datos[offsets[i]:offsets[i + 1]].decode('utf-8')
+                        for i in range(cabecera['n_cadenas'])]
+
+    def __len__(self):
+        return self.n_libros
+
+    def iterar_libros(self):
+        """Reconstruye los diccionarios de libros, en el orden del JSON original."""
+        cadenas = self.cadenas
+        # tolist() copia cada columna a una lista de una sola vez (en C), más rápido que
+        # indexar el memoryview elemento a elemento.
+        titulos, autores, generos, ritmos, complejidades, motivaciones, compromisos, rutas = (
+            self.columnas[columna].tolist() for columna in COLUMNAS_TEXTO)
+        ids = self.ids.tolist()
+        ratings = self.ratings.tolist()
+        for i in range(self.n_libros):
+            yield {
+                'ID_Libro': ids[i],
+                'Titulo': cadenas[titulos[i]],
+                'Autor': cadenas[autores[i]],
+                'Atributo_1_Genero': cadenas[generos[i]],
+                'Atributo_2_Ritmo': cadenas[ritmos[i]],
+                'Atributo_3_Complejidad': cadenas[complejidades[i]],
+                'Atributo_4_Motivacion': cadenas[motivaciones[i]],
+                'Atributo_5_Compromiso': cadenas[compromisos[i]],
+                'Rating_Base': ratings[i],
+                'Ruta_Imagen': cadenas[rutas[i]]
+            }
+
+    def cerrar(self):
+        """Libera el mapeo y el archivo."""
+        self.ids.release()
+        self.ratings.release()
+        for vista in self.columnas.values():
+            vista.release()
+        self.mapa.close()
+        self.archivo.close()
+
+
+def abrir_snapshot(ruta_json, ruta=None):
+    """
+    Abre la instantánea de un JSON si sigue siendo válida.
+
+    Es válida si coinciden la fecha de modificación y el tamaño del JSON, o, si la fecha
+    cambió (ej: el archivo se copió o se tocó), si coincide su huella SHA-256.
+    :return: SnapshotCatalogo, o None si no existe, está desactualizada o no es legible.
+    """
+    ruta = ruta or ruta_snapshot(ruta_json)
+    try:
+        archivo = open(ruta, 'rb')
+    except OSError:
+        return None
+    mapa = None
+    try:
+        mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapa[:len(MAGIA)] != MAGIA or sys.byteorder != 'little':
+            raise ValueError("Formato desconocido")
+        largo_cabecera = struct.unpack_from('<I', mapa, len(MAGIA))[0]
+        inicio = len(MAGIA) + 4
+        cabecera = json.loads(mapa[inicio:inicio + largo_cabecera].decode('utf-8'))
+        if cabecera.get('version') != VERSION_FORMATO:
+            raise ValueError("Versión de formato distinta")
+
+        estado = os.stat(ruta_json)
+        if estado.st_size != cabecera['tamano']:
+            raise ValueError("El JSON cambió de tamaño")
+        if estado.st_mtime_ns != cabecera['mtime_ns'] and huella_archivo(ruta_json) != cabecera['sha256']:
+            raise ValueError("El JSON cambió de contenido")
+        return SnapshotCatalogo(archivo, mapa, cabecera)
+    except (OSError, ValueError, KeyError, struct.error):
+        if mapa is not None:
+            mapa.close()
+        archivo.close()
+        return None
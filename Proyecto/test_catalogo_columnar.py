@@ -0,0 +1,108 @@
+# =================================================================================
+# test_catalogo_columnar.py (Catálogo en columnas: ida y vuelta por la instantánea binaria)
+# =================================================================================
+import json
+import random
+
+import pytest
+
+from benchmark_motor import generar_catalogo
+from catalogo_columnar import CatalogoColumnar
+from motor_inferencia import COLUMNAS_ATRIBUTOS
+from snapshot_conocimiento import abrir_snapshot, escribir_snapshot
+
+
+def libros_especiales():
+    """Libros con textos y números que la tabla de cadenas y los arreglos deben conservar."""
+    return [
+        {'ID_Libro': -7, 'Titulo': '', 'Autor': 'Ñandú "el" \\ Ö', 'Atributo_1_Genero': 'Fantasia',
+         'Atributo_2_Ritmo': 'Media', 'Atributo_3_Complejidad': 'Media', 'Atributo_4_Motivacion': 'Evadir',
+         'Atributo_5_Compromiso': 'Largo', 'Rating_Base': 4, 'Ruta_Imagen': 'libro_1.jpg'},
+        {'ID_Libro': 2 ** 62, 'Titulo': '📚 Título\ncon salto', 'Autor': 'Media',
+         'Atributo_1_Genero': 'Valor que solo tiene este libro', 'Atributo_2_Ritmo': 'Lento',
+         'Atributo_3_Complejidad': 'Alta', 'Atributo_4_Motivacion': 'Aprender',
+         'Atributo_5_Compromiso': 'Corto', 'Rating_Base': 0.1 + 0.2, 'Ruta_Imagen': ''}
+    ]
+
+
+def indice_por_valor(catalogo):
+    return {valor: list(posiciones) for valor, posiciones in catalogo.indice_atributos.items() if posiciones}
+
+
+def desde_snapshot(ruta):
+    escribir_snapshot(ruta)
+    snapshot = abrir_snapshot(ruta)
+    assert snapshot is not None
+    try:
+        catalogo = CatalogoColumnar.desde_snapshot(snapshot, COLUMNAS_ATRIBUTOS)
+    finally:
+        snapshot.cerrar()
+    catalogo.construir_indice()
+    return catalogo
+
+
+@pytest.fixture
+def libros(tmp_path):
+    ruta = str(tmp_path / 'sinteticos.json')
+    generar_catalogo(ruta, 500, semilla=16)
+    with open(ruta, encoding='utf-8') as f:
+        return libros_especiales() + json.load(f)['libros']
+
+
+@pytest.fixture
+def ruta(tmp_path, libros):
+    ruta = str(tmp_path / 'conocimiento.json')
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({'libros': libros}, f, ensure_ascii=False)
+    return ruta
+
+
+def test_instantanea_ida_y_vuelta(libros, ruta):
+    esperado = CatalogoColumnar.desde_libros(libros, COLUMNAS_ATRIBUTOS)
+    esperado.construir_indice()
+    leido = desde_snapshot(ruta)
+
+    assert list(leido) == list(esperado) == libros
+    assert leido.ids == esperado.ids and leido.ratings == esperado.ratings
+    assert leido.titulos == esperado.titulos and leido.autores == esperado.autores
+    assert leido.rutas_imagen == esperado.rutas_imagen
+    # Los códigos internados pueden numerarse distinto; el índice por valor debe coincidir.
+    assert indice_por_valor(leido) == indice_por_valor(esperado)
+    for libro in libros:
+        assert leido.posicion_de(libro['ID_Libro']) == esperado.posicion_de(libro['ID_Libro'])
+
+
+def test_editar_catalogo_leido_de_instantanea(libros, ruta):
+    azar = random.Random(16)
+    esperado = CatalogoColumnar.desde_libros(libros, COLUMNAS_ATRIBUTOS)
+    esperado.construir_indice()
+    leido = desde_snapshot(ruta)
+    catalogos = [esperado.copiar(), leido.copiar()]
+
+    siguiente_id = 10 ** 6
+    for _ in range(200):
+        operacion = azar.random()
+        posicion = azar.randrange(len(esperado.ids))
+        if operacion < 0.3:
+            libro = dict(azar.choice(libros), ID_Libro=siguiente_id, Atributo_2_Ritmo=f'Nuevo {siguiente_id % 3}')
+            siguiente_id += 1
+            for catalogo in catalogos:
+                catalogo.agregar(dict(libro))
+        elif operacion < 0.7 and catalogos[0].vigente(posicion):
+            libro = dict(azar.choice(libros), ID_Libro=catalogos[0].ids[posicion],
+                         Rating_Base=azar.choice([1.5, 4.2, 5.0]))
+            for catalogo in catalogos:
+                catalogo.actualizar(posicion, dict(libro))
+        else:
+            for catalogo in catalogos:
+                catalogo.eliminar(posicion)
+
+    editado_libros, editado_instantanea = catalogos
+    assert list(editado_instantanea) == list(editado_libros)
+    assert indice_por_valor(editado_instantanea) == indice_por_valor(editado_libros)
+    compactado = editado_instantanea.compactado()
+    assert list(compactado) == list(editado_libros)
+    assert indice_por_valor(compactado) == indice_por_valor(editado_libros.compactado())
+    # Las copias editadas no tocan los catálogos de los que salieron.
+    assert list(leido) == list(esperado) == libros
+    assert indice_por_valor(leido) == indice_por_valor(esperado)
@@ -0,0 +1,35 @@
+# =================================================================================
+# test_estado_incremental.py (Cuestionario en curso: deltas, retrocesos y k mejores)
+# =================================================================================
+import heapq
+import random
+
+from motor_inferencia import MotorRecomendacion
+
+
+def crear_motor():
+    motor = MotorRecomendacion()
+    assert motor.cargar_reglas()
+    assert motor.cargar_conocimiento_json()
+    return motor
+
+
+def test_k_mejores_coinciden_con_recorrer_todos_los_puntajes():
+    motor = crear_motor()
+    opciones = [respuesta for respuestas in motor.opciones_por_pregunta().values() for respuesta in respuestas]
+    pasos = len(motor.opciones_por_pregunta())
+    azar = random.Random(8)
+    estado = motor.crear_estado_incremental()
+    for _ in range(1500):
+        operacion = azar.random()
+        if operacion < 0.6:
+            estado.fijar_respuesta(azar.randint(1, pasos), azar.choice(opciones))
+        elif operacion < 0.95:
+            estado.deshacer_desde(azar.randint(1, pasos))
+        else:
+            estado.reiniciar()
+        k = azar.randint(1, 8)
+        # Mismo orden y mismos desempates que el recorrido completo que reemplaza.
+        esperado = heapq.nlargest(k, estado.puntajes.items(), key=lambda item: item[1])
+        assert estado.posiciones_mejores(k) == esperado
+        assert estado.mejores(k) == motor.calcular_recomendaciones(estado.respuestas(), k, None)
@@ -0,0 +1,58 @@
+# =================================================================================
+# test_motor_aproximado.py (Recuperación aproximada IVF frente al motor exacto)
+# =================================================================================
+import pytest
+
+pytest.importorskip("numpy")  # El modo aproximado necesita NumPy.
+
+from ayudas_pruebas import comprobar_ediciones, crear_motor, libros_sinteticos
+
+LIBROS = 2_000
+LISTAS = 20
+K_PROBADOS = (1, 2, 5, 40)
+OPERACIONES_EDICION = 150
+
+
+def crear_motor_aproximado(libros, sondeos=LISTAS):
+    motor = crear_motor(libros)
+    assert motor.usar_vecinos_aproximados(sondeos, LISTAS)
+    return motor
+
+
+@pytest.fixture(scope='module')
+def libros(tmp_path_factory):
+    return libros_sinteticos(tmp_path_factory.mktemp('catalogo'), LIBROS, semilla=17)
+
+
+def test_todas_las_listas_coincide_con_motor_exacto(libros):
+    exacto = crear_motor(libros)
+    aproximado = crear_motor_aproximado(libros)
+    combinaciones = [list(respuestas) for respuestas in exacto.espacio_respuestas()]
+    assert len(combinaciones) == 216
+    for respuestas in combinaciones:
+        for parcial in (respuestas, respuestas[:2]):
+            for k in K_PROBADOS:
+                assert (aproximado.calcular_recomendaciones(parcial, k, None)
+                        == exacto.calcular_recomendaciones(parcial, k, None)), (parcial, k)
+    assert aproximado.medir_recall(combinaciones, 10) == 1.0
+
+
+def test_pocos_sondeos_devuelven_puntajes_exactos(libros):
+    exacto = crear_motor(libros)
+    aproximado = crear_motor_aproximado(libros, sondeos=1)
+    combinaciones = [list(respuestas) for respuestas in exacto.espacio_respuestas()]
+    recall = aproximado.medir_recall(combinaciones, 10)
+    assert 0 < recall <= 1
+    for respuestas in combinaciones[::6]:
+        # Lo aproximado es qué libros son candidatos, no su puntaje ni su orden.
+        ranking = {(r['ID_Libro'], r['Puntaje_Total'])
+                   for r in exacto.calcular_recomendaciones(respuestas, LIBROS, None)}
+        recomendaciones = aproximado.calcular_recomendaciones(respuestas, 10, None)
+        assert all((r['ID_Libro'], r['Puntaje_Total']) in ranking for r in recomendaciones)
+        puntajes = [r['Puntaje_Total'] for r in recomendaciones]
+        assert puntajes == sorted(puntajes, reverse=True)
+
+
+def test_editar_y_consultar_coincide_con_reconstruir(libros):
+    # Con todas las listas abiertas el resultado es exacto aunque el índice se edite.
+    comprobar_ediciones(crear_motor_aproximado, libros, OPERACIONES_EDICION, semilla=17)
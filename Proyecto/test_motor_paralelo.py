@@ -0,0 +1,64 @@
+# =================================================================================
+# test_motor_paralelo.py (Puntuación repartida en procesos frente al modo en serie)
+# =================================================================================
+import pytest
+
+import motor_inferencia
+from ayudas_pruebas import crear_motor, libros_sinteticos
+from benchmark_motor import generar_respuestas
+
+LIBROS = 3_001
+PROCESOS = 3
+K_PROBADOS = (1, 2, 7, 10 ** 6)
+
+
+@pytest.fixture(scope='module')
+def motores(tmp_path_factory):
+    libros = libros_sinteticos(tmp_path_factory.mktemp('catalogo'), LIBROS)
+    serie = crear_motor(libros)
+    paralelo = crear_motor(libros)
+    paralelo.usar_paralelo(PROCESOS)
+    # Fragmentos pequeños para no necesitar un catálogo de decenas de miles de libros.
+    parche = pytest.MonkeyPatch()
+    parche.setattr(motor_inferencia, 'LIBROS_MINIMOS_POR_FRAGMENTO', 10)
+    try:
+        assert len(paralelo.obtener_fragmentos()) == PROCESOS
+        yield serie, paralelo
+    finally:
+        paralelo.descartar_fragmentos()
+        parche.undo()
+
+
+def test_fragmentos_coinciden_con_serie_en_todo_el_cuestionario(motores):
+    serie, paralelo = motores
+    combinaciones = [list(respuestas) for respuestas in serie.espacio_respuestas()]
+    assert len(combinaciones) == 216
+    for respuestas in combinaciones:
+        for k in K_PROBADOS:
+            assert (paralelo.calcular_recomendaciones(respuestas, k, None)
+                    == serie.calcular_recomendaciones(respuestas, k, None)), (respuestas, k)
+
+
+def test_lote_y_respuestas_parciales_coinciden_con_serie(motores):
+    serie, paralelo = motores
+    # Respuestas parciales o vacías: otros libros sin puntuar y otros empates.
+    lote = [respuestas[:n % 6] for n, respuestas in enumerate(generar_respuestas(serie, 60, semilla=3))]
+    esperados = [serie.calcular_recomendaciones(respuestas, 5, None) for respuestas in lote]
+    assert paralelo.inferir_lote(lote, 5) == esperados
+    for respuestas, esperado in zip(lote, esperados):
+        assert paralelo.calcular_recomendaciones(respuestas, 5, None) == esperado
+
+
+def test_editar_descarta_los_fragmentos(motores):
+    serie, paralelo = motores
+    libro = dict(serie.libros[0], ID_Libro=10 ** 9, Rating_Base=9.0)
+    try:
+        assert serie.agregar_libro(dict(libro)) and paralelo.agregar_libro(dict(libro))
+        assert paralelo.pool_fragmentos is None
+        # El género de cada libro coincide con la respuesta de su regla de género.
+        respuestas = [libro['Atributo_1_Genero']]
+        recomendaciones = paralelo.calcular_recomendaciones(respuestas, 3, None)
+        assert recomendaciones[0]['ID_Libro'] == libro['ID_Libro']
+        assert recomendaciones == serie.calcular_recomendaciones(respuestas, 3, None)
+    finally:
+        assert serie.eliminar_libro(libro['ID_Libro']) and paralelo.eliminar_libro(libro['ID_Libro'])
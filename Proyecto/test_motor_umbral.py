@@ -0,0 +1,42 @@
+# =================================================================================
+# test_motor_umbral.py (Top-k con el algoritmo del umbral frente al recorrido completo)
+# =================================================================================
+import pytest
+
+from ayudas_pruebas import comprobar_ediciones, crear_motor, libros_sinteticos
+
+LIBROS = 2_000
+K_PROBADOS = (1, 2, 5, 40)
+OPERACIONES_EDICION = 300
+
+
+def crear_motor_umbral(libros):
+    motor = crear_motor(libros)
+    motor.usar_top_k_umbral()
+    return motor
+
+
+@pytest.fixture(scope='module')
+def libros(tmp_path_factory):
+    return libros_sinteticos(tmp_path_factory.mktemp('catalogo'), LIBROS)
+
+
+def test_umbral_coincide_con_recorrido_completo_en_todo_el_cuestionario(libros):
+    completo = crear_motor(libros)
+    umbral = crear_motor_umbral(libros)
+    combinaciones = [list(respuestas) for respuestas in completo.espacio_respuestas()]
+    assert len(combinaciones) == 216
+    for respuestas in combinaciones:
+        # También el cuestionario a medio responder (menos activaciones, más empates).
+        for parcial in (respuestas, respuestas[:2]):
+            for k in K_PROBADOS:
+                assert (umbral.calcular_recomendaciones(parcial, k, None)
+                        == completo.calcular_recomendaciones(parcial, k, None)), (parcial, k)
+    # k mayor que los libros puntuados: el umbral nunca corta y devuelve el ranking entero.
+    for respuestas in combinaciones[::12]:
+        assert (umbral.calcular_recomendaciones(respuestas, LIBROS + 1, None)
+                == completo.calcular_recomendaciones(respuestas, LIBROS + 1, None))
+
+
+def test_editar_y_consultar_coincide_con_reconstruir(libros):
+    comprobar_ediciones(crear_motor_umbral, libros, OPERACIONES_EDICION, semilla=15)
@@ -0,0 +1,45 @@
+# =================================================================================
+# test_recomendar_lote.py (Recomendaciones por lotes: entrada con bytes inválidos)
+# =================================================================================
+import csv
+import json
+import os
+import subprocess
+import sys
+
+from motor_inferencia import BASE_DIR
+
+SCRIPT = os.path.join(BASE_DIR, 'recomendar_lote.py')
+
+
+def ejecutar(ruta_entrada, ruta_salida, stdin=None, formato=None):
+    argumentos = [sys.executable, SCRIPT, ruta_entrada, '--salida', str(ruta_salida), '--k', '2']
+    if formato:
+        argumentos += ['--formato', formato]
+    return subprocess.run(argumentos, input=stdin, capture_output=True, timeout=120)
+
+
+def test_linea_jsonl_con_bytes_invalidos_es_un_error_y_sigue(tmp_path):
+    entrada = tmp_path / 'cuestionarios.jsonl'
+    entrada.write_bytes(b'{"id": "a", "respuestas": ["Fantasia"]}\n'
+                        b'{"id": "b\xff", "respuestas": ["Comic"]}\n'
+                        b'{"id": "c", "respuestas": ["Romance", "Ritmo Lento"]}\n')
+    salida = tmp_path / 'recomendaciones.jsonl'
+    proceso = ejecutar(str(entrada), salida)
+    assert proceso.returncode == 0, proceso.stderr.decode('utf-8', 'replace')
+
+    filas = [json.loads(linea) for linea in salida.read_text(encoding='utf-8').splitlines()]
+    assert [fila['id'] for fila in filas] == ['a', 2, 'c']
+    assert filas[1]['error'] == "La línea no es UTF-8 válido."
+    assert len(filas[0]['recomendaciones']) == len(filas[2]['recomendaciones']) == 2
+
+
+def test_stdin_csv_con_bytes_invalidos_es_un_error_y_sigue(tmp_path):
+    salida = tmp_path / 'recomendaciones.csv'
+    proceso = ejecutar('-', salida, stdin=b'id,r1,r2\na,Fantasia,Ritmo Lento\nb,Com\xe9ic,\nc,Comic,\n', formato='csv')
+    assert proceso.returncode == 0, proceso.stderr.decode('utf-8', 'replace')
+    assert b'1 inv' in proceso.stderr
+
+    with open(salida, encoding='utf-8', newline='') as f:
+        filas = list(csv.DictReader(f))
+    assert [fila['id'] for fila in filas if fila['ID_Libro']] == ['a', 'a', 'c', 'c']
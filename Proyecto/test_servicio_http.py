@@ -0,0 +1,111 @@
+# =================================================================================
+# test_servicio_http.py (Servicio HTTP: recarga de reglas, límites de línea y perfilador)
+# =================================================================================
+import asyncio
+import json
+import os
+import shutil
+
+import motor_inferencia
+from motor_inferencia import REGLAS_FILE, MotorRecomendacion
+from servicio_http import ServicioRecomendacion
+
+PERFIL = ['Fantasia', 'Ritmo Lento', 'Complejidad Alta', 'Motivación_Evadir', 'Compromiso_Largo']
+
+
+def crear_motor(ruta_reglas=REGLAS_FILE):
+    motor = MotorRecomendacion()
+    assert motor.cargar_reglas(ruta_reglas)
+    assert motor.cargar_conocimiento_json()
+    return motor
+
+
+def ejecutar(motor, prueba):
+    """Levanta el servicio en un puerto libre, ejecuta `prueba(servicio, puerto)` y lo detiene."""
+    async def envolver():
+        servicio = ServicioRecomendacion(motor)
+        servidor = await servicio.iniciar('127.0.0.1', 0)
+        try:
+            return await prueba(servicio, servidor.sockets[0].getsockname()[1])
+        finally:
+            servidor.close()
+            await servidor.wait_closed()
+            servicio.tarea_lotes.cancel()
+            servicio.ejecutor.shutdown()
+            servicio.ejecutor_perfil.shutdown()
+    return asyncio.run(envolver())
+
+
+async def enviar(puerto, datos):
+    """Envía bytes crudos y devuelve (código_http, cuerpo_json) de la respuesta."""
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+    try:
+        escritor.write(datos)
+        await escritor.drain()
+        estado = await lector.readline()
+        cabeceras = {}
+        while (linea := await lector.readline()) not in (b'\r\n', b''):
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        cuerpo = await lector.readexactly(int(cabeceras['content-length']))
+        return int(estado.split()[1]), json.loads(cuerpo)
+    finally:
+        escritor.close()
+
+
+def test_perfil_en_cache_cambia_al_editar_las_reglas(tmp_path, monkeypatch):
+    ruta_reglas = str(tmp_path / 'reglas.json')
+    shutil.copy(REGLAS_FILE, ruta_reglas)
+    # Sin esperar el segundo entre revisiones del archivo de reglas.
+    monkeypatch.setattr(motor_inferencia, 'INTERVALO_REVISION_REGLAS', 0.0)
+
+    async def prueba(servicio, _):
+        antes = await servicio.recomendar(PERFIL, 3)
+        assert await servicio.recomendar(PERFIL, 3) == antes
+        assert servicio.metricas.aciertos_cache == 1
+
+        with open(ruta_reglas, encoding='utf-8') as f:
+            datos = json.load(f)
+        for regla in datos['reglas']:
+            if regla.get('respuesta_usuario') == 'Fantasia':
+                regla['fc'] = -5.0
+        with open(ruta_reglas, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+        # Fecha distinta aunque el sistema de archivos tenga poca resolución.
+        estado = os.stat(ruta_reglas)
+        os.utime(ruta_reglas, ns=(estado.st_atime_ns, estado.st_mtime_ns + 10 ** 9))
+
+        despues = await servicio.recomendar(PERFIL, 3)
+        return antes, despues
+
+    antes, despues = ejecutar(crear_motor(ruta_reglas), prueba)
+    assert despues != antes
+    assert despues == crear_motor(ruta_reglas).calcular_recomendaciones(PERFIL, 3, None)
+
+
+def test_lineas_demasiado_largas_reciben_respuesta():
+    async def prueba(servicio, puerto):
+        relleno = b'a' * (128 * 1024)
+        linea_larga = await enviar(puerto, b'GET /' + relleno + b' HTTP/1.1\r\n\r\n')
+        cabecera_larga = await enviar(puerto, b'GET /salud HTTP/1.1\r\nX-Relleno: ' + relleno + b'\r\n\r\n')
+        # El servicio sigue atendiendo conexiones nuevas.
+        salud = await enviar(puerto, b'GET /salud HTTP/1.1\r\nConnection: close\r\n\r\n')
+        return linea_larga, cabecera_larga, salud
+
+    linea_larga, cabecera_larga, salud = ejecutar(crear_motor(), prueba)
+    assert linea_larga[0] == 400
+    assert cabecera_larga[0] == 431
+    assert salud[0] == 200 and salud[1]['estado'] == 'ok'
+
+
+def test_perfilador_se_enciende_y_apaga():
+    async def prueba(servicio, _):
+        encendido = await servicio.despachar('POST', '/perfil', b'{"activo": true, "intervalo_ms": 1}')
+        activo = servicio.motor.metricas.hilo_muestreo is not None
+        apagado = await servicio.despachar('POST', '/perfil', b'{"activo": false}')
+        return encendido, activo, apagado, await servicio.despachar('GET', '/perfil', b'')
+
+    encendido, activo, apagado, consulta = ejecutar(crear_motor(), prueba)
+    assert encendido == (200, {"muestreo_activo": True}) and activo
+    assert apagado == (200, {"muestreo_activo": False})
+    assert consulta[0] == 200 and consulta[1]["muestreo_activo"] is False
@@ -0,0 +1,128 @@
+# =================================================================================
+# test_snapshot_conocimiento.py (Lectura incremental del JSON e instantánea binaria)
+# =================================================================================
+import json
+import os
+
+import pytest
+
+import snapshot_conocimiento
+from motor_inferencia import CONOCIMIENTO_FILE, MotorRecomendacion
+from snapshot_conocimiento import iterar_libros_json, ruta_snapshot
+
+
+def libros_de_ejemplo(n=3):
+    with open(CONOCIMIENTO_FILE, encoding='utf-8') as f:
+        return json.load(f)['libros'][:n]
+
+
+def escribir(ruta, texto):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write(texto)
+    return str(ruta)
+
+
+def contar_lectura(monkeypatch):
+    """Hace que iterar_libros_json anote cuántos caracteres lee del archivo."""
+    leidos = []
+    abrir = open
+
+    class ArchivoContado:
+        def __init__(self, *argumentos, **opciones):
+            self.archivo = abrir(*argumentos, **opciones)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *excepcion):
+            self.archivo.close()
+
+        def read(self, tamano):
+            bloque = self.archivo.read(tamano)
+            leidos.append(len(bloque))
+            return bloque
+
+    monkeypatch.setattr(snapshot_conocimiento, 'open', ArchivoContado, raising=False)
+    return leidos
+
+
+def cargar(ruta, usar_snapshot=True):
+    motor = MotorRecomendacion()
+    assert motor.cargar_conocimiento_json(ruta, usar_snapshot=usar_snapshot)
+    return [dict(libro) for libro in motor.libros]
+
+
+@pytest.mark.parametrize("tamano_bloque", [7, 64, 1 << 20])
+def test_iterar_coincide_con_json_load(tamano_bloque):
+    with open(CONOCIMIENTO_FILE, encoding='utf-8') as f:
+        esperados = json.load(f)['libros']
+    assert list(iterar_libros_json(CONOCIMIENTO_FILE, tamano_bloque)) == esperados
+
+
+@pytest.mark.parametrize("tamano_bloque", [5, 1 << 20])
+def test_clave_libros_anidada_o_en_cadena_no_confunde(tmp_path, tamano_bloque):
+    libros = libros_de_ejemplo()
+    documento = ('{"meta": {"libros": []}, "nota": "\\"libros\\": [", "n": 12345, '
+                 '"lista": [{"libros": [1]}], "libros": ' + json.dumps(libros) + ', "fin": true}')
+    ruta = escribir(tmp_path / "conocimiento.json", documento)
+
+    assert list(iterar_libros_json(ruta, tamano_bloque)) == libros
+    # La instantánea se escribe con los 3 libros y los arranques siguientes la reutilizan.
+    assert [libro['ID_Libro'] for libro in cargar(ruta)] == [libro['ID_Libro'] for libro in libros]
+    assert os.path.exists(ruta_snapshot(ruta))
+    assert cargar(ruta) == cargar(ruta, usar_snapshot=False)
+
+
+def test_contenido_despues_del_objeto_se_rechaza(tmp_path):
+    ruta = escribir(tmp_path / "conocimiento.json",
+                    json.dumps({"libros": libros_de_ejemplo()}) + ' {"libros": []}')
+    with pytest.raises(json.JSONDecodeError):
+        list(iterar_libros_json(ruta))
+    # json.load también lo rechaza: la carga falla y no queda ninguna instantánea.
+    assert not MotorRecomendacion().cargar_conocimiento_json(ruta)
+    assert not os.path.exists(ruta_snapshot(ruta))
+
+
+def test_clave_repetida_recurre_a_json_load(tmp_path):
+    libros = libros_de_ejemplo()
+    ruta = escribir(tmp_path / "conocimiento.json",
+                    '{"libros": ' + json.dumps(libros[:1]) + ', "libros": ' + json.dumps(libros) + '}')
+    with pytest.raises(ValueError):
+        list(iterar_libros_json(ruta))
+    # json.load se queda con la última lista, y no se guarda una instantánea incorrecta.
+    assert len(cargar(ruta)) == len(libros)
+    assert not os.path.exists(ruta_snapshot(ruta))
+
+
+def test_sin_clave_libros_es_un_catalogo_vacio(tmp_path):
+    ruta = escribir(tmp_path / "conocimiento.json", '{"meta": {"libros": [1, 2]}}')
+    assert list(iterar_libros_json(ruta)) == []
+    assert cargar(ruta) == []
+
+
+def test_valores_cortados_en_cualquier_bloque(tmp_path):
+    # Números y literales que el corte deja como otro valor válido ("1." o "-Infinit").
+    documento = ('{"v": -1.5e+10, "w": -Infinity, "s": "\\ud83d\\ude00\\"", '
+                 '"libros": [{"a": 1.25, "b": "x\\u00e9"}, 7, NaN, true], "z": 0.5}')
+    ruta = escribir(tmp_path / "conocimiento.json", documento)
+    for tamano_bloque in range(1, 60):
+        assert list(iterar_libros_json(ruta, tamano_bloque)) == json.loads(documento)['libros']
+
+
+def test_libro_mal_formado_no_lee_el_resto_del_archivo(tmp_path, monkeypatch):
+    libros = libros_de_ejemplo() * 2_000
+    ruta = escribir(tmp_path / "conocimiento.json",
+                    '{"libros": [{"ID_Libro": 1,, "Titulo": "x"}, ' + json.dumps(libros)[1:] + '}')
+    leidos = contar_lectura(monkeypatch)
+    with pytest.raises(json.JSONDecodeError):
+        list(iterar_libros_json(ruta, 4096))
+    assert sum(leidos) <= 4096
+
+
+def test_cadena_sin_cerrar_se_corta_en_la_longitud_maxima(tmp_path, monkeypatch):
+    ruta = escribir(tmp_path / "conocimiento.json", '{"libros": [{"Titulo": "' + 'x' * 200_000 + '}]}')
+    monkeypatch.setattr(snapshot_conocimiento, 'LONGITUD_MAXIMA_VALOR', 10_000)
+    leidos = contar_lectura(monkeypatch)
+    with pytest.raises(json.JSONDecodeError):
+        list(iterar_libros_json(ruta, 1024))
+    assert sum(leidos) <= 10_000 + 2 * 1024
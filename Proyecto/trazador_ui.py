@@ -0,0 +1,258 @@
+# =================================================================================
+# trazador_ui.py (Trazado opcional de la latencia de la interfaz)
+# =================================================================================
+# Se activa con la variable de entorno SERL_TRAZA_UI=1 (o true/yes, o la ruta .json del
+# informe), ej: SERL_TRAZA_UI=1 python main.py. Cualquier otro valor (0, false, ...) lo deja
+# apagado.
+# Apagado, el decorador trazar() devuelve las funciones intactas: no hay ningún costo.
+#
+# Encendido mide, en el hilo de Tk:
+#   - Cada interacción de punta a punta: desde el callback del usuario (select_option,
+#     go_next, ...) pasando por show_frame, update_results y BookCard.update_image, hasta que
+#     la ventana vuelve a estar en reposo (sin eventos por atender, sin inferencia en curso y
+#     sin tarjetas esperando su carátula). Se agrupan por pantalla y acción, con percentiles.
+#   - El tiempo de cada llamada trazada.
+#   - Los bloqueos: llamadas que retienen el bucle de eventos más que el umbral, y pausas del
+#     bucle fuera de las llamadas trazadas (detectadas por un latido con after()).
+# Al salir se imprime el informe; si la variable de entorno es una ruta .json, también se
+# guarda allí en JSON.
+import atexit         # Informe al terminar el proceso.
+import functools      # wraps() para conservar el nombre de las funciones trazadas.
+import json           # Informe en JSON.
+import math           # Percentiles por rango.
+import os             # Variables de entorno.
+import time           # Reloj de alta resolución.
+from collections import defaultdict # Tiempos agrupados por pantalla y por llamada.
+
+# Variable de entorno que activa el trazado (uno de VALORES_ACTIVOS, o la ruta .json del informe).
+VARIABLE_ENTORNO = "SERL_TRAZA_UI"
+# Valores de la variable que activan el trazado (sin distinguir mayúsculas), además de una ruta .json.
+VALORES_ACTIVOS = ("1", "true", "yes")
+# Variable de entorno opcional con el umbral de bloqueo en milisegundos.
+VARIABLE_UMBRAL = "SERL_TRAZA_UI_UMBRAL_MS"
+# Milisegundos a partir de los cuales una llamada se considera un bloqueo del bucle de Tk.
+UMBRAL_BLOQUEO_MS = 50.0
+# Milisegundos entre dos latidos del detector de pausas del bucle de eventos.
+INTERVALO_LATIDO_MS = 20
+# Milisegundos entre dos revisiones mientras una interacción espera trabajo en segundo plano.
+INTERVALO_SONDEO_MS = 10
+# Percentiles del informe.
+PERCENTILES = (50, 90, 99)
+# Bloqueos que se listan en el informe (los más largos).
+BLOQUEOS_EN_INFORME = 20
+
+
+def ruta_informe():
+    """Ruta .json donde guardar el informe ('' si la variable no es una ruta .json)."""
+    valor = os.environ.get(VARIABLE_ENTORNO, "").strip()
+    return valor if valor.lower().endswith(".json") else ""
+
+
+def trazado_pedido():
+    """Indica si la variable de entorno activa el trazado."""
+    valor = os.environ.get(VARIABLE_ENTORNO, "").strip().lower()
+    return valor in VALORES_ACTIVOS or bool(ruta_informe())
+
+
+ACTIVO = trazado_pedido()
+
+
+def reloj():
+    return time.perf_counter()
+
+
+def percentil(valores_ordenados, p):
+    """Percentil `p` por el método del rango más cercano (valores ya ordenados)."""
+    if not valores_ordenados:
+        return 0.0
+    return valores_ordenados[max(math.ceil(p / 100 * len(valores_ordenados)) - 1, 0)]
+
+
+def _resumen(tiempos_ms):
+    ordenados = sorted(tiempos_ms)
+    resumen = {"n": len(ordenados)}
+    for p in PERCENTILES:
+        resumen[f"p{p}"] = round(percentil(ordenados, p), 2)
+    resumen["max"] = round(ordenados[-1], 2) if ordenados else 0.0
+    return resumen
+
+
+class TrazadorUI:
+    """Registra las llamadas trazadas y las interacciones de la ventana (solo hilo de Tk)."""
+
+    def __init__(self, umbral_ms=UMBRAL_BLOQUEO_MS):
+        self.umbral_ms = umbral_ms
+        self.inicio = reloj()
+        self.raiz = None
+        self.pantalla = lambda: None
+        self.ocupado = lambda: False
+        # Llamadas trazadas anidadas en curso (solo la exterior retiene el bucle de eventos).
+        self.profundidad = 0
+        # Interacción abierta: (pantalla, acción, instante de inicio), o None.
+        self.interaccion = None
+        self.revision_programada = False
+        # Duraciones en ms: {(pantalla, acción): [...]} y {llamada: [...]}.
+        self.interacciones = defaultdict(list)
+        self.llamadas = defaultdict(list)
+        # Bloqueos: (segundos desde el inicio, pantalla, llamada, ms).
+        self.bloqueos = []
+        self.ultimo_latido = None
+        self.fin_ultimo_bloqueo = 0.0
+
+    def instalar(self, raiz, pantalla, ocupado):
+        """
+        :param raiz: Ventana principal (para after/after_idle).
+        :param pantalla: Función que devuelve el nombre de la pantalla visible.
+        :param ocupado: Función que indica si la ventana espera trabajo en segundo plano
+                        (inferencia o carátulas pedidas por tarjetas visibles).
+        """
+        self.raiz = raiz
+        self.pantalla = pantalla
+        self.ocupado = ocupado
+        raiz.after(INTERVALO_LATIDO_MS, self._latido)
+        atexit.register(self.volcar_informe)
+
+    # --- REGISTRO ---
+    def llamar(self, nombre, inicia, funcion, args, kwargs):
+        """Ejecuta una función trazada midiendo su duración."""
+        inicio = reloj()
+        if inicia and self.profundidad == 0:
+            if self.interaccion is not None:
+                # El usuario actuó antes de que terminara la interacción anterior: se cierra aquí.
+                self._cerrar_interaccion(inicio)
+            self.interaccion = (self.pantalla(), nombre, inicio)
+        self.profundidad += 1
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            self.profundidad -= 1
+            fin = reloj()
+            ms = (fin - inicio) * 1000
+            self.llamadas[nombre].append(ms)
+            if self.profundidad == 0:
+                if ms > self.umbral_ms:
+                    self.bloqueos.append((inicio - self.inicio, self.pantalla(), nombre, ms))
+                    self.fin_ultimo_bloqueo = fin
+                if self.interaccion is not None:
+                    self._programar_revision()
+
+    def _programar_revision(self):
+        if not self.revision_programada and self.raiz is not None:
+            self.revision_programada = True
+            self.raiz.after_idle(self._revisar_fin)
+
+    def _revisar_fin(self):
+        """Cierra la interacción si la ventana quedó en reposo; si no, vuelve a revisar."""
+        self.revision_programada = False
+        if self.interaccion is None:
+            return
+        if self.ocupado():
+            self.revision_programada = True
+            self.raiz.after(INTERVALO_SONDEO_MS, lambda: self.raiz.after_idle(self._revisar_fin))
+            return
+        self._cerrar_interaccion(reloj())
+
+    def _cerrar_interaccion(self, fin):
+        pantalla, accion, inicio = self.interaccion
+        self.interaccion = None
+        self.interacciones[(pantalla, accion)].append((fin - inicio) * 1000)
+
+    def _latido(self):
+        """Detecta pausas del bucle de eventos que no explica ninguna llamada trazada."""
+        ahora = reloj()
+        if self.ultimo_latido is not None:
+            retraso_ms = (ahora - self.ultimo_latido) * 1000 - INTERVALO_LATIDO_MS
+            if retraso_ms > self.umbral_ms and self.fin_ultimo_bloqueo <= self.ultimo_latido:
+                self.bloqueos.append((self.ultimo_latido - self.inicio, self.pantalla(),
+                                      "(bucle de Tk, fuera de las llamadas trazadas)", retraso_ms))
+        self.ultimo_latido = ahora
+        self.raiz.after(INTERVALO_LATIDO_MS, self._latido)
+
+    # --- INFORME ---
+    def informe(self):
+        """Devuelve el informe como diccionario (serializable a JSON)."""
+        return {
+            "umbral_bloqueo_ms": self.umbral_ms,
+            "interacciones": [dict(pantalla=pantalla, accion=accion, **_resumen(tiempos))
+                              for (pantalla, accion), tiempos in sorted(self.interacciones.items(),
+                                                                        key=lambda item: str(item[0]))],
+            "llamadas": [dict(llamada=nombre, **_resumen(tiempos))
+                         for nombre, tiempos in sorted(self.llamadas.items())],
+            "bloqueos_totales": len(self.bloqueos),
+            "bloqueos": [{"segundo": round(segundo, 3), "pantalla": pantalla, "llamada": nombre,
+                          "ms": round(ms, 2)}
+                         for segundo, pantalla, nombre, ms in sorted(self.bloqueos, key=lambda b: -b[3])
+                         [:BLOQUEOS_EN_INFORME]]
+        }
+
+    def como_texto(self):
+        """Informe legible para la consola."""
+        datos = self.informe()
+        columnas = "".join(f"{f'p{p}':>9}" for p in PERCENTILES) + f"{'max':>9}"
+        lineas = ["⏱️ Latencia de la interfaz (ms)",
+                  f"   {'Pantalla / acción':<40}{'n':>6}{columnas}"]
+        for fila in datos["interacciones"]:
+            valores = "".join(f"{fila[f'p{p}']:9.1f}" for p in PERCENTILES) + f"{fila['max']:9.1f}"
+            lineas.append(f"   {str(fila['pantalla']) + ' / ' + fila['accion']:<40}{fila['n']:>6}{valores}")
+        lineas.append(f"   {'Llamada (tiempo en el hilo de Tk)':<40}{'n':>6}{columnas}")
+        for fila in datos["llamadas"]:
+            valores = "".join(f"{fila[f'p{p}']:9.1f}" for p in PERCENTILES) + f"{fila['max']:9.1f}"
+            lineas.append(f"   {fila['llamada']:<40}{fila['n']:>6}{valores}")
+        lineas.append(f"   Bloqueos de más de {datos['umbral_bloqueo_ms']:.0f} ms: {datos['bloqueos_totales']}")
+        for bloqueo in datos["bloqueos"]:
+            lineas.append(f"     {bloqueo['ms']:9.1f} ms  {bloqueo['llamada']} en {bloqueo['pantalla']}"
+                          f" (segundo {bloqueo['segundo']:.1f})")
+        return "\n".join(lineas)
+
+    def volcar_informe(self):
+        """Imprime el informe y, si la variable de entorno es una ruta .json, lo guarda allí."""
+        if self.interaccion is not None:
+            self._cerrar_interaccion(reloj())
+        print(self.como_texto())
+        ruta = ruta_informe()
+        if ruta:
+            try:
+                with open(ruta, "w", encoding="utf-8") as f:
+                    json.dump(self.informe(), f, ensure_ascii=False, indent=2)
+            except OSError as error:
+                print(f"❌ Error: No se pudo guardar el informe de latencia en {ruta}: {error}")
+
+
+def _umbral_configurado():
+    valor = os.environ.get(VARIABLE_UMBRAL)
+    if not valor:
+        return UMBRAL_BLOQUEO_MS
+    try:
+        return float(valor)
+    except ValueError:
+        print(f"❌ Error: {VARIABLE_UMBRAL} debe ser un número de milisegundos: {valor!r}")
+        return UMBRAL_BLOQUEO_MS
+
+
+# Trazador del proceso (None si el trazado está apagado).
+TRAZADOR = TrazadorUI(_umbral_configurado()) if ACTIVO else None
+
+
+def trazar(nombre=None, inicia=False):
+    """
+    Decorador que mide una función del hilo de Tk. Sin trazado la devuelve intacta.
+
+    :param nombre: Nombre en el informe (por defecto Clase.metodo).
+    :param inicia: True si la función es un callback del usuario que abre una interacción.
+    """
+    def decorar(funcion):
+        if TRAZADOR is None:
+            return funcion
+        etiqueta = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def trazada(*args, **kwargs):
+            return TRAZADOR.llamar(etiqueta, inicia, funcion, args, kwargs)
+        return trazada
+    return decorar
+
+
+def instalar(raiz, pantalla, ocupado):
+    """Conecta el trazador a la ventana (no hace nada si el trazado está apagado)."""
+    if TRAZADOR is not None:
+        TRAZADOR.instalar(raiz, pantalla, ocupado)